@@ -0,0 +1,73 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from config import BENCHMARK_WORKERS, BENCHMARK_MODEL_DEADLINE, PROVIDER_CONCURRENCY, DEFAULT_PROVIDER_CONCURRENCY
+
+def provider_for(model):
+    """Concurrency bucket of a benchmark model: its vendor prefix on OpenRouter, else the native provider."""
+    return model.split("/")[0] if "/" in model else "gemini"
+
+def run_arena(jobs, workers=None, deadline=None, provider_caps=None):
+    """
+    Runs benchmark summaries concurrently, capped globally and per provider.
+
+    Args:
+        jobs (dict): {model: (provider, fn)} where fn(cancel_event) returns the summary text.
+            fn should stop early once cancel_event is set (it is set when the model misses its deadline).
+        workers (int): Models in flight at once (default BENCHMARK_WORKERS).
+        deadline (float): Seconds a model may run once started (default BENCHMARK_MODEL_DEADLINE).
+        provider_caps (dict): {provider: max in flight} (default PROVIDER_CONCURRENCY).
+
+    Returns:
+        dict: {model: summary} in the order of `jobs`. Models that raise or miss their deadline
+        get an error string, so the remaining results can still be rendered.
+    """
+    if not jobs:
+        return {}
+    workers = workers or BENCHMARK_WORKERS
+    deadline = deadline or BENCHMARK_MODEL_DEADLINE
+    provider_caps = PROVIDER_CONCURRENCY if provider_caps is None else provider_caps
+
+    global_slots = threading.Semaphore(workers)
+    provider_slots = {
+        provider: threading.Semaphore(provider_caps.get(provider, DEFAULT_PROVIDER_CONCURRENCY))
+        for provider, _ in jobs.values()
+    }
+    started = {}
+    cancels = {model: threading.Event() for model in jobs}
+
+    def run(model, provider, fn):
+        # Provider slot first, so models queued behind a busy provider don't hold a global slot
+        with provider_slots[provider], global_slots:
+            started[model] = time.monotonic()
+            print(f"Running {model}...")
+            return fn(cancels[model])
+
+    # One thread per model: waiting on a provider cap must not block models of other providers
+    pool = ThreadPoolExecutor(max_workers=len(jobs))
+    futures = {pool.submit(run, model, provider, fn): model for model, (provider, fn) in jobs.items()}
+    results = {}
+    pending = set(futures)
+    while pending:
+        now = time.monotonic()
+        for future in list(pending):
+            model = futures[future]
+            if future.done():
+                try:
+                    results[model] = future.result()
+                except Exception as e:
+                    results[model] = f"Failed: {e}"
+                pending.discard(future)
+            elif model in started and now - started[model] > deadline:
+                print(f"{model} missed its {deadline}s deadline.")
+                results[model] = f"Error: Timed out after {deadline}s"
+                cancels[model].set()
+                pending.discard(future)
+        if not pending: break
+        running_deadlines = [started[futures[f]] + deadline for f in pending if futures[f] in started]
+        timeout = max(0.01, min(running_deadlines) - time.monotonic()) if running_deadlines else 0.5
+        wait(pending, timeout=min(timeout, 0.5), return_when=FIRST_COMPLETED)
+    # Late models were told to stop; calls that cannot be interrupted are abandoned and their results discarded
+    pool.shutdown(wait=False, cancel_futures=True)
+    return {model: results[model] for model in jobs}
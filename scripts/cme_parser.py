@@ -0,0 +1,296 @@
+import re
+from datetime import datetime
+import fitz  # PyMuPDF
+
+from page_index import relevant_pages
+
+# --- Anchors ---
+
+SEC01_TABLES = ["FUTURES ONLY", "OPTIONS ONLY", "COMBINED TOTAL"]
+SEC01_ROWS = {
+    "totals": "CME GROUP TOTALS",
+    "rates": "INTEREST RATES",
+    "equity": "EQUITY INDEX"
+}
+
+SEC09_ANCHORS = {
+    "2y": "TOTAL 2-YR NOTE FUTURES",
+    "3y": "TOTAL 3-YR NOTE FUTURES",
+    "5y": "TOTAL 5-YR NOTE FUTURES",
+    "10y": "TOTAL 10-YR NOTE FUTURES",
+    "tn": "TOTAL TN FUT",
+    "30y": "TOTAL 30Y BOND FUT",
+    "ultra": "TOTAL ULTRA T-BND FUT"
+}
+
+# Anchors are (prefix, required words); MIDCAP/SMLCAP labels vary between bulletins
+SEC11_ANCHORS = {
+    "es": ("TOTAL EMINI S&P FUT", []),
+    "nq": ("TOTAL EMINI NASD FUT", []),
+    "ym": ("TOTAL MINI $5 DOW FUT", []),
+    "mid": ("TOTAL", ["MIDCAP"]),
+    "sml": ("TOTAL", ["SMLCAP"])
+}
+
+NUMERIC_TOKEN = re.compile(r"([+-]?)(\d+)([+-]?)")
+DATE_PATTERNS = [
+    (re.compile(r"\b([A-Z][a-z]{2}),?\s+([A-Z][a-z]{2})\s+(\d{1,2}),\s+(\d{4})\b"), lambda m: f"{m.group(2)} {m.group(3)} {m.group(4)}", "%b %d %Y"),
+    (re.compile(r"\b(\d{1,2}/\d{1,2}/\d{4})\b"), lambda m: m.group(1), "%m/%d/%Y"),
+    (re.compile(r"\b(\d{1,2}/\d{1,2}/\d{2})\b"), lambda m: m.group(1), "%m/%d/%y")
+]
+
+# --- Text Layer ---
+
+def page_rows(page, y_tolerance=2.0):
+    """
+    Groups the page's words into visual rows using get_text("words").
+
+    Returns:
+        list: Rows top to bottom, each a list of (x0, text) sorted left to right.
+    """
+    words = sorted(page.get_text("words"), key=lambda w: ((w[1] + w[3]) / 2, w[0]))
+    rows = []
+    current = []
+    current_y = None
+    for w in words:
+        y = (w[1] + w[3]) / 2
+        if current and abs(y - current_y) > y_tolerance:
+            rows.append(sorted(current))
+            current = []
+        if not current:
+            current_y = y
+        current.append((w[0], w[4]))
+    if current:
+        rows.append(sorted(current))
+    return rows
+
+def document_rows(pdf_path, pages=None):
+    with fitz.open(pdf_path) as doc:
+        page_nums = range(len(doc)) if pages is None else [p for p in pages if 0 <= p < len(doc)]
+        return [row for page_num in page_nums for row in page_rows(doc[page_num])]
+
+def section_rows(pdf_path, anchors):
+    """Rows of the first page (bulletin header) plus every page the page index says holds an anchor."""
+    return document_rows(pdf_path, sorted({0, *relevant_pages(pdf_path, anchors)}))
+
+def row_text(row):
+    return " ".join(text for _, text in row)
+
+def numeric_values(row):
+    """
+    Trailing numeric run of a row as (x0, value) pairs, with merged signs split off.
+
+    CME prints the sign of NET CHGE OI glued to the preceding number: "49139- 42"
+    is open interest 49139 followed by a change of -42. "UNCH" is kept as a token;
+    "----" marks an empty cell.
+    """
+    values = []
+    pending_sign = ""
+    for x0, text in row:
+        t = text.replace(",", "")
+        if t in ("+", "-"):
+            pending_sign = t
+            continue
+        m = NUMERIC_TOKEN.fullmatch(t)
+        if m:
+            sign = m.group(1) or pending_sign
+            values.append((x0, f"-{m.group(2)}" if sign == "-" else m.group(2)))
+            pending_sign = m.group(3)
+        elif t.upper() == "UNCH" or t == "----":
+            values.append((x0, t.upper()))
+            pending_sign = ""
+        else:
+            # Label word: only the run after the last label word counts
+            values = []
+            pending_sign = ""
+    return values
+
+def to_int(value):
+    if value in (None, "----"): return None
+    if value == "UNCH": return 0
+    return int(value)
+
+def find_row(rows, prefix, required=()):
+    for row in rows:
+        text = row_text(row).upper()
+        if text.startswith(prefix) and all(word in text for word in required):
+            return row
+    return None
+
+def row_label(row):
+    """Row text up to the first value of its trailing numeric run."""
+    values = numeric_values(row)
+    if not values:
+        return row_text(row)
+    first_x = values[0][0]
+    return " ".join(text for x0, text in row if x0 < first_x and text not in ("+", "-"))
+
+def find_bulletin_date(rows):
+    for row in rows[:15]:
+        text = row_text(row)
+        for pattern, extract, fmt in DATE_PATTERNS:
+            m = pattern.search(text)
+            if not m: continue
+            try:
+                return datetime.strptime(extract(m), fmt).strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+    return None
+
+def quality_notes(rows):
+    notes = []
+    for row in rows:
+        text = row_text(row)
+        if text.upper().startswith(("PLEASE NOTE", "PRELIMINARY")) and text not in notes:
+            notes.append(text)
+    return notes
+
+def is_preliminary(rows):
+    return any("PRELIMINARY" in row_text(row).upper() for row in rows[:15])
+
+# --- Section Parsers ---
+
+def parse_sec09(pdf_path):
+    """
+    Parses CME Section 09 tenor totals from the text layer.
+
+    Returns:
+        dict: Same shape as EXTRACTION_PROMPT_SEC09 output (consumed by process_cme_sec09),
+        or {} if no tenor rows were found.
+    """
+    rows = section_rows(pdf_path, SEC09_ANCHORS.values())
+    totals = {}
+    for key, anchor in SEC09_ANCHORS.items():
+        row = find_row(rows, anchor)
+        if not row: continue
+        values = [v for _, v in numeric_values(row)]
+        if len(values) < 4: continue
+        rth, globex, oi, chg = values[-4:]
+        totals[key] = {
+            "row_label": anchor,
+            "rth_volume": rth,
+            "globex_volume": globex,
+            "open_interest": oi,
+            "oi_change": chg
+        }
+    if not totals:
+        return {}
+    notes = quality_notes(rows)
+    missing = [k for k in SEC09_ANCHORS if k not in totals]
+    if missing:
+        notes.append(f"text_layer_missing: {', '.join(missing)}")
+    return {
+        "cme_section09": {
+            "bulletin_date": find_bulletin_date(rows),
+            "is_preliminary": is_preliminary(rows),
+            "source": "CME Section 09 Interest Rate Futures",
+            "totals": totals,
+            "data_quality_notes": notes
+        }
+    }
+
+def parse_sec11(pdf_path):
+    """
+    Parses CME Section 11 equity index product totals from the text layer.
+
+    Returns:
+        dict: Same shape as EXTRACTION_PROMPT_SEC11 output (consumed by process_cme_sec11),
+        or {} if no product rows were found.
+    """
+    rows = section_rows(pdf_path, [" ".join([prefix] + required) for prefix, required in SEC11_ANCHORS.values()])
+    products = {}
+    notes = quality_notes(rows)
+    for key, (prefix, required) in SEC11_ANCHORS.items():
+        row = find_row(rows, prefix, required)
+        values = [v for _, v in numeric_values(row)] if row else []
+        if len(values) < 3:
+            products[key] = None
+            notes.append(f"Missing {key.upper()} row")
+            continue
+        vol, oi, chg = values[-3:]
+        products[key] = {
+            "row_label": row_label(row),
+            "total_volume": to_int(vol),
+            "open_interest": to_int(oi),
+            "oi_change": to_int(chg)
+        }
+    if not any(products.values()):
+        return {}
+    return {
+        "bulletin_date": find_bulletin_date(rows),
+        "is_preliminary": is_preliminary(rows),
+        "products": products,
+        "data_quality_notes": notes
+    }
+
+def sec01_layout(rows):
+    """
+    Locates the FUTURES ONLY / OPTIONS ONLY / COMBINED TOTAL tables.
+
+    Returns:
+        tuple: ("columns", [tables left to right]) when the tables sit side by side on
+        one header row, else ("stacked", {table: index of its header row}).
+    """
+    for row in rows:
+        text = row_text(row).upper()
+        found = sorted((text.index(t), t) for t in SEC01_TABLES if t in text)
+        if len(found) >= 2:
+            return "columns", [t for _, t in found]
+
+    starts = {}
+    for i, row in enumerate(rows):
+        text = row_text(row).upper()
+        for table in SEC01_TABLES:
+            if table in text and table not in starts:
+                starts[table] = i
+    return "stacked", starts
+
+def sec01_row_values(rows, layout, tables, table, label):
+    """Numeric values of the `label` row within `table`."""
+    if layout == "columns":
+        # Side-by-side tables share one row with identical column sets: split the run evenly
+        row = find_row(rows, label)
+        if not row or table not in tables: return row, []
+        values = [v for _, v in numeric_values(row)]
+        if len(values) % len(tables) != 0: return row, []
+        width = len(values) // len(tables)
+        i = tables.index(table)
+        return row, values[i * width:(i + 1) * width]
+
+    if table not in tables: return None, []
+    start = tables[table]
+    later = sorted(v for v in tables.values() if v > start)
+    end = later[0] if later else len(rows)
+    row = find_row(rows[start:end], label)
+    if not row: return None, []
+    return row, [v for _, v in numeric_values(row)]
+
+def parse_sec01(pdf_path):
+    """
+    Parses the CME Section 01 keys of EXTRACTION_PROMPT from the text layer.
+
+    Returns:
+        dict: cme_* keys that could be read (missing keys are omitted).
+    """
+    rows = section_rows(pdf_path, list(SEC01_ROWS.values()) + SEC01_TABLES)
+    layout, tables = sec01_layout(rows)
+    data = {}
+
+    bulletin_date = find_bulletin_date(rows)
+    if bulletin_date:
+        data["cme_bulletin_date"] = bulletin_date
+
+    row, values = sec01_row_values(rows, layout, tables, "COMBINED TOTAL", SEC01_ROWS["totals"])
+    if len(values) >= 3:
+        data["cme_total_volume"] = to_int(values[-3])
+        data["cme_total_open_interest"] = to_int(values[-2])
+        data["cme_total_oi_net_change"] = to_int(values[-1])
+        data["cme_totals_audit_label"] = SEC01_ROWS["totals"]
+
+    for asset in ["rates", "equity"]:
+        for table, kind in [("FUTURES ONLY", "futures"), ("OPTIONS ONLY", "options")]:
+            row, values = sec01_row_values(rows, layout, tables, table, SEC01_ROWS[asset])
+            if values:
+                data[f"cme_{asset}_{kind}_oi_change"] = to_int(values[-1])
+                data[f"cme_{asset}_{kind}_audit_label"] = SEC01_ROWS[asset]
+    return data
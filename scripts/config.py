@@ -9,10 +9,89 @@ RECIPIENT_EMAIL = os.getenv("RECIPIENT_EMAIL")
 SUMMARIZE_PROVIDER = os.getenv("SUMMARIZE_PROVIDER", "ALL").upper() 
 GITHUB_REPOSITORY = os.getenv("GITHUB_REPOSITORY", "jpeirce/daily-macro-summary") 
 RUN_MODE = os.getenv("RUN_MODE", "PRODUCTION") # Options: PRODUCTION, BENCHMARK, BENCHMARK_JSON
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache") # Local cache root (PDFs, renders, manifests)
+FORCE_RUN = os.getenv("FORCE_RUN", "false").lower() == "true" # Ignore the run manifest and LLM response cache and re-run the full chain
+FINGERPRINT_SETTINGS = [ # Config values that shape a run's outputs; changing one invalidates the run manifest
+    "NOISE_THRESHOLDS", "LIVE_TICKERS", "TREND_LOOKBACK_SESSIONS", "TREND_THRESHOLD_PCT", "TREND_STALE_DAYS",
+    "IMAGE_PROFILES", "VISION_CROP", "CROP_MARGIN_PT", "CROP_HEADER_PT", "WISDOMTREE_TILE_PT", "WISDOMTREE_TILE_ANCHORS",
+    "VISION_PAYLOAD_BUDGET_MB", "VISION_MIN_DPI",
+    "PROMPT_FIELDS", "PROMPT_TRIM_ORDER", "PROMPT_BUDGET_MODE", "DEFAULT_PROMPT_TOKEN_BUDGET", "PROMPT_TOKEN_BUDGETS",
+    "LIVE_FIELD_FALLBACKS", "EXTRACTION_REASK_ROUNDS", "EXTRACTION_RANGES", "HEDGE_ENABLED", "HEDGE_BACKUPS"
+]
 
 # Model Configuration
 OPENROUTER_MODEL = "openai/gpt-5.2" 
 GEMINI_MODEL = "gemini-3-pro-preview" 
+GEMINI_TIMEOUT = int(os.getenv("GEMINI_TIMEOUT", "300")) # Seconds per Gemini summary call; also bounds a request the hedge abandoned
+
+# LLM Response Cache (keyed by model, prompt hash and input PDF/image hashes)
+LLM_CACHE_BYPASS = FORCE_RUN or os.getenv("LLM_CACHE_BYPASS", "false").lower() == "true" # Always call the model (fresh responses are still stored); implied by FORCE_RUN
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "72")) # Keyed by model, prompt, attachment hashes and response schema; identical reruns reuse responses
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "64")) # Least recently used responses are evicted beyond this
+
+# OpenRouter
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_STREAM = os.getenv("OPENROUTER_STREAM", "true").lower() == "true" # Stream completions (SSE) to get idle-gap control and TTFT metrics
+OPENROUTER_TIMEOUT = int(os.getenv("OPENROUTER_TIMEOUT", "300")) # Seconds for the whole completion
+OPENROUTER_IDLE_TIMEOUT = int(os.getenv("OPENROUTER_IDLE_TIMEOUT", "60")) # Seconds without a streamed token before the call counts as stalled
+
+# Prompt Assembly (ground truth / event context are pruned to an allowlist and serialized compactly)
+# Allowlists: True keeps a value whole, a nested dict keeps only the listed keys.
+METRIC_FIELDS = [
+    "wisdomtree_as_of_date", "hy_spread_current", "hy_spread_median", "forward_pe_current", "forward_pe_median",
+    "forward_pe_plus_1sigma", "real_yield_10y", "inflation_expectations_5y5y", "yield_10y", "yield_2y",
+    "interest_coverage_small_cap", "cme_bulletin_date", "cme_total_volume", "cme_total_open_interest",
+    "cme_total_oi_net_change", "cme_rates_futures_oi_change", "cme_rates_options_oi_change",
+    "cme_equity_futures_oi_change", "cme_equity_options_oi_change",
+    "vix_index", "ust10y_current", "ust10y_change_bps", "dxy_current", "dxy_1d_chg", "wti_current", "wti_1d_chg",
+    "hyg_current", "hyg_1d_chg", "sp500_current", "sp500_current_date", "sp500_1mo_change_pct", "sp500_trend_status"
+] # Audit labels and trend audit strings stay in the report's verification block
+SIGNAL_FIELDS = {"signal_label": True, "direction_allowed": True, "participation_label": True, "gate_reason": True}
+GROUND_TRUTH_FIELDS = {
+    "extracted_metrics": {k: True for k in METRIC_FIELDS},
+    "calculated_scores": True,
+    "cme_signals": {"equity": SIGNAL_FIELDS, "rates": SIGNAL_FIELDS},
+    "cme_rates_curve": {"tenors": True, "clusters": True, "dominance": True, "quality": {"is_complete": True, "is_preliminary": True}},
+    "cme_equity_flows": {"products": True, "aggregates": True, "quality": {"is_preliminary": True}}
+}
+EVENT_CONTEXT_FIELDS = {"as_of": True, "flags_today": True, "flags_recent": True, "notes": True}
+PROMPT_FIELDS = { # Prompt type -> context name -> allowlist
+    "summary": {"ground_truth": GROUND_TRUTH_FIELDS, "event_context": EVENT_CONTEXT_FIELDS},
+    "benchmark": {"event_context": EVENT_CONTEXT_FIELDS},
+    "benchmark_json": {"ground_truth": GROUND_TRUTH_FIELDS, "event_context": EVENT_CONTEXT_FIELDS}
+}
+PROMPT_TRIM_ORDER = [ # Dropped in this order when a prompt is over budget and PROMPT_BUDGET_MODE="trim"
+    ("ground_truth", "cme_rates_curve", "tenors"),
+    ("ground_truth", "cme_equity_flows", "products"),
+    ("event_context", "notes")
+]
+PROMPT_BUDGET_MODE = os.getenv("PROMPT_BUDGET_MODE", "warn").lower() # "warn" logs an overrun; "trim" drops PROMPT_TRIM_ORDER detail until the prompt fits
+DEFAULT_PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000")) # Prompt text only (images not counted); 0 disables
+PROMPT_TOKEN_BUDGETS = { # Per-model overrides
+    "nvidia/nemotron-nano-12b-v2-vl": 4000
+}
+PROMPT_BYTES_PER_TOKEN = 4 # Token estimate when no tokenizer is at hand
+
+# Provider-Side Prompt Caching (static system prompt first, per-day data last)
+OPENROUTER_CACHE_CONTROL_PROVIDERS = ["anthropic", "google"] # Need an explicit cache_control breakpoint; OpenAI, xAI etc. cache prefixes automatically
+# Gemini relies on implicit prefix caching: the system prompt (~1.7k tokens) is below the 4096-token minimum for an explicit context cache
+
+# Hedged Summaries (PRODUCTION): a backup request fires when the primary runs past its usual latency
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+HEDGE_PERCENTILE = 95 # Hedge delay = this percentile of the primary model's recorded latencies
+HEDGE_MIN_SAMPLES = 5 # Samples needed before the percentile is trusted
+HEDGE_DEFAULT_DELAY = 120 # Seconds, until enough samples exist
+HEDGE_BACKUPS = { # Primary summarizer -> OpenRouter backup model
+    "gemini": "google/gemini-3-pro-preview", # Same model, different provider
+    "openrouter": "anthropic/claude-sonnet-4.5"
+}
+BREAKER_FAILURE_THRESHOLD = 3 # Consecutive failures before a provider is skipped as a backup
+BREAKER_COOLDOWN = 1800 # Seconds before a tripped provider is tried again
+
+# Gemini File Uploads (each distinct PDF is uploaded once per run and its handle reused)
+GEMINI_UPLOAD_PERSIST = os.getenv("GEMINI_UPLOAD_PERSIST", "true").lower() == "true" # Persist handles in CACHE_DIR/gemini_uploads.json and reuse them across runs until they expire
+GEMINI_FILE_TTL_HOURS = 48 # Server-side retention, used when a handle reports no expiration_time
+GEMINI_UPLOAD_EXPIRY_MARGIN_MINUTES = 30 # Handles this close to expiry are re-uploaded
 
 # Data Sources
 PDF_SOURCES = {
@@ -22,6 +101,109 @@ PDF_SOURCES = {
     "cme_sec11": "https://www.cmegroup.com/daily_bulletin/current/Section11_Equity_And_Index_Futures.pdf"
 }
 
+# Outbound Calls (shared per-host throttle + retry layer for downloads, Gemini, OpenRouter, yfinance)
+RATE_LIMITS = { # host -> (requests per second, burst)
+    "openrouter.ai": (2.0, 8),
+    "gemini": (1.0, 4),
+    "www.cmegroup.com": (2.0, 4),
+    "www.wisdomtree.com": (2.0, 4),
+    "yfinance": (2.0, 5)
+}
+DEFAULT_RATE_LIMIT = (5.0, 10)
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "4")) # Total tries per call (408/429/5xx, connection and provider rate-limit errors); jittered backoff or Retry-After
+RETRY_BASE_DELAY = 1.0 # Seconds; doubles per attempt, with full jitter
+RETRY_MAX_DELAY = 30.0 # Cap for backoff and for honoured Retry-After values
+
+# Download Settings
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "4")) # Concurrent PDF fetches (one pooled session); live data is fetched alongside
+DOWNLOAD_TIMEOUT = (10, 60) # (connect, read) seconds
+DOWNLOAD_CHUNK_SIZE = 256 * 1024 # Streamed to disk in chunks; peak memory stays flat
+DOWNLOAD_ATTEMPTS = 3 # Interrupted transfers resume from the partial file via Range requests
+
+# Live Market Data (Yahoo Finance, fetched in one batched download)
+# key -> (ticker, derivation): "level" -> {key}_index | "bps_change" -> {key}_current, {key}_change_bps (yield quoted in percent)
+# "pct_change" -> {key}_current, {key}_1d_chg | "trend" -> {key}_current, {key}_current_date, {key}_trend_status, {key}_1mo_change_pct, {key}_trend_audit
+LIVE_TICKERS = {
+    "vix": ("^VIX", "level"),
+    "ust10y": ("^TNX", "bps_change"),
+    "dxy": ("DX-Y.NYB", "pct_change"),
+    "wti": ("CL=F", "pct_change"),
+    "hyg": ("HYG", "pct_change"),
+    "sp500": ("^GSPC", "trend")
+}
+LIVE_HISTORY_PERIOD = "2mo" # Covers the trend lookback across holidays; seeds tickers the history store does not hold yet
+HISTORY_STORE = os.getenv("HISTORY_STORE", "true").lower() == "true" # Keep daily bars in CACHE_DIR/market_history.sqlite and only fetch newer sessions
+TREND_LOOKBACK_SESSIONS = 21 # Trend = close-to-close change over this many sessions
+TREND_THRESHOLD_PCT = 2.0 # |change| at or above this is "Trending Up/Down"
+TREND_STALE_DAYS = 7 # Last session older than this drops a ticker's live fields (trend reads Unknown)
+
+# Extraction Cascade
+# Extraction keys that live market data can fill before falling back to a vision request
+# (extraction key -> fetch_live_data key)
+LIVE_FIELD_FALLBACKS = {
+    "yield_10y": "ust10y_current"
+}
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "3")) # Concurrent vision extraction passes (main, Sec 09, Sec 11); 1 = serial
+EXTRACTION_TIMEOUT = int(os.getenv("EXTRACTION_TIMEOUT", "300")) # Seconds per vision extraction call; a pass that times out leaves its fields missing
+EXTRACTION_REASK_ROUNDS = int(os.getenv("EXTRACTION_REASK_ROUNDS", "1")) # Follow-up requests for keys a vision pass left missing or invalid; 0 disables
+# Plausible ranges for extracted values (inclusive; None = unbounded). Values outside are treated as misreads.
+EXTRACTION_RANGES = {
+    "hy_spread_current": (0, 25),
+    "hy_spread_median": (0, 25),
+    "forward_pe_current": (5, 60),
+    "forward_pe_median": (5, 60),
+    "forward_pe_plus_1sigma": (5, 60),
+    "real_yield_10y": (-5, 10),
+    "inflation_expectations_5y5y": (-2, 10),
+    "yield_10y": (-2, 20),
+    "yield_2y": (-2, 20),
+    "interest_coverage_small_cap": (-50, 100),
+    "cme_total_volume": (0, None),
+    "cme_total_open_interest": (0, None)
+}
+
+# Page Render Cache (rasterized PDF pages for vision models)
+RENDER_CACHE_MAX_MB = int(os.getenv("RENDER_CACHE_MAX_MB", "256")) # In-memory LRU budget
+RENDER_CACHE_DISK = os.getenv("RENDER_CACHE_DISK", "false").lower() == "true" # Also persist renders under CACHE_DIR
+RENDER_CACHE_DISK_MAX_MB = int(os.getenv("RENDER_CACHE_DISK_MAX_MB", "1024"))
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "1")) # Process-pool size for page rendering (spawned, safe from worker threads); 0 = os.cpu_count(), 1 = serial
+RENDER_PARALLEL_MIN_PAGES = 24 # Fewer uncached pages than this render serially: spawning workers costs more than it saves
+
+# Vision Image Encoding Profiles (per PDF source)
+# dpi: render resolution (216 = 3x zoom) | max_pixels: per-page pixel cap (dpi is lowered to fit)
+# format: "jpeg", "png" or "webp" (webp needs Pillow; falls back to jpeg) | quality: jpeg/webp quality
+DEFAULT_IMAGE_PROFILE = {"dpi": 216, "grayscale": False, "format": "jpeg", "quality": 85, "max_pixels": 6_000_000}
+CME_IMAGE_PROFILE = {"dpi": 200, "grayscale": True, "format": "png", "quality": None, "max_pixels": 6_000_000} # Dense text tables
+IMAGE_PROFILES = {
+    "wisdomtree": {"dpi": 216, "grayscale": False, "format": "jpeg", "quality": 85, "max_pixels": 6_000_000}, # Colour charts
+    "cme_sec01": CME_IMAGE_PROFILE,
+    "cme_sec09": CME_IMAGE_PROFILE,
+    "cme_sec11": CME_IMAGE_PROFILE
+}
+VISION_PAYLOAD_BUDGET_MB = float(os.getenv("VISION_PAYLOAD_BUDGET_MB", "8")) # Total base64 image budget per request (renders are re-encoded at lower DPI to fit); 0 disables
+VISION_MIN_DPI = 72 # Floor when shrinking renders to fit the payload budget
+
+# Anchor Cropping (vision inputs show only the rows/tiles that hold the values we need)
+# Bands are found with PyMuPDF text search; pages without any anchor hit are sent whole.
+VISION_CROP = os.getenv("VISION_CROP", "true").lower() == "true"
+CROP_MARGIN_PT = 4 # Padding above/below each anchor, in PDF points
+CROP_HEADER_PT = 36 # Height kept below a header anchor (bulletin date, table titles, column headings)
+WISDOMTREE_TILE_PT = 180 # Height kept below a WisdomTree tile title (value + chart)
+WISDOMTREE_TILE_ANCHORS = {
+    "wisdomtree_as_of_date": "As of",
+    "hy_spread_current": "High Yield",
+    "hy_spread_median": "High Yield",
+    "forward_pe_current": "Forward P/E",
+    "forward_pe_median": "Forward P/E",
+    "forward_pe_plus_1sigma": "Forward P/E",
+    "real_yield_10y": "Real Yield",
+    "inflation_expectations_5y5y": "5y5y",
+    "yield_10y": "10-Year",
+    "yield_2y": "2-Year",
+    "interest_coverage_small_cap": "Interest Coverage"
+}
+
 # Benchmark Models (for RUN_MODE="BENCHMARK")
 BENCHMARK_MODELS = [
     "anthropic/claude-sonnet-4.5",
@@ -33,6 +215,12 @@ BENCHMARK_MODELS = [
     "nvidia/nemotron-nano-12b-v2-vl"
 ]
 
+# Benchmark Arena Scheduling (models run concurrently; results keep roster order)
+BENCHMARK_WORKERS = int(os.getenv("BENCHMARK_WORKERS", "4")) # Models in flight at once across all providers
+BENCHMARK_MODEL_DEADLINE = int(os.getenv("BENCHMARK_MODEL_DEADLINE", "300")) # Seconds per model once started; late models are reported as timed out
+PROVIDER_CONCURRENCY = {"gemini": 1} # Per-provider caps (OpenRouter models use their vendor prefix, e.g. "anthropic")
+DEFAULT_PROVIDER_CONCURRENCY = 2
+
 # Noise thresholds by asset class
 NOISE_THRESHOLDS = {
     "equity": 50000,
@@ -0,0 +1,205 @@
+import os
+import json
+import hashlib
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+
+from outbound import send, host_of
+from config import CACHE_DIR, DOWNLOAD_WORKERS, DOWNLOAD_TIMEOUT, DOWNLOAD_CHUNK_SIZE, DOWNLOAD_ATTEMPTS
+
+PDF_CACHE_DIR = os.path.join(CACHE_DIR, "pdfs")
+INDEX_PATH = os.path.join(PDF_CACHE_DIR, "index.json")
+
+# --- Content-Addressed Store ---
+
+def url_key(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+
+def object_path(sha256):
+    return os.path.join(PDF_CACHE_DIR, "objects", f"{sha256}.pdf")
+
+def partial_path(url):
+    return os.path.join(PDF_CACHE_DIR, "partial", f"{url_key(url)}.part")
+
+def content_hash(path):
+    """SHA-256 of a file. Free for paths inside the object store (the filename is the hash)."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if os.path.dirname(os.path.abspath(path)) == os.path.abspath(os.path.join(PDF_CACHE_DIR, "objects")) and len(stem) == 64:
+        return stem
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def load_index():
+    try:
+        with open(INDEX_PATH, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Warning: Could not read PDF cache index: {e}")
+        return {}
+
+def save_index(index):
+    tmp_path = INDEX_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, INDEX_PATH)
+
+def load_partial_meta(part_path):
+    try:
+        with open(part_path + ".json", "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+# --- Download ---
+
+def create_session(pool_size=DOWNLOAD_WORKERS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": "Mozilla/5.0"})
+    return session
+
+def stream_to_partial(session, url, headers, part_path):
+    """
+    Streams one response body into the partial file, resuming with a Range request
+    when a partial from an earlier attempt exists.
+
+    Returns:
+        tuple: (response, sha256 of the full partial file) or (response, None) on 304.
+    """
+    meta = load_partial_meta(part_path)
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    req_headers = dict(headers)
+    if offset > 0:
+        req_headers["Range"] = f"bytes={offset}-"
+        validator = meta.get("etag") or meta.get("last_modified")
+        if validator:
+            req_headers["If-Range"] = validator
+
+    # Connection errors are left to fetch_pdf, which resumes from the partial file
+    with send(host_of(url), lambda: session.get(url, headers=req_headers, timeout=DOWNLOAD_TIMEOUT, stream=True), retry_exceptions=False) as response:
+        if response.status_code == 304:
+            return response, None
+        if response.status_code == 416:
+            # Partial is stale or already complete on a changed resource; start over
+            os.remove(part_path)
+            raise IOError("Range not satisfiable, restarting download")
+        response.raise_for_status()
+
+        hasher = hashlib.sha256()
+        if response.status_code == 206:
+            print(f"Resuming {url} from byte {offset}...")
+            with open(part_path, "rb") as f:
+                for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+            mode = "ab"
+        else:
+            mode = "wb"
+
+        with open(part_path + ".json", "w") as f:
+            json.dump({
+                "etag": response.headers.get("ETag") or meta.get("etag"),
+                "last_modified": response.headers.get("Last-Modified") or meta.get("last_modified")
+            }, f)
+
+        received = 0
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if not chunk: continue
+                f.write(chunk)
+                hasher.update(chunk)
+                received += len(chunk)
+
+        # Content-Length counts the bytes on the wire: compare it with what urllib3 read, not
+        # with the decoded size, which differs when the body is gzip/deflate encoded
+        encoded = response.headers.get("Content-Encoding", "identity").lower() != "identity"
+        if encoded:
+            received = response.raw.tell()
+        expected = response.headers.get("Content-Length")
+        if expected is not None and received != int(expected):
+            if encoded:
+                # Byte ranges of an encoded body don't map onto the decoded partial: restart instead
+                os.remove(part_path)
+            raise IOError(f"Truncated transfer ({received}/{expected} bytes)")
+        return response, hasher.hexdigest()
+
+def fetch_pdf(session, name, url, entry):
+    """
+    Fetches a single PDF into the content-addressed store, revalidating against the
+    cached object when one exists and resuming interrupted transfers.
+
+    Returns:
+        tuple: (local path, updated index entry)
+    """
+    cached_sha = entry.get("sha256") if entry else None
+    headers = {}
+    if cached_sha and os.path.exists(object_path(cached_sha)):
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    part_path = partial_path(url)
+    print(f"Downloading {name} from {url}...")
+    last_error = None
+    for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+        try:
+            response, sha256 = stream_to_partial(session, url, headers, part_path)
+            break
+        except requests.HTTPError:
+            raise
+        except (requests.ConnectionError, requests.Timeout, IOError) as e:
+            last_error = e
+            print(f"{name}: attempt {attempt}/{DOWNLOAD_ATTEMPTS} interrupted ({e})")
+    else:
+        raise last_error
+
+    if sha256 is None:
+        print(f"{name}: not modified, using cached copy.")
+        return object_path(cached_sha), entry
+
+    final_path = object_path(sha256)
+    os.replace(part_path, final_path)
+    try:
+        os.remove(part_path + ".json")
+    except OSError:
+        pass
+    print(f"Downloaded {name} (sha256 {sha256[:12]}).")
+    return final_path, {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "sha256": sha256
+    }
+
+def download_pdfs(sources):
+    """Downloads all sources concurrently over one pooled session. Returns {name: path} in source order."""
+    os.makedirs(os.path.join(PDF_CACHE_DIR, "objects"), exist_ok=True)
+    os.makedirs(os.path.join(PDF_CACHE_DIR, "partial"), exist_ok=True)
+    index = load_index()
+    paths = {}
+
+    with create_session() as session, ThreadPoolExecutor(max_workers=max(1, DOWNLOAD_WORKERS)) as pool:
+        futures = {
+            name: pool.submit(fetch_pdf, session, name, url, index.get(url, {}))
+            for name, url in sources.items()
+        }
+        for name, future in futures.items():
+            try:
+                path, entry = future.result()
+                paths[name] = path
+                index[sources[name]] = entry
+            except Exception as e:
+                print(f"Error downloading {name}: {e}")
+
+    try:
+        save_index(index)
+    except Exception as e:
+        print(f"Warning: Could not write PDF cache index: {e}")
+    return paths
@@ -0,0 +1,417 @@
+import os
+import json
+import base64
+from concurrent.futures import ThreadPoolExecutor, wait
+import google.generativeai as genai
+
+from config import (
+    AI_STUDIO_API_KEY, GEMINI_MODEL, CACHE_DIR, LIVE_FIELD_FALLBACKS, VISION_CROP,
+    EXTRACTION_WORKERS, EXTRACTION_TIMEOUT, EXTRACTION_REASK_ROUNDS
+)
+from prompts import (
+    EXTRACTION_PROMPT, EXTRACTION_PROMPT_SEC09, EXTRACTION_PROMPT_SEC11,
+    EXTRACTION_FIELDS, field_lines, TARGETED_EXTRACTION_PROMPT, TARGETED_ROWS_PROMPT, REASK_NOTE
+)
+from extraction_schema import SEC09_COLUMNS, SEC11_COLUMNS, fields_schema, rows_schema, section_schema, validate
+from cme_parser import parse_sec01, parse_sec09, parse_sec11, SEC09_ANCHORS, SEC11_ANCHORS
+from downloader import content_hash
+from rasterizer import crop_images, crop_spec, image_mime, profile_for, vision_pages
+from page_index import relevant_pages
+from pdf_uploads import upload_pdf, upload_id
+from llm_cache import response_key, image_id, load_response, save_response
+from outbound import send
+
+EXTRACTION_CACHE_DIR = os.path.join(CACHE_DIR, "extractions")
+
+SEC11_LABELS = {
+    "es": "TOTAL EMINI S&P FUT",
+    "nq": "TOTAL EMINI NASD FUT",
+    "ym": "TOTAL MINI $5 DOW FUT",
+    "mid": 'TOTAL ... MIDCAP ... (contains "TOTAL" and "MIDCAP", likely "TOTAL E-400 MIDCAP F")',
+    "sml": 'TOTAL ... SMLCAP ... (contains "TOTAL" and "SMLCAP", likely "TOTAL E-600 SMLCAP F")'
+}
+
+# Fields each source is responsible for. Section 09/11 fields are whole rows.
+SOURCE_FIELDS = {
+    "wisdomtree": [k for k, (src, _, _) in EXTRACTION_FIELDS.items() if src == "wisdomtree"],
+    "cme_sec01": [k for k, (src, _, _) in EXTRACTION_FIELDS.items() if src == "cme_sec01"],
+    "cme_sec09": list(SEC09_ANCHORS),
+    "cme_sec11": list(SEC11_ANCHORS)
+}
+
+# --- Vision LLM ---
+
+def parse_json_response(text):
+    """JSON object from a model response; tolerates code fences and text around the object."""
+    text = text.replace("```json", "").replace("```", "").strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end <= start:
+            raise
+        return json.loads(text[start:end + 1])
+
+def extract_metrics_gemini(pdf_paths, prompt_override=None, images=None, pages=None, schema=None):
+    """
+    Args:
+        pdf_paths (dict): {source name: local path}. Each PDF is uploaded unless `images` has crops for it.
+        images (dict): {source name: [(mime type, base64 image)]} sent inline instead of the upload.
+        pages (dict): {source name: 0-based pages} to subset the upload to. Missing/None uploads every page.
+        schema (dict): Response schema for structured JSON output (defaults to EXTRACTION_PROMPT's fields).
+    """
+    print("Extracting Ground Truth Data with Gemini...")
+    if not AI_STUDIO_API_KEY:
+        print("Error: AI_STUDIO_API_KEY not found. Skipping PDF extraction.")
+        return {}
+
+    prompt = prompt_override if prompt_override else EXTRACTION_PROMPT
+    if schema is None and not prompt_override:
+        schema = fields_schema(EXTRACTION_FIELDS)
+    inputs = []
+    for name, path in pdf_paths.items():
+        if images and images.get(name):
+            inputs.extend(f"{name}:{image_id(mime, img)}" for mime, img in images[name])
+        else:
+            inputs.append(upload_id(name, path, pages=(pages or {}).get(name)))
+    generation_config = {"response_mime_type": "application/json"}
+    if schema:
+        generation_config["response_schema"] = schema
+    key = response_key(GEMINI_MODEL, prompt, inputs, generation_config)
+    cached = load_response(key)
+    if cached is not None:
+        return cached
+
+    genai.configure(api_key=AI_STUDIO_API_KEY)
+    model = genai.GenerativeModel(GEMINI_MODEL, generation_config=generation_config)
+
+    try:
+        content = [prompt]
+        for name, path in pdf_paths.items():
+            if images and images.get(name):
+                print(f"Attaching {len(images[name])} cropped images for {name}...")
+                content.append(f"Document: {name}")
+                content.extend({"mime_type": mime, "data": base64.b64decode(img)} for mime, img in images[name])
+                continue
+            f = upload_pdf(name, path, pages=(pages or {}).get(name))
+            content.append(f"Document: {name}")
+            content.append(f)
+
+        response = send("gemini", lambda: model.generate_content(content, request_options={"timeout": EXTRACTION_TIMEOUT}))
+        data = parse_json_response(response.text)
+        print(f"Extracted Data: {data}")
+        if data:
+            save_response(key, GEMINI_MODEL, data)
+        return data
+    except Exception as e:
+        print(f"Extraction failed (CME/WisdomTree Source): {e}")
+        return {}
+
+def reask_note(problems):
+    """REASK_NOTE listing why each key of an earlier answer was rejected ('' for a first request)."""
+    if not problems: return ""
+    return REASK_NOTE.format(problems="\n".join(f"- {k}: {reason}" for k, reason in problems.items()))
+
+def build_targeted_prompt(keys, problems=None):
+    """EXTRACTION_PROMPT restricted to the given keys."""
+    return reask_note(problems) + TARGETED_EXTRACTION_PROMPT.format(fields="\n".join(field_lines(keys)))
+
+def build_targeted_rows_prompt(source, rows, problems=None):
+    """Section 09/11 row prompt restricted to the given row keys."""
+    if source == "cme_sec09":
+        section, columns, labels, col_type = "Section 09 Interest Rate Futures", SEC09_COLUMNS, SEC09_ANCHORS, "string"
+    else:
+        section, columns, labels, col_type = "Section 11 Equity & Index Futures", SEC11_COLUMNS, SEC11_LABELS, "integer"
+    cols = ", ".join(f'"{c}": {col_type}' for c in columns)
+    row_lines = [f'    "{k}": {{"row_label": "{labels[k]}", {cols}}}' for k in rows]
+    return reask_note(problems) + TARGETED_ROWS_PROMPT.format(
+        section=section,
+        columns=" ".join(f"[{c.upper()}]" for c in columns),
+        rows=",\n".join(row_lines)
+    )
+
+# --- Strategies ---
+
+def text_layer_strategy(source, path):
+    """Returns (fields, meta) read deterministically from the PDF text layer."""
+    if source == "cme_sec01":
+        return parse_sec01(path), {}
+    if source == "cme_sec09":
+        sec09 = parse_sec09(path).get("cme_section09", {})
+        meta = {k: sec09[k] for k in ["bulletin_date", "is_preliminary", "data_quality_notes"] if k in sec09}
+        return sec09.get("totals", {}), meta
+    if source == "cme_sec11":
+        sec11 = parse_sec11(path)
+        meta = {k: sec11[k] for k in ["bulletin_date", "is_preliminary", "data_quality_notes"] if k in sec11}
+        return {k: v for k, v in sec11.get("products", {}).items() if v}, meta
+    return {}, {}
+
+def cache_path(pdf_hash):
+    return os.path.join(EXTRACTION_CACHE_DIR, f"{pdf_hash}.json")
+
+def load_cached_extraction(pdf_hash):
+    try:
+        with open(cache_path(pdf_hash), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Warning: Could not read cached extraction: {e}")
+        return {}
+
+def save_cached_extraction(pdf_hash, fields, meta):
+    try:
+        os.makedirs(EXTRACTION_CACHE_DIR, exist_ok=True)
+        tmp_path = cache_path(pdf_hash) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"fields": fields, "meta": meta}, f, indent=2)
+        os.replace(tmp_path, cache_path(pdf_hash))
+    except Exception as e:
+        print(f"Warning: Could not write cached extraction: {e}")
+
+def cropped_inputs(pdf_paths, missing):
+    """Anchor crops around each source's missing fields. Sources without anchor hits are left out (sent whole)."""
+    if not VISION_CROP: return {}
+    images = {}
+    for source, keys in missing.items():
+        profile = profile_for(source)
+        try:
+            pages = vision_pages(source, pdf_paths[source], keys)
+            crops = crop_images(pdf_paths[source], crop_spec(source, keys), pages=pages, profile=profile)
+        except Exception as e:
+            print(f"Warning: Could not crop {source}: {e}")
+            crops = None
+        if crops:
+            images[source] = [(image_mime(profile), img) for img in crops]
+    return images
+
+def vision_passes(pdf_paths, missing, problems=None):
+    """
+    One request per extraction group, asking only for missing fields. A CME section with no rows
+    found at all uses its full section prompt on the first round.
+
+    Args:
+        missing (dict): {source: [missing field keys]}
+        problems (dict): {source: {key: reason}} from an earlier round; turns the prompts into re-asks.
+
+    Returns:
+        dict: {pass name: (pdf_paths subset, prompt, response schema, sources)}
+    """
+    passes = {}
+    # Main group: WisdomTree + Section 01 scalar keys share one request
+    main_sources = [s for s in ["wisdomtree", "cme_sec01"] if missing.get(s)]
+    if main_sources:
+        keys = [k for s in main_sources for k in missing[s]]
+        reasons = {k: r for s in main_sources for k, r in (problems or {}).get(s, {}).items()}
+        print(f"Targeted vision extraction for {len(keys)} keys from {', '.join(main_sources)}...")
+        passes["main"] = ({s: pdf_paths[s] for s in main_sources}, build_targeted_prompt(keys, reasons), fields_schema(keys), main_sources)
+
+    full_prompts = {"cme_sec09": EXTRACTION_PROMPT_SEC09, "cme_sec11": EXTRACTION_PROMPT_SEC11}
+    for source in ["cme_sec09", "cme_sec11"]:
+        if not missing.get(source): continue
+        if problems is None and len(missing[source]) == len(SOURCE_FIELDS[source]):
+            print(f"Extracting {source} with full vision prompt (no text-layer rows)...")
+            passes[source] = ({source: pdf_paths[source]}, full_prompts[source], section_schema(source), [source])
+        else:
+            print(f"Targeted vision extraction for {source} rows: {', '.join(missing[source])}...")
+            reasons = (problems or {}).get(source)
+            passes[source] = ({source: pdf_paths[source]}, build_targeted_rows_prompt(source, missing[source], reasons), rows_schema(source, missing[source]), [source])
+    return passes
+
+def pass_values(source, data):
+    """Candidate values for `source` from one pass's response, plus section metadata for full-section answers."""
+    if source in ("wisdomtree", "cme_sec01"):
+        return data, None
+    if "rows" in data:
+        return data.get("rows") or {}, None
+    section = data.get("cme_section09", {}) if source == "cme_sec09" else data
+    rows = section.get("totals" if source == "cme_sec09" else "products") or {}
+    meta = {k: section[k] for k in ["bulletin_date", "is_preliminary", "data_quality_notes"] if k in section}
+    return rows, meta or None
+
+def vision_strategy(pdf_paths, missing):
+    """
+    Targeted vision requests for the missing fields, validated against the field schema.
+    Keys still missing or out of range are asked for again (EXTRACTION_REASK_ROUNDS times),
+    in a request naming only those keys and why the previous answer was rejected.
+    Sources are sent as anchor crops around the missing fields where the anchors can be found.
+
+    Args:
+        missing (dict): {source: [missing field keys]}
+
+    Returns:
+        tuple: ({source: {field: value}}, {source: meta})
+    """
+    filled = {source: {} for source in missing}
+    meta = {}
+    images = cropped_inputs(pdf_paths, missing)
+    # Uploads keep only the pages holding the missing fields' anchors (every page if none is found)
+    pages = {s: relevant_pages(pdf_paths[s], crop_spec(s, keys)["rows"]) or None for s, keys in missing.items()}
+
+    remaining, problems = missing, None
+    for round_num in range(1 + max(EXTRACTION_REASK_ROUNDS, 0)):
+        if round_num:
+            print(f"Re-asking for {sum(len(k) for k in remaining.values())} missing or invalid keys: {problems}")
+        passes = vision_passes(pdf_paths, remaining, problems)
+        results, timed_out = run_vision_passes(passes, images, pages)
+
+        # Merge in a fixed order, independent of completion order
+        problems = {}
+        for name, (_, _, _, sources) in passes.items():
+            if name in timed_out: continue  # A re-ask would likely time out too
+            for source in sources:
+                values, section_meta = pass_values(source, results[name])
+                if section_meta: meta[source] = section_meta
+                valid, source_problems = validate(source, values, remaining[source])
+                filled[source].update(valid)
+                if source_problems: problems[source] = source_problems
+        remaining = {s: list(p) for s, p in problems.items()}
+        if not remaining: break
+    return filled, meta
+
+def run_vision_passes(passes, images, pages, workers=None, timeout=None):
+    """
+    Runs independent extraction requests on a thread pool (at most EXTRACTION_WORKERS at a time).
+    A pass that fails, or is still running at its deadline, yields {}.
+
+    Returns:
+        tuple: ({pass name: extracted data}, [names of the passes that timed out])
+    """
+    workers = min(workers or EXTRACTION_WORKERS, len(passes)) if passes else 1
+    timeout = timeout or EXTRACTION_TIMEOUT
+    if workers <= 1:
+        return {
+            name: extract_metrics_gemini(paths, prompt_override=prompt, images=images, pages=pages, schema=schema)
+            for name, (paths, prompt, schema, _) in passes.items()
+        }, []
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    futures = {
+        name: pool.submit(extract_metrics_gemini, paths, prompt_override=prompt, images=images, pages=pages, schema=schema)
+        for name, (paths, prompt, schema, _) in passes.items()
+    }
+    # Queued passes only start once a worker frees up, so the deadline covers every round
+    wait(futures.values(), timeout=timeout * -(-len(passes) // workers))
+    results = {}
+    timed_out = []
+    for name, future in futures.items():
+        if future.done():
+            results[name] = future.result()
+        else:
+            print(f"Extraction pass {name} timed out after {timeout}s.")
+            results[name] = {}
+            timed_out.append(name)
+    pool.shutdown(wait=False, cancel_futures=True)
+    return results, timed_out
+
+# --- Cascade ---
+
+def assemble_outputs(fields, meta):
+    """Builds the extracted_metrics / sec09_raw / sec11_raw shapes the rest of the pipeline consumes."""
+    extracted_metrics = {}
+    for source in ["wisdomtree", "cme_sec01"]:
+        extracted_metrics.update(fields.get(source, {}))
+
+    sec09_raw = {}
+    if fields.get("cme_sec09"):
+        m = meta.get("cme_sec09", {})
+        sec09_raw = {
+            "cme_section09": {
+                "bulletin_date": m.get("bulletin_date"),
+                "is_preliminary": m.get("is_preliminary", False),
+                "source": "CME Section 09 Interest Rate Futures",
+                "totals": {k: fields["cme_sec09"][k] for k in SEC09_ANCHORS if k in fields["cme_sec09"]},
+                "data_quality_notes": [n for n in m.get("data_quality_notes", []) if not n.startswith("text_layer_missing")]
+            }
+        }
+
+    sec11_raw = {}
+    if fields.get("cme_sec11"):
+        m = meta.get("cme_sec11", {})
+        products = {k: fields["cme_sec11"].get(k) for k in SEC11_ANCHORS}
+        # Recompute row-level gaps after all tiers ran
+        notes = [n for n in m.get("data_quality_notes", []) if not (n.startswith("Missing ") and n.endswith(" row"))]
+        notes += [f"Missing {k.upper()} row" for k, v in products.items() if not v]
+        sec11_raw = {
+            "bulletin_date": m.get("bulletin_date"),
+            "is_preliminary": m.get("is_preliminary", False),
+            "products": products,
+            "data_quality_notes": notes
+        }
+    return extracted_metrics, sec09_raw, sec11_raw
+
+def run_extraction(pdf_paths, live_metrics=None, use_vision=True):
+    """
+    Tiered extraction: text layer -> cached result for an identical PDF -> live data ->
+    targeted vision request for whatever is still missing.
+
+    Returns:
+        tuple: (extracted_metrics, sec09_raw, sec11_raw, provenance {field: tier})
+    """
+    live_metrics = live_metrics or {}
+    fields = {source: {} for source in SOURCE_FIELDS}
+    meta = {source: {} for source in SOURCE_FIELDS}
+    provenance = {}
+    hashes = {source: content_hash(path) for source, path in pdf_paths.items() if source in SOURCE_FIELDS}
+
+    def missing_for(source):
+        return [k for k in SOURCE_FIELDS[source] if fields[source].get(k) is None]
+
+    def fill(source, values, tier):
+        try:
+            valid, problems = validate(source, values or {}, missing_for(source))
+        except Exception as e:
+            print(f"Ignoring malformed {tier} output for {source}: {e}")
+            return
+        for k, v in valid.items():
+            fields[source][k] = v
+            provenance[k] = tier
+        rejected = {k: p for k, p in problems.items() if p != "missing"}
+        if rejected:
+            print(f"Ignoring invalid {tier} values for {source}: {rejected}")
+
+    # Tier 1: text layer
+    for source in hashes:
+        try:
+            values, text_meta = text_layer_strategy(source, pdf_paths[source])
+            fill(source, values, "text_layer")
+            meta[source].update(text_meta)
+        except Exception as e:
+            print(f"Text-layer parse failed for {source}: {e}")
+
+    # Tier 2: prior result for the identical PDF
+    for source, pdf_hash in hashes.items():
+        if not missing_for(source): continue
+        cached = load_cached_extraction(pdf_hash)
+        fill(source, cached.get("fields", {}), "cache")
+        for k, v in cached.get("meta", {}).items():
+            meta[source].setdefault(k, v)
+
+    # Tier 3: live market data for declared equivalents
+    for source in hashes:
+        live_values = {k: live_metrics.get(live_key) for k, live_key in LIVE_FIELD_FALLBACKS.items()}
+        fill(source, live_values, "live")
+
+    # Tier 4: targeted vision request for the remainder
+    missing = {source: missing_for(source) for source in hashes if missing_for(source)}
+    if missing and use_vision:
+        vision_fields, vision_meta = vision_strategy(pdf_paths, missing)
+        for source, values in vision_fields.items():
+            fill(source, values, "vision")
+        for source, m in vision_meta.items():
+            meta[source].update(m)
+
+    # Remember everything read from each PDF (live values are not tied to the document)
+    for source, pdf_hash in hashes.items():
+        from_doc = {k: v for k, v in fields[source].items() if provenance.get(k) != "live"}
+        if from_doc:
+            save_cached_extraction(pdf_hash, from_doc, meta[source])
+
+    counts = {}
+    for tier in provenance.values():
+        counts[tier] = counts.get(tier, 0) + 1
+    still_missing = [k for source in hashes for k in missing_for(source)]
+    print(f"Extraction tiers: {counts} | Still missing: {still_missing or 'none'}")
+
+    extracted_metrics, sec09_raw, sec11_raw = assemble_outputs(fields, meta)
+    return extracted_metrics, sec09_raw, sec11_raw, provenance
@@ -0,0 +1,108 @@
+import re
+
+from config import EXTRACTION_RANGES
+from prompts import EXTRACTION_FIELDS
+
+SEC09_COLUMNS = ["rth_volume", "globex_volume", "open_interest", "oi_change"]
+SEC11_COLUMNS = ["total_volume", "open_interest", "oi_change"]
+SEC09_ROWS = ["2y", "3y", "5y", "10y", "tn", "30y", "ultra"]
+SEC11_ROWS = ["es", "nq", "ym", "mid", "sml"]
+
+# EXTRACTION_FIELDS type names -> response schema types
+SCHEMA_TYPES = {"string": "string", "float": "number", "int": "integer"}
+NUMERIC_TOKEN = re.compile(r"[+-]?[\d,]+[+-]?|UNCH", re.IGNORECASE)
+
+# --- Response Schemas (Gemini structured output; OpenAPI subset) ---
+
+def fields_schema(keys):
+    """Flat object of EXTRACTION_FIELDS keys (EXTRACTION_PROMPT / targeted prompts)."""
+    return {
+        "type": "object",
+        "properties": {k: {"type": SCHEMA_TYPES[EXTRACTION_FIELDS[k][1]], "nullable": True} for k in keys},
+        "required": list(keys)
+    }
+
+def row_schema(source):
+    columns, col_type = (SEC09_COLUMNS, "string") if source == "cme_sec09" else (SEC11_COLUMNS, "integer")
+    properties = {"row_label": {"type": "string"}}
+    properties.update({c: {"type": col_type, "nullable": True} for c in columns})
+    return {"type": "object", "nullable": True, "properties": properties, "required": ["row_label"] + columns}
+
+def rows_schema(source, rows):
+    """{"rows": {row key: row}} (TARGETED_ROWS_PROMPT)."""
+    return {
+        "type": "object",
+        "properties": {"rows": {"type": "object", "properties": {k: row_schema(source) for k in rows}, "required": list(rows)}},
+        "required": ["rows"]
+    }
+
+def section_schema(source):
+    """Full-section output (EXTRACTION_PROMPT_SEC09 / EXTRACTION_PROMPT_SEC11)."""
+    rows = SEC09_ROWS if source == "cme_sec09" else SEC11_ROWS
+    body = {
+        "bulletin_date": {"type": "string", "nullable": True},
+        "is_preliminary": {"type": "boolean"},
+        "totals" if source == "cme_sec09" else "products": {
+            "type": "object", "properties": {k: row_schema(source) for k in rows}, "required": rows
+        },
+        "data_quality_notes": {"type": "array", "items": {"type": "string"}}
+    }
+    section = {"type": "object", "properties": body, "required": list(body)}
+    if source == "cme_sec09":
+        section["properties"]["source"] = {"type": "string"}
+        return {"type": "object", "properties": {"cme_section09": section}, "required": ["cme_section09"]}
+    return section
+
+# --- Validation ---
+
+REQUIRED_COLUMNS = ["open_interest", "oi_change"] # Volume cells may be empty ("----") on quiet rows
+
+def is_numeric_token(value):
+    if isinstance(value, bool): return False
+    if isinstance(value, (int, float)): return True
+    return isinstance(value, str) and NUMERIC_TOKEN.fullmatch(value.strip()) is not None
+
+def field_problem(source, key, value):
+    """Why an extracted value can't be used, or None if it can."""
+    if value is None:
+        return "missing"
+    if source in ("cme_sec09", "cme_sec11"):
+        if not isinstance(value, dict):
+            return "not a row object"
+        columns = SEC09_COLUMNS if source == "cme_sec09" else SEC11_COLUMNS
+        bad = [c for c in columns if not (is_numeric_token(value.get(c)) or (c not in REQUIRED_COLUMNS and value.get(c) in (None, "----")))]
+        if bad:
+            return f"unreadable {', '.join(bad)}"
+        if source == "cme_sec11" and any(value.get(c) < 0 for c in ["total_volume", "open_interest"] if isinstance(value.get(c), (int, float))):
+            return "negative volume or open interest"
+        return None
+
+    expected = EXTRACTION_FIELDS[key][1] if key in EXTRACTION_FIELDS else None
+    if expected == "string":
+        return None if isinstance(value, str) and value.strip() else "not a string"
+    if expected in ("float", "int"):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return f"not a number (got {value!r})"
+        low, high = EXTRACTION_RANGES.get(key, (None, None))
+        if (low is not None and value < low) or (high is not None and value > high):
+            return f"out of range [{low}, {high}] (got {value})"
+    return None
+
+def validate(source, values, keys):
+    """
+    Splits extracted values into usable ones and problems.
+
+    Returns:
+        tuple: ({key: value} for valid keys, {key: reason} for missing or invalid keys)
+    """
+    valid, problems = {}, {}
+    for k in keys:
+        try:
+            problem = field_problem(source, k, values.get(k))
+        except Exception as e:
+            problem = f"unreadable ({e})"
+        if problem:
+            problems[k] = problem
+        else:
+            valid[k] = values[k]
+    return valid, problems
@@ -0,0 +1,175 @@
+import os
+import re
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from config import (
+    CACHE_DIR, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES, HEDGE_DEFAULT_DELAY,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN
+)
+
+LATENCY_HISTORY_PATH = os.path.join(CACHE_DIR, "latency_history.json")
+BREAKER_PATH = os.path.join(CACHE_DIR, "circuit_breaker.json")
+MAX_LATENCY_SAMPLES = 50
+
+def is_error_summary(text):
+    """True for the error strings the summarize_* functions return instead of raising."""
+    return bool(re.match(r"^(Error\b|OpenRouter Error|Gemini Error|Gemini Upload Error|Failed:)", str(text).strip()))
+
+def is_valid_summary(text):
+    return bool(text) and not is_error_summary(text)
+
+def load_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Warning: Could not read {path}: {e}")
+        return {}
+
+def save_json(path, data):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Warning: Could not write {path}: {e}")
+
+# --- Latency History ---
+
+_history_lock = threading.Lock()
+
+def record_latency(model, seconds):
+    with _history_lock:
+        history = load_json(LATENCY_HISTORY_PATH)
+        history[model] = (history.get(model, []) + [round(seconds, 2)])[-MAX_LATENCY_SAMPLES:]
+        save_json(LATENCY_HISTORY_PATH, history)
+
+_request_state = threading.local()
+
+def mark_cache_hit():
+    """Called by a request fn that answered from the response cache: its time is not a latency sample."""
+    _request_state.cache_hit = True
+
+def hedge_delay(model, percentile=HEDGE_PERCENTILE):
+    """Seconds to wait for the primary before hedging: a high percentile of its past latencies."""
+    samples = sorted(load_json(LATENCY_HISTORY_PATH).get(model, []))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+    return samples[index]
+
+# --- Circuit Breaker ---
+
+class CircuitBreaker:
+    """
+    Per-provider consecutive-failure counter. A provider at the threshold is open (skipped as a
+    hedge target) until the cooldown passes; the next call then decides whether it closes again.
+    State is persisted so failures carry over between daily runs.
+    """
+
+    def __init__(self, path=None, threshold=BREAKER_FAILURE_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.path = path
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.state = load_json(path) if path else {}
+
+    def allow(self, provider):
+        with self.lock:
+            entry = self.state.get(provider, {})
+            if entry.get("failures", 0) < self.threshold:
+                return True
+            return time.time() - entry.get("opened_at", 0) >= self.cooldown
+
+    def record(self, provider, ok):
+        with self.lock:
+            entry = self.state.setdefault(provider, {"failures": 0})
+            if ok:
+                entry["failures"] = 0
+                entry.pop("opened_at", None)
+            else:
+                entry["failures"] = entry.get("failures", 0) + 1
+                if entry["failures"] >= self.threshold:
+                    if "opened_at" not in entry or time.time() - entry["opened_at"] >= self.cooldown:
+                        print(f"Circuit breaker open for {provider} after {entry['failures']} consecutive failures.")
+                    entry["opened_at"] = time.time()
+            if self.path:
+                save_json(self.path, self.state)
+
+BREAKER = CircuitBreaker(BREAKER_PATH)
+
+# --- Hedged Calls ---
+
+def hedged_call(primary, backup=None, delay=None, breaker=BREAKER):
+    """
+    Runs the primary request and, if it has no valid result after `delay` seconds (or fails
+    sooner), a backup request. The first valid result wins and the other request is cancelled.
+
+    Args:
+        primary, backup (tuple): (model, provider, fn) where fn(cancel_event) returns summary text.
+            fn should stop early once cancel_event is set; calls that cannot be interrupted are abandoned.
+            fn calls mark_cache_hit() when it answers without a provider round-trip.
+        delay (float): Seconds before hedging (default: hedge_delay of the primary model).
+
+    Returns:
+        tuple: (summary text, model that produced it)
+    """
+    delay = hedge_delay(primary[0]) if delay is None else delay
+    cancels = {}
+
+    def run(request):
+        model, provider, fn = request
+        started = time.monotonic()
+        _request_state.cache_hit = False
+        try:
+            text = fn(cancels[model])
+        except Exception as e:
+            text = f"Failed: {e}"
+        if cancels[model].is_set():
+            return text  # Lost the race: not a provider failure
+        ok = is_valid_summary(text)
+        breaker.record(provider, ok)
+        if ok and not _request_state.cache_hit:
+            record_latency(model, time.monotonic() - started)
+        return text
+
+    pool = ThreadPoolExecutor(max_workers=2)
+    cancels[primary[0]] = threading.Event()
+    futures = {pool.submit(run, primary): primary}
+    try:
+        done, _ = wait(futures, timeout=delay)
+        first = next(iter(futures))
+        if done and is_valid_summary(first.result()):
+            return first.result(), primary[0]
+
+        if backup and backup[0] != primary[0]:
+            if breaker.allow(backup[1]):
+                reason = "failed" if done else f"exceeded its {delay:.0f}s hedge delay"
+                print(f"{primary[0]} {reason}; sending backup request to {backup[0]}...")
+                cancels[backup[0]] = threading.Event()
+                futures[pool.submit(run, backup)] = backup
+            else:
+                print(f"Not hedging to {backup[0]}: circuit breaker open for {backup[1]}.")
+
+        results = {}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                model = futures[future][0]
+                results[model] = future.result()
+                if is_valid_summary(results[model]):
+                    for other, event in cancels.items():
+                        if other != model: event.set()
+                    return results[model], model
+        # Nothing valid: surface the primary's error
+        return results[primary[0]], primary[0]
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
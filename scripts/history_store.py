@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import threading
+import pandas as pd
+
+from config import CACHE_DIR
+
+HISTORY_STORE_PATH = os.path.join(CACHE_DIR, "market_history.sqlite")
+BAR_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+class MarketHistoryStore:
+    """
+    Daily OHLCV bars per ticker in a local SQLite file, one row per (ticker, session date).
+
+    The live snapshot only downloads the sessions after what is already stored, and the
+    derivations read their history from here. Re-appending a session overwrites it, so a
+    partial intraday bar is replaced by the final close on the next run.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or HISTORY_STORE_PATH
+        self.lock = threading.Lock()
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS bars ("
+            "ticker TEXT NOT NULL, date TEXT NOT NULL, "
+            "open REAL, high REAL, low REAL, close REAL NOT NULL, volume REAL, "
+            "PRIMARY KEY (ticker, date))"
+        )
+        return conn
+
+    def last_dates(self, tickers):
+        """Latest stored session date ('YYYY-MM-DD') per ticker; tickers with no history are omitted."""
+        with self.lock:
+            conn = self.connect()
+            try:
+                rows = conn.execute(
+                    f"SELECT ticker, MAX(date) FROM bars WHERE ticker IN ({','.join('?' * len(tickers))}) GROUP BY ticker",
+                    list(tickers)
+                ).fetchall()
+            finally:
+                conn.close()
+        return {ticker: date for ticker, date in rows}
+
+    def fetch_start(self, tickers):
+        """
+        Start date for an incremental download covering every ticker.
+
+        Returns:
+            str: The oldest of the tickers' latest stored sessions (re-fetched, as it may
+            have been a partial bar), or None if any ticker has no history yet.
+        """
+        last = self.last_dates(tickers)
+        if not tickers or any(ticker not in last for ticker in tickers):
+            return None
+        return min(last.values())
+
+    def append(self, ticker, hist):
+        """
+        Stores `hist` (a yfinance frame for one ticker) and returns the number of sessions written.
+        """
+        rows = []
+        for ts, bar in hist.iterrows():
+            if pd.isna(bar.get("Close")): continue
+            values = [None if pd.isna(bar.get(field)) else float(bar.get(field)) for field in BAR_FIELDS]
+            rows.append([ticker, pd.Timestamp(ts).strftime("%Y-%m-%d")] + values)
+        if not rows:
+            return 0
+        with self.lock:
+            conn = self.connect()
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            finally:
+                conn.close()
+        return len(rows)
+
+    def history(self, ticker):
+        """
+        Stored bars for `ticker`, oldest first.
+
+        Returns:
+            pd.DataFrame: Open/High/Low/Close/Volume indexed by session date (empty if none).
+        """
+        with self.lock:
+            conn = self.connect()
+            try:
+                rows = conn.execute(
+                    "SELECT date, open, high, low, close, volume FROM bars WHERE ticker = ? ORDER BY date",
+                    (ticker,)
+                ).fetchall()
+            finally:
+                conn.close()
+        index = pd.DatetimeIndex([row[0] for row in rows])
+        return pd.DataFrame([row[1:] for row in rows], index=index, columns=BAR_FIELDS, dtype=float)
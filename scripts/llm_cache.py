@@ -0,0 +1,86 @@
+import os
+import json
+import time
+import hashlib
+
+from config import CACHE_DIR, LLM_CACHE_BYPASS, LLM_CACHE_TTL_HOURS, LLM_CACHE_MAX_MB
+
+LLM_CACHE_DIR = os.path.join(CACHE_DIR, "llm_responses")
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def response_key(model, prompt, inputs, generation_config=None):
+    """
+    Content address of an LLM call.
+
+    Args:
+        model (str): Model ID.
+        prompt (str): Full prompt text.
+        inputs (list): Identifiers of every attached input, in request order
+            (e.g. "wisdomtree:pdf:<sha256>", "image/png:<sha256 of the base64 data>").
+        generation_config (dict): Request settings that shape the response (e.g. the JSON
+            response schema), if any.
+    """
+    key = {"model": model, "prompt": text_hash(prompt), "inputs": list(inputs)}
+    if generation_config:
+        key["generation_config"] = text_hash(json.dumps(generation_config, sort_keys=True))
+    return text_hash(json.dumps(key))
+
+def image_id(mime, base64_img):
+    return f"{mime}:{text_hash(base64_img)}"
+
+def response_path(key):
+    return os.path.join(LLM_CACHE_DIR, f"{key}.json")
+
+def load_response(key, bypass=None, ttl_hours=None):
+    """Returns the cached response for the key, or None if missing, expired or bypassed."""
+    bypass = LLM_CACHE_BYPASS if bypass is None else bypass
+    ttl_hours = LLM_CACHE_TTL_HOURS if ttl_hours is None else ttl_hours
+    if bypass:
+        return None
+    path = response_path(key)
+    try:
+        with open(path, "r") as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Warning: Could not read cached LLM response: {e}")
+        return None
+    if time.time() - entry["created_at"] > ttl_hours * 3600:
+        return None
+    os.utime(path)  # Bump recency for LRU eviction
+    print(f"Using cached {entry['model']} response ({key[:12]}).")
+    return entry["response"]
+
+def save_response(key, model, response, max_mb=None):
+    max_mb = LLM_CACHE_MAX_MB if max_mb is None else max_mb
+    try:
+        os.makedirs(LLM_CACHE_DIR, exist_ok=True)
+        path = response_path(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"model": model, "created_at": time.time(), "response": response}, f)
+        os.replace(tmp_path, path)
+        evict_responses(max_mb * 1024 * 1024)
+    except Exception as e:
+        print(f"Warning: Could not write cached LLM response: {e}")
+
+def evict_responses(max_bytes):
+    """Deletes expired entries, then least recently used ones until the cache fits max_bytes."""
+    files = []
+    now = time.time()
+    for name in os.listdir(LLM_CACHE_DIR):
+        if name.endswith(".tmp"): continue
+        path = os.path.join(LLM_CACHE_DIR, name)
+        st = os.stat(path)
+        if now - st.st_mtime > LLM_CACHE_TTL_HOURS * 3600:
+            os.remove(path)
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes: break
+        os.remove(path)
+        total -= size
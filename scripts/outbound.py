@@ -0,0 +1,127 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import requests
+
+from config import RATE_LIMITS, DEFAULT_RATE_LIMIT, RETRYABLE_STATUS, RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY
+
+# --- Token Buckets ---
+
+class TokenBucket:
+    """Allows `rate` calls per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def bucket_for(host):
+    with _buckets_lock:
+        if host not in _buckets:
+            _buckets[host] = TokenBucket(*RATE_LIMITS.get(host, DEFAULT_RATE_LIMIT))
+        return _buckets[host]
+
+def host_of(url):
+    return urlparse(url).hostname or url
+
+# --- Retry Classification ---
+
+def retry_after_seconds(response):
+    """Retry-After as seconds (delta-seconds or HTTP-date form), or None."""
+    value = response.headers.get("Retry-After")
+    if not value: return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+# google.api_core (Gemini) and yfinance exception names, matched by name so neither client is imported here
+RETRYABLE_ERRORS = ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError", "BadGateway", "YFRateLimitError")
+
+class IncompleteResult(Exception):
+    """
+    Raised from a send() fn whose call returned without error but with part of the data
+    missing (e.g. yf.download swallowing per-ticker rate limits). Retried like a rate-limit
+    error; the partial result rides along so the caller can fall back to it.
+    """
+
+    def __init__(self, message, result):
+        super().__init__(message)
+        self.result = result
+
+def is_retryable_exception(e):
+    """
+    Connection failures and rate-limit/unavailable errors from the Gemini and yfinance clients.
+
+    Read timeouts are not retried: a model that is slow to answer is governed by the caller's
+    own deadline (hedging, arena, extraction timeout), not by repeating the request.
+    """
+    if isinstance(e, (requests.ConnectionError, IncompleteResult)):
+        return True
+    return type(e).__name__ in RETRYABLE_ERRORS
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter: uniform in [0, base * 2^attempt], capped."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+
+# --- Calls ---
+
+def send(host, fn, attempts=None, retry_exceptions=True):
+    """
+    Calls fn() under the host's token bucket, retrying retryable failures.
+
+    A requests.Response with a status in RETRYABLE_STATUS is retried (honouring Retry-After);
+    retryable exceptions are retried when retry_exceptions is set. Once attempts run out,
+    the last response is returned or the last exception re-raised, so callers keep their
+    existing error handling.
+
+    Args:
+        host (str): Throttle key (URL hostname, or "gemini" / "yfinance" for client libraries).
+        fn (callable): Zero-argument call doing one request.
+    """
+    attempts = attempts or RETRY_ATTEMPTS
+    bucket = bucket_for(host)
+    for attempt in range(attempts):
+        bucket.acquire()
+        last_try = attempt == attempts - 1
+        try:
+            result = fn()
+        except Exception as e:
+            if last_try or not retry_exceptions or not is_retryable_exception(e):
+                raise
+            delay = backoff_delay(attempt)
+            print(f"{host}: {type(e).__name__} ({e}). Retrying in {delay:.1f}s ({attempt + 1}/{attempts - 1})...")
+            time.sleep(delay)
+            continue
+
+        status = getattr(result, "status_code", None)
+        if last_try or status not in RETRYABLE_STATUS:
+            return result
+        retry_after = retry_after_seconds(result)
+        delay = min(RETRY_MAX_DELAY, retry_after) if retry_after is not None else backoff_delay(attempt)
+        print(f"{host}: HTTP {status}. Retrying in {delay:.1f}s ({attempt + 1}/{attempts - 1})...")
+        result.close()
+        time.sleep(delay)
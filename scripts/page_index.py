@@ -0,0 +1,81 @@
+import os
+import json
+import tempfile
+import fitz  # PyMuPDF
+
+from config import CACHE_DIR
+from downloader import content_hash
+
+PAGE_INDEX_DIR = os.path.join(CACHE_DIR, "page_index")
+
+# In-process copies, keyed by PDF content hash
+_INDEXES = {}
+
+def build_page_index(pdf_path):
+    """
+    Inverted keyword index of the PDF text layer.
+
+    Returns:
+        dict: {"page_count": int, "keywords": {uppercased word: [0-based page indexes]}}
+    """
+    keywords = {}
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+        for page_num, page in enumerate(doc):
+            for word in {w[4].upper() for w in page.get_text("words")}:
+                keywords.setdefault(word, []).append(page_num)
+    return {"page_count": page_count, "keywords": keywords}
+
+def index_path(pdf_hash):
+    return os.path.join(PAGE_INDEX_DIR, f"{pdf_hash}.json")
+
+def load_page_index(pdf_path):
+    """Returns the page index for the PDF, building it once per content hash."""
+    pdf_hash = content_hash(pdf_path)
+    if pdf_hash in _INDEXES:
+        return _INDEXES[pdf_hash]
+
+    index = None
+    try:
+        with open(index_path(pdf_hash), "r") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Warning: Could not read page index: {e}")
+
+    if index is None:
+        index = build_page_index(pdf_path)
+        tmp_path = None
+        try:
+            os.makedirs(PAGE_INDEX_DIR, exist_ok=True)
+            # Unique temp file: extraction and summarization threads may index the same PDF at once
+            fd, tmp_path = tempfile.mkstemp(dir=PAGE_INDEX_DIR, suffix=".json.tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, index_path(pdf_hash))
+        except Exception as e:
+            print(f"Warning: Could not write page index: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    _INDEXES[pdf_hash] = index
+    return index
+
+def relevant_pages(pdf_path, anchors):
+    """
+    Pages that contain every word of at least one anchor.
+
+    Returns:
+        list: Sorted 0-based page indexes (empty if no anchor is found, e.g. no text layer).
+    """
+    keywords = load_page_index(pdf_path)["keywords"]
+    pages = set()
+    for anchor in anchors:
+        hits = [set(keywords.get(word, [])) for word in anchor.upper().split()]
+        if hits:
+            pages |= set.intersection(*hits)
+    return sorted(pages)
+
+def page_count(pdf_path):
+    return load_page_index(pdf_path)["page_count"]
@@ -0,0 +1,149 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+import fitz  # PyMuPDF
+import google.generativeai as genai
+
+from config import CACHE_DIR, GEMINI_UPLOAD_PERSIST, GEMINI_FILE_TTL_HOURS, GEMINI_UPLOAD_EXPIRY_MARGIN_MINUTES
+from downloader import content_hash
+from outbound import send
+
+SUBSET_DIR = os.path.join(CACHE_DIR, "subsets")
+REGISTRY_PATH = os.path.join(CACHE_DIR, "gemini_uploads.json")
+
+def subset_path(pdf_hash, pages):
+    page_key = hashlib.sha256(",".join(str(p) for p in pages).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(SUBSET_DIR, f"{pdf_hash}_{page_key}.pdf")
+
+def subset_pdf(pdf_path, pages):
+    """
+    Writes a compacted copy of the PDF holding only `pages` (garbage collected, deflated),
+    cached by (source content hash, page set).
+
+    Returns:
+        str: Path of the subset, or pdf_path itself when pages is None or selects every page.
+    """
+    if pages is None:
+        return pdf_path
+    pages = sorted(set(pages))
+    pdf_hash = content_hash(pdf_path)
+    path = subset_path(pdf_hash, pages)
+    if os.path.exists(path):
+        return path
+
+    tmp_path = None
+    try:
+        with fitz.open(pdf_path) as doc:
+            pages = [p for p in pages if 0 <= p < len(doc)]
+            if not pages or len(pages) == len(doc):
+                return pdf_path
+            doc.select(pages)
+            os.makedirs(SUBSET_DIR, exist_ok=True)
+            # Unique temp file: concurrent extraction passes may subset the same PDF at once
+            fd, tmp_path = tempfile.mkstemp(dir=SUBSET_DIR, suffix=".pdf.tmp")
+            os.close(fd)
+            doc.save(tmp_path, garbage=4, deflate=True)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Warning: Could not subset {pdf_path}, uploading the full PDF: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return pdf_path
+
+    print(f"Subset {pdf_path}: {len(pages)} pages, {os.path.getsize(pdf_path) // 1024} KB -> {os.path.getsize(path) // 1024} KB")
+    return path
+
+# --- Upload Registry ---
+
+class UploadRegistry:
+    """
+    Gemini file handles keyed by the content hash of the uploaded file, so each distinct
+    PDF is uploaded once per run. With a path, handle names and their server-side expiry
+    are persisted and reused by later runs until they expire.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.handles = {}
+        self.key_locks = {}
+        self.uploads = 0
+        self.reuses = 0
+        self.lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Warning: Could not read upload registry: {e}")
+            return {}
+
+    def save_entry(self, sha, handle):
+        expires_at = getattr(handle, "expiration_time", None) or datetime.now(timezone.utc) + timedelta(hours=GEMINI_FILE_TTL_HOURS)
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        with self.lock:
+            entries = self.load()
+            entries[sha] = {"name": handle.name, "expires_at": expires_at.isoformat()}
+            # Drop handles the server has already deleted
+            now = datetime.now(timezone.utc)
+            entries = {k: v for k, v in entries.items() if datetime.fromisoformat(v["expires_at"]) > now}
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(entries, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"Warning: Could not write upload registry: {e}")
+
+    def persisted_handle(self, sha):
+        """Handle from an earlier run, if it is still comfortably inside its retention window."""
+        entry = self.load().get(sha)
+        if not entry: return None
+        expires_at = datetime.fromisoformat(entry["expires_at"])
+        if expires_at <= datetime.now(timezone.utc) + timedelta(minutes=GEMINI_UPLOAD_EXPIRY_MARGIN_MINUTES):
+            return None
+        try:
+            handle = send("gemini", lambda: genai.get_file(entry["name"]))
+            state = getattr(getattr(handle, "state", None), "name", "ACTIVE")
+            return handle if state == "ACTIVE" else None
+        except Exception as e:
+            print(f"Stored upload {entry['name']} unavailable, uploading again: {e}")
+            return None
+
+    def get_or_upload(self, name, upload_path):
+        sha = content_hash(upload_path)
+        with self.lock:
+            key_lock = self.key_locks.setdefault(sha, threading.Lock())
+        with key_lock:
+            if sha in self.handles:
+                self.reuses += 1
+                print(f"Reusing upload for {name} ({self.handles[sha].name})")
+                return self.handles[sha]
+            handle = self.persisted_handle(sha) if self.path else None
+            if handle is not None:
+                self.reuses += 1
+                print(f"Reusing upload for {name} from a previous run ({handle.name})")
+            else:
+                print(f"Uploading {name} ({upload_path})...")
+                handle = send("gemini", lambda: genai.upload_file(upload_path, mime_type="application/pdf"))
+                self.uploads += 1
+                if self.path: self.save_entry(sha, handle)
+            self.handles[sha] = handle
+            return handle
+
+UPLOAD_REGISTRY = UploadRegistry(REGISTRY_PATH if GEMINI_UPLOAD_PERSIST else None)
+
+def upload_id(name, pdf_path, pages=None):
+    """Response-cache identifier of what upload_pdf would send (the subset's content hash)."""
+    return f"{name}:pdf:{content_hash(subset_pdf(pdf_path, pages))}"
+
+def upload_pdf(name, pdf_path, pages=None, registry=UPLOAD_REGISTRY):
+    """Uploads the PDF to Gemini, reduced to `pages` first (None uploads every page), at most once per content."""
+    return registry.get_or_upload(name, subset_pdf(pdf_path, pages))
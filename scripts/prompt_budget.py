@@ -0,0 +1,78 @@
+import json
+import math
+
+from config import (
+    PROMPT_FIELDS, PROMPT_TRIM_ORDER, PROMPT_BUDGET_MODE, DEFAULT_PROMPT_TOKEN_BUDGET,
+    PROMPT_TOKEN_BUDGETS, PROMPT_BYTES_PER_TOKEN
+)
+
+# --- Serialization ---
+
+def prune(value, fields):
+    """Keeps only the allowlisted keys of a nested dict (fields=True keeps the value whole)."""
+    if fields is True or not isinstance(value, dict):
+        return value
+    return {k: prune(value[k], sub) for k, sub in fields.items() if k in value}
+
+def compact_json(value):
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+def drop_path(contexts, path):
+    """Removes contexts[path[0]][path[1]]...; returns False if the path does not exist."""
+    node = contexts
+    for key in path[:-1]:
+        node = node.get(key) if isinstance(node, dict) else None
+        if node is None: return False
+    if not isinstance(node, dict) or path[-1] not in node:
+        return False
+    del node[path[-1]]
+    return True
+
+# --- Budget ---
+
+def estimate_tokens(text):
+    return math.ceil(len(text.encode("utf-8")) / PROMPT_BYTES_PER_TOKEN)
+
+def token_budget(model=None):
+    """Prompt-text token budget for `model` (0 = unlimited)."""
+    return PROMPT_TOKEN_BUDGETS.get(model, DEFAULT_PROMPT_TOKEN_BUDGET)
+
+def assemble_prompt(prompt_type, prefix, suffix_template, contexts, model=None, mode=None):
+    """
+    Prunes each context to the prompt type's allowlist, serializes it compactly and fills the per-day suffix.
+
+    Args:
+        prompt_type (str): Key of PROMPT_FIELDS ("summary", "benchmark", "benchmark_json").
+        prefix (str): Static system prompt (identical across days; providers cache it).
+        suffix_template (str): Formatted with `<context name>_json` for each context the type lists.
+        contexts (dict): {"ground_truth": ..., "event_context": ...}; contexts the type does not list are left out.
+        model (str): Selects the token budget (None = default budget).
+        mode (str): "warn" or "trim" (defaults to PROMPT_BUDGET_MODE).
+
+    Returns:
+        tuple: (prefix, suffix). The combined size is printed; over budget it is either reported
+        or the suffix is trimmed along PROMPT_TRIM_ORDER until it fits.
+    """
+    mode = mode or PROMPT_BUDGET_MODE
+    fields = PROMPT_FIELDS[prompt_type]
+    pruned = {name: prune(contexts.get(name) or {}, spec) for name, spec in fields.items()}
+    render = lambda: suffix_template.format(**{f"{name}_json": compact_json(value) for name, value in pruned.items()})
+    suffix = render()
+    tokens = estimate_tokens(prefix + suffix)
+    budget = token_budget(model)
+
+    trimmed = []
+    if budget and tokens > budget and mode == "trim":
+        for path in PROMPT_TRIM_ORDER:
+            if tokens <= budget: break
+            if not drop_path(pruned, path): continue
+            trimmed.append(".".join(path))
+            suffix = render()
+            tokens = estimate_tokens(prefix + suffix)
+
+    label = f"{prompt_type} prompt" + (f" for {model}" if model else "")
+    print(f"{label}: {len((prefix + suffix).encode('utf-8'))} bytes (static prefix {len(prefix.encode('utf-8'))}), ~{tokens} tokens (budget {budget or 'none'})"
+          + (f"; trimmed {', '.join(trimmed)}" if trimmed else ""))
+    if budget and tokens > budget:
+        print(f"Warning: {label} is over its token budget ({tokens} > {budget}).")
+    return prefix, suffix
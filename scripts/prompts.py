@@ -1,5 +1,55 @@
 # --- Prompts ---
 
+# Field schema of EXTRACTION_PROMPT (and its response schema): key -> (source document, type, description)
+EXTRACTION_FIELDS = {
+    "wisdomtree_as_of_date": ("wisdomtree", "string", '"As of" date found on WisdomTree dashboard (e.g. "Dec 19, 2025")'),
+    "hy_spread_current": ("wisdomtree", "float", "High Yield Spread (e.g. 2.84)"),
+    "hy_spread_median": ("wisdomtree", "float", "Historical Median HY Spread"),
+    "forward_pe_current": ("wisdomtree", "float", "S&P 500 Forward P/E"),
+    "forward_pe_median": ("wisdomtree", "float", "S&P 500 Forward P/E Median"),
+    "forward_pe_plus_1sigma": ("wisdomtree", "float", "S&P 500 Forward P/E +1 Sigma (Standard Deviation)"),
+    "real_yield_10y": ("wisdomtree", "float", "10-Year Real Yield (TIPS)"),
+    "inflation_expectations_5y5y": ("wisdomtree", "float", "5y5y Forward Inflation Expectation"),
+    "yield_10y": ("wisdomtree", "float", "10-Year Treasury Nominal Yield"),
+    "yield_2y": ("wisdomtree", "float", "2-Year Treasury Nominal Yield"),
+    "interest_coverage_small_cap": ("wisdomtree", "float", "S&P 600 Interest Coverage Ratio"),
+    "cme_bulletin_date": ("cme_sec01", "string", 'Date at top of CME report (e.g. "2025-12-19")'),
+    "cme_total_volume": ("cme_sec01", "int", '"OVERALL VOLUME" column for "CME GROUP TOTALS" row'),
+    "cme_total_open_interest": ("cme_sec01", "int", '"COMBINED TOTAL" -> "OPEN INTEREST" column for "CME GROUP TOTALS" row'),
+    "cme_total_oi_net_change": ("cme_sec01", "int", '"COMBINED TOTAL" -> "NET CHGE OI" column for "CME GROUP TOTALS" row'),
+    "cme_totals_audit_label": ("cme_sec01", "string", 'The exact row label matched (should be "CME GROUP TOTALS")'),
+    "cme_rates_futures_oi_change": ("cme_sec01", "int", 'Table "FUTURES ONLY" -> Row "INTEREST RATES" -> Column "NET CHGE OI"'),
+    "cme_rates_futures_audit_label": ("cme_sec01", "string", 'The exact row label matched (should be "INTEREST RATES")'),
+    "cme_rates_options_oi_change": ("cme_sec01", "int", 'Table "OPTIONS ONLY" -> Row "INTEREST RATES" -> Column "NET CHGE OI"'),
+    "cme_rates_options_audit_label": ("cme_sec01", "string", 'The exact row label matched (should be "INTEREST RATES")'),
+    "cme_equity_futures_oi_change": ("cme_sec01", "int", 'Table "FUTURES ONLY" -> Row "EQUITY INDEX" -> Column "NET CHGE OI"'),
+    "cme_equity_futures_audit_label": ("cme_sec01", "string", 'The exact row label matched (should be "EQUITY INDEX")'),
+    "cme_equity_options_oi_change": ("cme_sec01", "int", 'Table "OPTIONS ONLY" -> Row "EQUITY INDEX" -> Column "NET CHGE OI"'),
+    "cme_equity_options_audit_label": ("cme_sec01", "string", 'The exact row label matched (should be "EQUITY INDEX")')
+}
+
+# Comment lines printed above a key in EXTRACTION_PROMPT's key block
+EXTRACTION_FIELD_NOTES = {
+    "wisdomtree_as_of_date": ["// From WisdomTree Dashboard"],
+    "cme_bulletin_date": ["", "// From CME Section 01 Report"],
+    "cme_total_volume": [
+        "", "// --- CME Group Overall Totals ---",
+        '// Look for the "CME GROUP TOTALS" section, specifically the "CME GROUP TOTALS" row.'
+    ],
+    "cme_rates_futures_oi_change": ["", "// --- Specific Asset Class Changes (Net Change Column) ---", "", "// 1. INTEREST RATES"],
+    "cme_equity_futures_oi_change": ["", "// 2. EQUITY INDEX"]
+}
+
+def field_lines(keys, notes=None):
+    """JSON-like key block lines (`"key": type, // description`) for the given EXTRACTION_FIELDS keys."""
+    lines = []
+    keys = list(keys)
+    for i, key in enumerate(keys):
+        lines.extend(f"  {note}".rstrip() for note in (notes or {}).get(key, []))
+        _, kind, description = EXTRACTION_FIELDS[key]
+        lines.append(f'  "{key}": {kind}{"," if i < len(keys) - 1 else ""} // {description}')
+    return lines
+
 EXTRACTION_PROMPT = """
 You are a precision data extractor. Your job is to read the attached PDF pages (Financial Dashboard + CME Reports) and extract specific numerical data into valid JSON.
 
@@ -11,44 +61,7 @@ You are a precision data extractor. Your job is to read the attached PDF pages (
 Extract the following keys:
 
 {
-  // From WisdomTree Dashboard
-  "wisdomtree_as_of_date": string, // "As of" date found on WisdomTree dashboard (e.g. "Dec 19, 2025")
-  "hy_spread_current": float, // High Yield Spread (e.g. 2.84)
-  "hy_spread_median": float, // Historical Median HY Spread
-  "forward_pe_current": float, // S&P 500 Forward P/E
-  "forward_pe_median": float, // S&P 500 Forward P/E Median
-  "forward_pe_plus_1sigma": float, // S&P 500 Forward P/E +1 Sigma (Standard Deviation)
-  "real_yield_10y": float, // 10-Year Real Yield (TIPS)
-  "inflation_expectations_5y5y": float, // 5y5y Forward Inflation Expectation
-  "yield_10y": float, // 10-Year Treasury Nominal Yield
-  "yield_2y": float, // 2-Year Treasury Nominal Yield
-  "interest_coverage_small_cap": float, // S&P 600 Interest Coverage Ratio
-  
-  // From CME Section 01 Report
-  "cme_bulletin_date": string, // Date at top of CME report (e.g. "2025-12-19")
-  
-  // --- CME Group Overall Totals ---
-  // Look for the "CME GROUP TOTALS" section, specifically the "CME GROUP TOTALS" row.
-  "cme_total_volume": int, // "OVERALL VOLUME" column for "CME GROUP TOTALS" row
-  "cme_total_open_interest": int, // "COMBINED TOTAL" -> "OPEN INTEREST" column for "CME GROUP TOTALS" row
-  "cme_total_oi_net_change": int, // "COMBINED TOTAL" -> "NET CHGE OI" column for "CME GROUP TOTALS" row
-  "cme_totals_audit_label": string, // The exact row label matched (should be "CME GROUP TOTALS")
-
-  // --- Specific Asset Class Changes (Net Change Column) ---
-  
-  // 1. INTEREST RATES
-  "cme_rates_futures_oi_change": int, // Table "FUTURES ONLY" -> Row "INTEREST RATES" -> Column "NET CHGE OI"
-  "cme_rates_futures_audit_label": string, // The exact row label matched (should be "INTEREST RATES")
-  
-  "cme_rates_options_oi_change": int, // Table "OPTIONS ONLY" -> Row "INTEREST RATES" -> Column "NET CHGE OI"
-  "cme_rates_options_audit_label": string, // The exact row label matched (should be "INTEREST RATES")
-  
-  // 2. EQUITY INDEX
-  "cme_equity_futures_oi_change": int, // Table "FUTURES ONLY" -> Row "EQUITY INDEX" -> Column "NET CHGE OI"
-  "cme_equity_futures_audit_label": string, // The exact row label matched (should be "EQUITY INDEX")
-  
-  "cme_equity_options_oi_change": int, // Table "OPTIONS ONLY" -> Row "EQUITY INDEX" -> Column "NET CHGE OI"
-  "cme_equity_options_audit_label": string  // The exact row label matched (should be "EQUITY INDEX")
+""" + "\n".join(field_lines(EXTRACTION_FIELDS, EXTRACTION_FIELD_NOTES)) + """
 }
 """
 
@@ -154,6 +167,49 @@ Extraction Rules:
 5. If a product is not found, set its value to null.
 """
 
+# --- Targeted Extraction (only keys earlier extraction tiers could not fill) ---
+
+TARGETED_EXTRACTION_PROMPT = """
+You are a precision data extractor. Earlier passes already read most values from the attached documents; only the keys below are still missing.
+
+- DO NOT provide commentary, analysis, or summary.
+- ONLY return a valid JSON object containing exactly these keys.
+- Extract numbers as decimals.
+- If a value is missing or unreadable, use `null`.
+
+Extract the following keys:
+
+{{
+{fields}
+}}
+"""
+
+TARGETED_ROWS_PROMPT = """
+You are a precision data extractor for the CME Daily Bulletin ({section}).
+Earlier passes already read the other rows; extract ONLY the rows listed below.
+
+ANCHOR RULES:
+1. Locate each exact row label listed below.
+2. From that row, take the LAST numeric-ish tokens, which map to the columns: {columns}.
+   - A token ending in "+" or "-" carries the sign of the NEXT number ("49139- 42" is 49139 followed by -42).
+   - "UNCH" means 0. "----" or empty is null.
+3. If a row is not found, set it to null.
+
+JSON OUTPUT SCHEMA:
+{{
+  "rows": {{
+{rows}
+  }}
+}}
+"""
+
+# Prepended to a targeted prompt when an earlier pass returned these keys missing or invalid
+REASK_NOTE = """
+A previous read of these documents could not use the values below:
+{problems}
+Look again at the exact labels. Return null only if the value is genuinely not shown.
+"""
+
 BENCHMARK_DATA_SYSTEM_PROMPT = """
 Role: You are a macro strategist for a top-tier hedge fund.
 Task: Analyze the provided Ground Truth Data (JSON) to produce a strategic, easy-to-digest market outlook.
@@ -279,15 +335,9 @@ INPUTS PROVIDED (Vision):
    - **Section 09:** Interest Rate Futures (Yield Curve positioning).
    - **Section 11:** Equity Index Futures (S&P, Nasdaq, Dow flows).
 
-CRITICAL: You have been provided with PRE-CALCULATED Ground Truth Scores, raw Extracted Metrics, and deterministic Signal Labels below.
+CRITICAL: You have been provided with PRE-CALCULATED Ground Truth Scores, raw Extracted Metrics, and deterministic Signal Labels at the end of this prompt.
 You MUST use these exact scores and signals. Do NOT attempt to recalculate them.
 
-Ground Truth & Extracted Metrics (Use these values exactly):
-{ground_truth_json}
-
-EVENT CONTEXT (Deterministic Flags):
-{event_context_json}
-
 # === BLOCK 0: EVENT RISK GATES ===
 
 *   **IF "TRIPLE_WITCHING" or "MONTHLY_OPEX" is present (Today or Recent):**
@@ -334,7 +384,7 @@ Do NOT include any verification data, raw metrics, or event flags in your output
 
 ### 1. The Dashboard (Scoreboard) [SECTION:DASHBOARD]
 
-Create a table with these 6 Dials. USE THE PRE-CALCULATED SCORES PROVIDED ABOVE.
+Create a table with these 6 Dials. USE THE PRE-CALCULATED SCORES PROVIDED AT THE END OF THIS PROMPT.
 *In the 'Justification' column, reference the visual evidence from the CME images (Volume/OI) to support the score.*
 
 **Constraint:** You must ONLY cite numbers present in the `extracted_metrics` JSON. Do NOT "discover" or hallucinate numbers from the PDF text layer unless they are explicitly in the Ground Truth.
@@ -383,3 +433,28 @@ Create a table with these 6 Dials. USE THE PRE-CALCULATED SCORES PROVIDED ABOVE.
 ### 8. Conclusion & Trade Tilt [SECTION:CONCLUSION]
 [Cross-Asset Confirmation, Risk Rating, The Trade, Triggers]
 """
+
+# --- Per-Day Suffixes ---
+# The system prompts above are static so providers can cache them as a prefix; the day's
+# data is appended after them (and after any attached documents).
+
+SUMMARY_DATA_SUFFIX = """
+Ground Truth & Extracted Metrics (Use these values exactly):
+{ground_truth_json}
+
+EVENT CONTEXT (Deterministic Flags):
+{event_context_json}
+"""
+
+BENCHMARK_SUFFIX = """
+
+Event Context:
+{event_context_json}"""
+
+BENCHMARK_DATA_SUFFIX = """
+
+Ground Truth Data:
+{ground_truth_json}
+
+Event Context:
+{event_context_json}"""
@@ -0,0 +1,432 @@
+import os
+import io
+import json
+import math
+import base64
+import hashlib
+import atexit
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+
+from config import (
+    CACHE_DIR, RENDER_CACHE_MAX_MB, RENDER_CACHE_DISK, RENDER_CACHE_DISK_MAX_MB, RENDER_WORKERS, RENDER_PARALLEL_MIN_PAGES,
+    DEFAULT_IMAGE_PROFILE, IMAGE_PROFILES, VISION_PAYLOAD_BUDGET_MB, VISION_MIN_DPI,
+    CROP_MARGIN_PT, CROP_HEADER_PT, WISDOMTREE_TILE_PT, WISDOMTREE_TILE_ANCHORS
+)
+from downloader import content_hash
+from cme_parser import SEC01_TABLES, SEC01_ROWS, SEC09_ANCHORS, SEC11_ANCHORS
+from page_index import relevant_pages
+
+try:
+    from PIL import Image  # Optional: only needed for WebP output
+except ImportError:
+    Image = None
+
+# --- Render Cache ---
+
+class RenderCache:
+    """
+    Size-bounded LRU of rendered pages, keyed by (pdf hash, page index, profile tag, format).
+    Values are base64 strings; the optional disk tier stores the raw image bytes.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None, disk_max_bytes=0):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def disk_path(self, key):
+        pdf_hash, page_num, tag, fmt = key
+        return os.path.join(self.disk_dir, f"{pdf_hash}_{page_num}_{tag}.{fmt}")
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+        if self.disk_dir:
+            path = self.disk_path(key)
+            try:
+                with open(path, "rb") as f:
+                    value = base64.b64encode(f.read()).decode('utf-8')
+                os.utime(path)  # Bump recency for disk eviction
+                self.put(key, value, persist=False)
+                with self.lock:
+                    self.hits += 1
+                return value
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Warning: Could not read cached render {path}: {e}")
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value, persist=True):
+        size = len(value)
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= len(self.entries.pop(key))
+            if size <= self.max_bytes:
+                self.entries[key] = value
+                self.total_bytes += size
+            while self.total_bytes > self.max_bytes and self.entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+        if persist and self.disk_dir:
+            self.write_disk(key, value)
+
+    def write_disk(self, key, value):
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            path = self.disk_path(key)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(base64.b64decode(value))
+            os.replace(tmp_path, path)
+            self.evict_disk()
+        except Exception as e:
+            print(f"Warning: Could not persist render: {e}")
+
+    def evict_disk(self):
+        files = []
+        for name in os.listdir(self.disk_dir):
+            path = os.path.join(self.disk_dir, name)
+            if name.endswith(".tmp"): continue
+            st = os.stat(path)
+            files.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes: break
+            os.remove(path)
+            total -= size
+
+RENDER_CACHE = RenderCache(
+    RENDER_CACHE_MAX_MB * 1024 * 1024,
+    disk_dir=os.path.join(CACHE_DIR, "renders") if RENDER_CACHE_DISK else None,
+    disk_max_bytes=RENDER_CACHE_DISK_MAX_MB * 1024 * 1024
+)
+
+# --- Encoding Profiles ---
+
+MIME_TYPES = {"jpeg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+
+def resolve_profile(profile=None):
+    """Fills a profile from DEFAULT_IMAGE_PROFILE and downgrades WebP to JPEG when Pillow is missing."""
+    resolved = dict(DEFAULT_IMAGE_PROFILE)
+    resolved.update(profile or {})
+    if resolved["format"] == "webp" and Image is None:
+        print("Warning: WebP requested but Pillow is not installed. Falling back to JPEG.")
+        resolved["format"] = "jpeg"
+    if resolved["format"] in ("jpeg", "webp") and not resolved.get("quality"):
+        resolved["quality"] = DEFAULT_IMAGE_PROFILE.get("quality") or 85
+    return resolved
+
+def profile_for(source_name):
+    return resolve_profile(IMAGE_PROFILES.get(source_name))
+
+def profile_tag(profile):
+    return hashlib.sha256(json.dumps(profile, sort_keys=True).encode("utf-8")).hexdigest()[:10]
+
+def image_mime(profile):
+    return MIME_TYPES[profile["format"]]
+
+def scale_profile(profile, scale):
+    scaled = dict(profile)
+    scaled["dpi"] = max(VISION_MIN_DPI, int(profile["dpi"] * scale))
+    return scaled
+
+# --- Rasterization ---
+
+MAX_VISION_PAGES = 25
+
+def page_zoom(page, profile):
+    """Zoom factor for the profile's DPI, lowered so the page fits within max_pixels."""
+    zoom = profile["dpi"] / 72.0
+    max_pixels = profile.get("max_pixels")
+    if max_pixels:
+        area = page.rect.width * page.rect.height
+        if area * zoom * zoom > max_pixels:
+            zoom = math.sqrt(max_pixels / area)
+    return zoom
+
+def render_page(doc, page_num, profile):
+    page = doc.load_page(page_num)
+    zoom = page_zoom(page, profile)
+    colorspace = fitz.csGRAY if profile.get("grayscale") else fitz.csRGB
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace, alpha=False)
+    fmt = profile["format"]
+    if fmt == "jpeg":
+        img_data = pix.tobytes("jpeg", jpg_quality=profile["quality"])
+    elif fmt == "webp":
+        mode = "L" if pix.n == 1 else "RGB"
+        buffer = io.BytesIO()
+        Image.frombytes(mode, (pix.width, pix.height), pix.samples).save(buffer, "WEBP", quality=profile["quality"])
+        img_data = buffer.getvalue()
+    else:
+        img_data = pix.tobytes("png")
+    return base64.b64encode(img_data).decode('utf-8')
+
+def cache_key(pdf_hash, page_num, profile):
+    return (pdf_hash, page_num, profile_tag(profile), profile["format"])
+
+def iter_page_images(pdf_path, pages=None, profile=None, cache=RENDER_CACHE):
+    """
+    Lazily rasterizes and base64-encodes the selected pages, one at a time.
+
+    Args:
+        pdf_path (str): Local PDF path.
+        pages (iterable): 0-based page indexes to render, in order. None means the
+            first MAX_VISION_PAGES pages. Out-of-range indexes are skipped.
+        profile (dict): Encoding profile (see IMAGE_PROFILES). None uses the default.
+
+    Yields:
+        str: Base64-encoded image for each selected page.
+    """
+    profile = resolve_profile(profile)
+    pdf_hash = content_hash(pdf_path)
+    with fitz.open(pdf_path) as doc:
+        if pages is None:
+            # Fallback when the caller has no page selection (see vision_pages): skip glossary/legal
+            pages = range(min(len(doc), MAX_VISION_PAGES))
+        for page_num in pages:
+            if not 0 <= page_num < len(doc): continue
+            key = cache_key(pdf_hash, page_num, profile)
+            base64_img = cache.get(key) if cache else None
+            if base64_img is None:
+                base64_img = render_page(doc, page_num, profile)
+                if cache: cache.put(key, base64_img)
+            yield base64_img
+
+def render_pages_worker(pdf_path, page_nums, profile):
+    """Process-pool entry point: opens the document by path and renders a batch of pages."""
+    with fitz.open(pdf_path) as doc:
+        return [render_page(doc, page_num, profile) for page_num in page_nums]
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def render_pool(workers):
+    """
+    Process pool of `workers` processes, created on first use and reused for the rest of the run.
+    Workers are spawned, not forked: callers run on worker threads (extraction passes, arena, hedging),
+    and forking a multithreaded process can deadlock the child.
+    """
+    with _pools_lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pools[workers]
+
+@atexit.register
+def shutdown_render_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(cancel_futures=True)
+        _pools.clear()
+
+def render_pages_parallel(pdf_path, page_nums, profile, workers=None, min_pages=None):
+    """
+    Renders pages across a process pool, preserving the order of page_nums.
+    Pages are split into one contiguous batch per worker so each process opens the PDF once.
+    Fewer than min_pages pages (default RENDER_PARALLEL_MIN_PAGES) are rendered in this process.
+    """
+    workers = workers or RENDER_WORKERS or os.cpu_count() or 1
+    workers = min(workers, len(page_nums))
+    min_pages = RENDER_PARALLEL_MIN_PAGES if min_pages is None else min_pages
+    if workers <= 1 or len(page_nums) < min_pages:
+        return render_pages_worker(pdf_path, page_nums, profile)
+
+    batch_size = -(-len(page_nums) // workers)
+    batches = [page_nums[i:i + batch_size] for i in range(0, len(page_nums), batch_size)]
+    results = render_pool(workers).map(render_pages_worker, [pdf_path] * len(batches), batches, [profile] * len(batches))
+    return [img for batch in results for img in batch]
+
+def pdf_to_images(pdf_path, pages=None, profile=None, cache=RENDER_CACHE, workers=None):
+    """
+    Renders the selected pages (see iter_page_images) to base64 images.
+    Uncached pages are rendered in parallel when more than one worker is available.
+    """
+    print(f"Converting {pdf_path} to images for Vision...")
+    profile = resolve_profile(profile)
+    workers = workers or RENDER_WORKERS or os.cpu_count() or 1
+    if workers <= 1:
+        images = list(iter_page_images(pdf_path, pages=pages, profile=profile, cache=cache))
+        print(f"Converted {len(images)} pages to images.")
+        return images
+
+    pdf_hash = content_hash(pdf_path)
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+    if pages is None:
+        pages = range(min(page_count, MAX_VISION_PAGES))
+    pages = [p for p in pages if 0 <= p < page_count]
+
+    images = {}
+    for page_num in pages:
+        cached = cache.get(cache_key(pdf_hash, page_num, profile)) if cache else None
+        if cached is not None:
+            images[page_num] = cached
+    missing = [p for p in dict.fromkeys(pages) if p not in images]
+    if missing:
+        for page_num, base64_img in zip(missing, render_pages_parallel(pdf_path, missing, profile, workers)):
+            images[page_num] = base64_img
+            if cache: cache.put(cache_key(pdf_hash, page_num, profile), base64_img)
+
+    used = 1 if len(missing) < RENDER_PARALLEL_MIN_PAGES else min(workers, len(missing))
+    print(f"Converted {len(pages)} pages to images ({len(missing)} rendered on {used} workers).")
+    return [images[p] for p in pages]
+
+# --- Anchor Cropping ---
+
+def crop_spec(source_name, keys=None):
+    """
+    Anchors to crop around for a source, optionally limited to the given field keys.
+
+    Returns:
+        dict: {"headers": [...], "rows": [...], "row_pt": height kept below each row anchor}
+    """
+    if source_name == "wisdomtree":
+        keys = keys or list(WISDOMTREE_TILE_ANCHORS)
+        rows = [WISDOMTREE_TILE_ANCHORS[k] for k in keys if k in WISDOMTREE_TILE_ANCHORS]
+        return {"headers": [], "rows": list(dict.fromkeys(rows)), "row_pt": WISDOMTREE_TILE_PT}
+    if source_name == "cme_sec01":
+        groups = {"totals": "cme_total", "rates": "cme_rates", "equity": "cme_equity"}
+        rows = [SEC01_ROWS[g] for g, prefix in groups.items() if not keys or any(k.startswith(prefix) for k in keys)]
+        return {"headers": ["BULLETIN"] + SEC01_TABLES, "rows": rows, "row_pt": 0}
+    if source_name == "cme_sec09":
+        rows = [SEC09_ANCHORS[k] for k in (keys or SEC09_ANCHORS)]
+        return {"headers": ["BULLETIN"], "rows": rows, "row_pt": 0}
+    if source_name == "cme_sec11":
+        # Rows matched by required words (MIDCAP/SMLCAP) are searched for by those words
+        rows = []
+        for k in (keys or SEC11_ANCHORS):
+            prefix, required = SEC11_ANCHORS[k]
+            rows.extend(required or [prefix])
+        return {"headers": ["BULLETIN"], "rows": rows, "row_pt": 0}
+    return {"headers": [], "rows": [], "row_pt": 0}
+
+def vision_pages(source_name, pdf_path, keys=None):
+    """
+    Pages holding the source's anchors (optionally only those for `keys`), from the page index.
+    Falls back to the first page for CME sections and to None (first MAX_VISION_PAGES pages)
+    otherwise, e.g. for scanned PDFs without a text layer.
+    """
+    pages = relevant_pages(pdf_path, crop_spec(source_name, keys)["rows"])
+    if pages:
+        return pages
+    return [0] if source_name.startswith("cme_") else None
+
+def anchor_bands(page, spec, margin=CROP_MARGIN_PT):
+    """Full-width bands around every anchor hit on the page, merged where they overlap."""
+    row_hits = [r for anchor in spec["rows"] for r in page.search_for(anchor)]
+    if not row_hits: return []
+    bands = [(r.y0 - margin, r.y1 + margin + spec["row_pt"]) for r in row_hits]
+    bands += [(r.y0 - margin, r.y1 + margin + CROP_HEADER_PT) for anchor in spec["headers"] for r in page.search_for(anchor)]
+
+    merged = []
+    for y0, y1 in sorted(bands):
+        if merged and y0 <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], y1)
+        else:
+            merged.append([y0, y1])
+    rect = page.rect
+    return [fitz.Rect(rect.x0, max(y0, rect.y0), rect.x1, min(y1, rect.y1)) for y0, y1 in merged]
+
+def crop_document(pdf_path, spec, pages=None):
+    """
+    Builds an in-memory PDF holding only the anchor bands of each page, stacked top to bottom.
+    Bands are copied as vector content, so cropped pages render as sharp as the original.
+
+    Returns:
+        tuple: (fitz.Document, [source page index of each cropped page]), or (None, []) when
+        no anchor was found (e.g. a scanned page without a text layer).
+    """
+    out = fitz.open()
+    source_pages = []
+    with fitz.open(pdf_path) as src:
+        page_nums = range(len(src)) if pages is None else [p for p in pages if 0 <= p < len(src)]
+        for page_num in page_nums:
+            page = src[page_num]
+            bands = anchor_bands(page, spec)
+            if not bands: continue
+            target = out.new_page(width=page.rect.width, height=sum(b.height for b in bands))
+            y = 0
+            for band in bands:
+                target.show_pdf_page(fitz.Rect(0, y, page.rect.width, y + band.height), src, page_num, clip=band)
+                y += band.height
+            source_pages.append(page_num)
+    if not source_pages:
+        out.close()
+        return None, []
+    return out, source_pages
+
+def crop_images(pdf_path, spec, pages=None, profile=None, cache=RENDER_CACHE):
+    """
+    Renders the anchor bands of the selected pages (see crop_document), one image per page with hits.
+
+    Returns:
+        list: Base64 images, or None when no anchor was found so callers can fall back to whole pages.
+    """
+    profile = resolve_profile(profile)
+    doc, source_pages = crop_document(pdf_path, spec, pages=pages)
+    if doc is None:
+        return None
+    pdf_hash = content_hash(pdf_path)
+    crop_tag = profile_tag(dict(profile, crop=spec))
+    images = []
+    with doc:
+        for i, page_num in enumerate(source_pages):
+            key = (pdf_hash, page_num, crop_tag, profile["format"])
+            base64_img = cache.get(key) if cache else None
+            if base64_img is None:
+                base64_img = render_page(doc, i, profile)
+                if cache: cache.put(key, base64_img)
+            images.append(base64_img)
+    print(f"Cropped {pdf_path} to {len(images)} anchor strips for Vision.")
+    return images
+
+def build_vision_images(selections, budget_mb=VISION_PAYLOAD_BUDGET_MB):
+    """
+    Renders a multi-source image payload, lowering resolution until it fits the byte budget.
+
+    Args:
+        selections (list): (pdf_path, pages, profile, crop) tuples, in payload order. crop is a
+            crop_spec (whole pages are used if none of its anchors is found) or None.
+        budget_mb (float): Target size of all base64 images combined. 0 disables the budget.
+
+    Returns:
+        list: (mime type, base64 image) tuples.
+    """
+    budget = budget_mb * 1024 * 1024
+    scale = 1.0
+    while True:
+        payload = []
+        for pdf_path, pages, profile, crop in selections:
+            profile = scale_profile(resolve_profile(profile), scale) if scale < 1.0 else resolve_profile(profile)
+            mime = image_mime(profile)
+            images = crop_images(pdf_path, crop, pages=pages, profile=profile) if crop else None
+            if images is None:
+                images = pdf_to_images(pdf_path, pages=pages, profile=profile)
+            payload.extend((mime, img) for img in images)
+        total = sum(len(img) for _, img in payload)
+        if not budget or total <= budget:
+            return payload
+        at_floor = all(
+            scale_profile(resolve_profile(profile), scale)["dpi"] <= VISION_MIN_DPI
+            for _, _, profile, _ in selections
+        )
+        if at_floor:
+            print(f"Warning: Vision payload ({total / (1024 * 1024):.1f} MB) exceeds budget at minimum resolution.")
+            return payload
+        # Encoded size scales roughly with pixel count, i.e. with the square of the DPI
+        scale *= max(0.5, math.sqrt(budget / total) * 0.95)
+        print(f"Vision payload {total / (1024 * 1024):.1f} MB over budget ({budget_mb:.1f} MB). Re-rendering at {scale:.2f}x resolution...")
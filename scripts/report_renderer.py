@@ -379,7 +379,17 @@ def inject_score_deltas(html_content, ground_truth_scores):
 
     return re.sub(pattern, replacer, html_content, flags=re.IGNORECASE)
 
-def generate_benchmark_html(today, summaries, ground_truth=None, event_context=None, filename="benchmark.html"):
+def render_model_metrics(metrics):
+    """One-line strip (time to first token, throughput, total, provider-cached prompt tokens) for a benchmark model."""
+    if not metrics: return ""
+    parts = []
+    if metrics.get("ttft") is not None: parts.append(f"TTFT {metrics['ttft']:.1f}s")
+    if metrics.get("tokens_per_sec"): parts.append(f"{metrics['tokens_per_sec']:.1f} tok/s")
+    if metrics.get("duration") is not None: parts.append(f"{metrics['duration']:.1f}s total")
+    if metrics.get("prompt_tokens"): parts.append(f"{metrics.get('cached_tokens') or 0:,}/{metrics['prompt_tokens']:,} prompt tokens cached")
+    return f'<div class="model-metrics">{" · ".join(parts)}</div>'
+
+def generate_benchmark_html(today, summaries, ground_truth=None, event_context=None, filename="benchmark.html", model_metrics=None):
     print(f"Generating Benchmark HTML report ({filename})...")
     
     # Extract Context
@@ -442,6 +452,7 @@ def generate_benchmark_html(today, summaries, ground_truth=None, event_context=N
         is_selected = "selected" if i == 0 else ""
         
         options += f'<option value="{model}" {is_selected}>{model}</option>'
+        html_content = render_model_metrics((model_metrics or {}).get(model)) + html_content
         divs += f'<div id="{model}" class="model-content" style="display: {display_style};">{html_content}</div>'
 
     # ... CSS ...
@@ -450,6 +461,7 @@ def generate_benchmark_html(today, summaries, ground_truth=None, event_context=N
     h1 { text-align: center; color: #2c3e50; }
     .controls { text-align: center; margin-bottom: 30px; background: white; padding: 15px; border-radius: 8px; box-shadow: 0 1px 3px rgba(0,0,0,0.1); position: sticky; top: 10px; z-index: 900; border: 1px solid #ddd; }
     select { padding: 8px; font-size: 1em; border-radius: 4px; border: 1px solid #ccc; width: 300px; }
+    .model-metrics { text-align: right; color: #7f8c8d; font-size: 0.85em; margin-bottom: 10px; font-variant-numeric: tabular-nums; }
     .model-content { background: white; padding: 40px; border-radius: 8px; box-shadow: 0 2px 5px rgba(0,0,0,0.1); animation: fadeIn 0.3s ease-in-out; }
     @keyframes fadeIn { from { opacity: 0; transform: translateY(5px); } to { opacity: 1; transform: translateY(0); } }
     table { border-collapse: collapse; width: 100%; margin-bottom: 20px; }
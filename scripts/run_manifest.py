@@ -0,0 +1,116 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+
+import config
+import prompts
+from config import (
+    CACHE_DIR, RUN_MODE, SUMMARIZE_PROVIDER, GEMINI_MODEL, OPENROUTER_MODEL, BENCHMARK_MODELS, FINGERPRINT_SETTINGS
+)
+from downloader import content_hash
+
+MANIFEST_PATH = os.path.join(CACHE_DIR, "run_manifest.json")
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def short_hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+def prompt_versions():
+    """Short content hash of every prompt constant, so prompt edits invalidate the fingerprint."""
+    return {
+        name: short_hash(value.encode("utf-8"))
+        for name, value in sorted(vars(prompts).items())
+        if name.isupper() and isinstance(value, str)
+    }
+
+def settings_versions(names=FINGERPRINT_SETTINGS):
+    """Short hash of each output-shaping config value (FINGERPRINT_SETTINGS), as currently set."""
+    return {
+        name: short_hash(json.dumps(getattr(config, name, None), sort_keys=True, default=str).encode("utf-8"))
+        for name in names
+    }
+
+def code_version(directory=SCRIPTS_DIR):
+    """Short hash over the pipeline's source files, so logic changes (e.g. signal scoring) invalidate the fingerprint."""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".py"):
+            with open(os.path.join(directory, name), "rb") as f:
+                digest.update(name.encode("utf-8") + b"\0" + f.read())
+    return digest.hexdigest()[:12]
+
+def settled_live_data(live_metrics):
+    """
+    The live fields pinned to a completed session (those of tickers with a `<key>_current_date`).
+
+    Level and 1-day change fields read the latest bar, which moves intraday; fingerprinting them
+    would make every re-trigger during market hours look like new input.
+    """
+    keys = [name[:-len("_current_date")] for name in live_metrics if name.endswith("_current_date")]
+    return {
+        name: value for name, value in sorted(live_metrics.items())
+        if any(name.startswith(f"{key}_") for key in keys)
+    }
+
+def compute_run_fingerprint(pdf_paths, live_metrics):
+    """
+    Fingerprints everything that determines a run's output.
+
+    Args:
+        pdf_paths (dict): {source name: local path} from download_pdfs.
+        live_metrics (dict): Snapshot returned by fetch_live_data.
+
+    Returns:
+        tuple: (fingerprint hex string, the components it was built from)
+    """
+    components = {
+        "pdfs": {name: content_hash(path) for name, path in sorted(pdf_paths.items())},
+        "live_data": settled_live_data(live_metrics),
+        "prompts": prompt_versions(),
+        "settings": settings_versions(),
+        "code": code_version(),
+        "models": {
+            "run_mode": RUN_MODE,
+            "summarize_provider": SUMMARIZE_PROVIDER,
+            "gemini": GEMINI_MODEL,
+            "openrouter": OPENROUTER_MODEL,
+            "benchmark": BENCHMARK_MODELS
+        }
+    }
+    payload = json.dumps(components, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest(), components
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Warning: Could not read run manifest: {e}")
+        return {}
+
+def lookup_run(fingerprint, run_mode=RUN_MODE):
+    """Returns the stored manifest entry if the last completed run in this mode had the same fingerprint."""
+    entry = load_manifest().get(run_mode)
+    if entry and entry.get("fingerprint") == fingerprint and entry.get("outputs"):
+        return entry
+    return None
+
+def record_run(fingerprint, components, outputs, run_mode=RUN_MODE):
+    manifest = load_manifest()
+    manifest[run_mode] = {
+        "fingerprint": fingerprint,
+        "completed_at": datetime.now().isoformat(timespec="seconds"),
+        "components": components,
+        "outputs": outputs
+    }
+    try:
+        os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+        tmp_path = MANIFEST_PATH + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(tmp_path, MANIFEST_PATH)
+    except Exception as e:
+        print(f"Warning: Could not write run manifest: {e}")
@@ -0,0 +1,109 @@
+import json
+import time
+import requests
+from urllib3.exceptions import ReadTimeoutError
+
+from outbound import send, host_of
+
+# Latency of the latest streamed completion per model: {model: {"ttft", "duration", "completion_tokens", "tokens_per_sec"}}
+MODEL_METRICS = {}
+
+def stream_chat_completion(url, headers, data, total_timeout, idle_timeout, connect_timeout=10, cancel=None):
+    """
+    POSTs a streaming (SSE) chat completion and accumulates the text deltas.
+
+    A stall is cut off after `idle_timeout` seconds without a data event (keep-alive
+    comments do not count), and the whole call after `total_timeout` seconds. Setting the
+    optional `cancel` event (e.g. when a hedged request lost) closes the stream at the next line.
+
+    Returns:
+        dict: {"text", "error" (None on success), "ttft", "duration", "completion_tokens", "tokens_per_sec",
+        "prompt_tokens", "cached_tokens"}
+    """
+    started = time.monotonic()
+    result = {"text": "", "error": None, "ttft": None, "duration": None, "completion_tokens": None, "tokens_per_sec": None,
+              "prompt_tokens": None, "cached_tokens": None}
+    parts = []
+    chunks = 0
+    try:
+        # The read timeout bounds silence on the socket; idle gaps between keep-alives are checked below
+        with send(host_of(url), lambda: requests.post(url, headers=headers, data=data, stream=True, timeout=(connect_timeout, idle_timeout))) as response:
+            if response.status_code != 200:
+                result["error"] = f"Error {response.status_code}: {response.text}"
+                return result
+            last_event = time.monotonic()
+            # chunk_size=1: lines are handed over as soon as they arrive instead of after a 512-byte buffer fills
+            for line in response.iter_lines(chunk_size=1):
+                now = time.monotonic()
+                if cancel is not None and cancel.is_set():
+                    result["error"] = "Cancelled"
+                    break
+                if now - started > total_timeout:
+                    result["error"] = f"Stream exceeded total timeout of {total_timeout}s"
+                    break
+                if not line: continue
+                line = line.decode("utf-8")
+                if line.startswith(":"):
+                    # Keep-alive comment: the connection is up but no tokens are arriving
+                    if now - last_event > idle_timeout:
+                        result["error"] = f"No tokens for {idle_timeout}s (stream stalled)"
+                        break
+                    continue
+                if not line.startswith("data:"): continue
+                payload = line[5:].strip()
+                if payload == "[DONE]": break
+                event = json.loads(payload)
+                if event.get("error"):
+                    result["error"] = f"Stream error: {event['error'].get('message', event['error'])}"
+                    break
+                last_event = now
+                if event.get("usage"):
+                    result["completion_tokens"] = event["usage"].get("completion_tokens")
+                    result["prompt_tokens"], result["cached_tokens"] = usage_counts(event["usage"])
+                for choice in event.get("choices", []):
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        if result["ttft"] is None:
+                            result["ttft"] = now - started
+                        parts.append(delta)
+                        chunks += 1
+    except requests.exceptions.ReadTimeout:
+        result["error"] = f"No data for {idle_timeout}s (stream stalled)"
+    except requests.exceptions.ConnectionError as e:
+        # A read timeout mid-body surfaces as ConnectionError(ReadTimeoutError)
+        if e.args and isinstance(e.args[0], ReadTimeoutError):
+            result["error"] = f"No data for {idle_timeout}s (stream stalled)"
+        else:
+            result["error"] = f"Stream failed: {e}"
+    except (requests.RequestException, ValueError) as e:
+        result["error"] = f"Stream failed: {e}"
+
+    result["text"] = "".join(parts)
+    result["duration"] = time.monotonic() - started
+    # Providers that omit usage: one content delta is roughly one token
+    if result["completion_tokens"] is None and chunks:
+        result["completion_tokens"] = chunks
+    generation_time = result["duration"] - (result["ttft"] or 0)
+    if result["completion_tokens"] and result["ttft"] is not None and generation_time > 0:
+        result["tokens_per_sec"] = result["completion_tokens"] / generation_time
+    return result
+
+def usage_counts(usage):
+    """(prompt_tokens, cached_tokens) of an OpenAI-style usage object."""
+    details = usage.get("prompt_tokens_details") or {}
+    return usage.get("prompt_tokens"), details.get("cached_tokens")
+
+def record_usage(model, prompt_tokens, cached_tokens):
+    """Stores how many prompt tokens the provider served from its prefix cache."""
+    metrics = MODEL_METRICS.setdefault(model, {})
+    metrics["prompt_tokens"] = prompt_tokens
+    metrics["cached_tokens"] = cached_tokens
+    if prompt_tokens:
+        print(f"{model}: {cached_tokens or 0}/{prompt_tokens} prompt tokens from provider cache")
+
+def record_metrics(model, result):
+    MODEL_METRICS[model] = {k: result[k] for k in ["ttft", "duration", "completion_tokens", "tokens_per_sec"]}
+    ttft = f"{result['ttft']:.1f}s" if result["ttft"] is not None else "n/a"
+    tps = f"{result['tokens_per_sec']:.1f} tok/s" if result["tokens_per_sec"] else "n/a"
+    print(f"{model}: TTFT {ttft}, {tps}, {result['duration']:.1f}s total")
+    record_usage(model, result["prompt_tokens"], result["cached_tokens"])
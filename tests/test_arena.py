@@ -0,0 +1,88 @@
+import unittest
+import os
+import sys
+import threading
+import time
+
+# Add scripts to path so we can import
+sys.path.append(os.path.join(os.getcwd(), 'scripts'))
+from arena import run_arena, provider_for
+
+class Tracker:
+    """Records how many jobs per provider run at the same time."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = {}
+        self.peak = {}
+
+    def job(self, provider, result, delay):
+        def fn(cancel):
+            with self.lock:
+                self.running[provider] = self.running.get(provider, 0) + 1
+                self.peak[provider] = max(self.peak.get(provider, 0), self.running[provider])
+            time.sleep(delay)
+            with self.lock:
+                self.running[provider] -= 1
+            return result
+        return (provider, fn)
+
+class TestArena(unittest.TestCase):
+
+    def test_models_run_concurrently_in_roster_order(self):
+        t = Tracker()
+        jobs = {f"vendor{i}/model": t.job(f"vendor{i}", f"summary {i}", 0.3) for i in range(4)}
+        start = time.time()
+        summaries = run_arena(jobs, workers=4, deadline=5, provider_caps={})
+
+        self.assertLess(time.time() - start, 0.9)
+        self.assertEqual(list(summaries), list(jobs))
+        self.assertEqual(summaries["vendor2/model"], "summary 2")
+
+    def test_provider_cap_is_respected(self):
+        t = Tracker()
+        jobs = {f"anthropic/model{i}": t.job("anthropic", "ok", 0.1) for i in range(3)}
+        jobs["openai/model"] = t.job("openai", "ok", 0.1)
+        run_arena(jobs, workers=4, deadline=5, provider_caps={"anthropic": 1})
+
+        self.assertEqual(t.peak["anthropic"], 1)
+        self.assertEqual(t.peak["openai"], 1)
+
+    def test_late_and_failing_models_do_not_block_results(self):
+        t = Tracker()
+
+        def broken(cancel):
+            raise RuntimeError("boom")
+
+        jobs = {
+            "fast/model": t.job("fast", "done", 0),
+            "slow/model": t.job("slow", "too late", 2),
+            "broken/model": ("broken", broken)
+        }
+        start = time.time()
+        summaries = run_arena(jobs, workers=3, deadline=0.3, provider_caps={})
+
+        self.assertLess(time.time() - start, 1.5)
+        self.assertEqual(summaries["fast/model"], "done")
+        self.assertTrue(summaries["slow/model"].startswith("Error: Timed out"))
+        self.assertEqual(summaries["broken/model"], "Failed: boom")
+
+    def test_late_model_is_cancelled(self):
+        stopped = threading.Event()
+
+        def streaming(cancel):
+            # Like a streamed completion: checks the cancel event between chunks
+            while not cancel.wait(0.01): pass
+            stopped.set()
+            return "Error: Cancelled"
+
+        summaries = run_arena({"slow/model": ("slow", streaming)}, workers=1, deadline=0.2, provider_caps={})
+        self.assertTrue(summaries["slow/model"].startswith("Error: Timed out"))
+        self.assertTrue(stopped.wait(1))
+
+    def test_provider_for(self):
+        self.assertEqual(provider_for("anthropic/claude-opus-4.5"), "anthropic")
+        self.assertEqual(provider_for("gemini-3-pro-preview"), "gemini")
+
+if __name__ == '__main__':
+    unittest.main()
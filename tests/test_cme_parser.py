@@ -0,0 +1,151 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+import fitz
+
+# Add scripts to path so we can import
+sys.path.append(os.path.join(os.getcwd(), 'scripts'))
+import page_index
+from cme_parser import numeric_values, parse_sec01, parse_sec09, parse_sec11
+from fetch_and_summarize import process_cme_sec09, process_cme_sec11
+
+def make_pdf(path, lines):
+    doc = fitz.open()
+    page = doc.new_page(width=792, height=612)
+    y = 30
+    for line in lines:
+        page.insert_text((20, y), line, fontsize=8, fontname="cour")
+        y += 12
+    doc.save(path)
+    doc.close()
+
+SEC09_LINES = [
+    "PG09 BULLETIN # 243@ Fri, Dec 19, 2025",
+    "PRELIMINARY",
+    "INTEREST RATE FUTURES",
+    "TOTAL 2-YR NOTE FUTURES      412345    1234567    4,321,000+   12345",
+    "TOTAL 3-YR NOTE FUTURES        1200      35000      190000-      420",
+    "TOTAL 5-YR NOTE FUTURES      500000    1500000     6500000     UNCH",
+    "TOTAL 10-YR NOTE FUTURES     600000    1700000     5000000-    98765",
+    "TOTAL TN FUT                  80000     300000     2000000+     4321",
+    "TOTAL 30Y BOND FUT           150000     400000     1900000-     1000",
+    "PLEASE NOTE: ULTRA BOND ROWS DELAYED",
+]
+
+SEC11_LINES = [
+    "PG11 BULLETIN # 243@ Fri, Dec 19, 2025",
+    "EQUITY AND INDEX FUTURES",
+    "TOTAL EMINI S&P FUT       1200  1500000  2100000+  15000",
+    "TOTAL EMINI NASD FUT       300   600000   280000-   3500",
+    "TOTAL MINI $5 DOW FUT       20   150000    90000    UNCH",
+    "TOTAL E-400 MIDCAP F        50    12964    49139-     42",
+]
+
+SEC01_STACKED_LINES = [
+    "PG01 BULLETIN # 243@ Fri, Dec 19, 2025",
+    "FUTURES ONLY",
+    "INTEREST RATES     5000000   40000000   45000000   120000+   85000",
+    "EQUITY INDEX       2000000    3000000    5000000    10000-   60000",
+    "OPTIONS ONLY",
+    "INTEREST RATES      800000   20000000   20800000    30000-   12000",
+    "EQUITY INDEX        900000   30000000   30900000    40000+   95000",
+    "COMBINED TOTAL",
+    "CME GROUP TOTALS  9000000  21000000  30000000  110000000+  250000",
+]
+
+SEC01_COLUMN_LINES = [
+    "PG01 BULLETIN # 243@ Fri, Dec 19, 2025",
+    "FUTURES ONLY          OPTIONS ONLY          COMBINED TOTAL",
+    "INTEREST RATES   45000000 120000+ 85000   20800000 30000- 12000   65800000 150000+ 73000",
+    "EQUITY INDEX      5000000  10000- 60000   30900000 40000+ 95000   35900000  50000+ 35000",
+    "CME GROUP TOTALS 20000000 100000+ 90000   10000000 20000- 10000   30000000 110000000+ 250000",
+]
+
+class TestCmeParser(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index_patches = [
+            patch.object(page_index, "PAGE_INDEX_DIR", os.path.join(self.tmp.name, "page_index")),
+            patch.object(page_index, "_INDEXES", {}),
+        ]
+        for p in self.index_patches: p.start()
+
+    def tearDown(self):
+        for p in self.index_patches: p.stop()
+        self.tmp.cleanup()
+
+    def pdf(self, lines):
+        path = os.path.join(self.tmp.name, f"doc{len(os.listdir(self.tmp.name))}.pdf")
+        make_pdf(path, lines)
+        return path
+
+    def test_merged_sign_is_split(self):
+        row = [(i, tok) for i, tok in enumerate("TOTAL E-400 MIDCAP F 50 12964 49139- 42".split())]
+        self.assertEqual([v for _, v in numeric_values(row)], ["50", "12964", "49139", "-42"])
+
+    def test_sec09_parse_feeds_processor(self):
+        raw = parse_sec09(self.pdf(SEC09_LINES))
+        sec09 = raw["cme_section09"]
+
+        self.assertEqual(sec09["bulletin_date"], "2025-12-19")
+        self.assertTrue(sec09["is_preliminary"])
+        self.assertEqual(sec09["totals"]["2y"]["open_interest"], "4321000")
+        self.assertEqual(sec09["totals"]["2y"]["oi_change"], "12345")
+        self.assertEqual(sec09["totals"]["3y"]["oi_change"], "-420")
+        self.assertEqual(sec09["totals"]["5y"]["oi_change"], "UNCH")
+        self.assertNotIn("ultra", sec09["totals"])
+        self.assertIn("PLEASE NOTE: ULTRA BOND ROWS DELAYED", sec09["data_quality_notes"])
+
+        curve = process_cme_sec09(raw)
+        self.assertEqual(curve["tenors"]["10y"]["oi_change"], -98765)
+        self.assertEqual(curve["tenors"]["2y"]["total_volume"], 412345 + 1234567)
+        self.assertEqual(curve["dominance"]["active_tenor"], "10y")
+        self.assertEqual(curve["quality"]["missing_tenors"], ["ultra"])
+
+    def test_sec11_parse_feeds_processor(self):
+        raw = parse_sec11(self.pdf(SEC11_LINES))
+
+        self.assertEqual(raw["products"]["mid"]["open_interest"], 49139)
+        self.assertEqual(raw["products"]["mid"]["oi_change"], -42)
+        self.assertEqual(raw["products"]["ym"]["oi_change"], 0)
+        self.assertIsNone(raw["products"]["sml"])
+        self.assertIn("Missing SML row", raw["data_quality_notes"])
+
+        flows = process_cme_sec11(raw)
+        self.assertEqual(flows["products"]["es"]["label"], "TOTAL EMINI S&P FUT")
+        self.assertEqual(flows["aggregates"]["total_oi_change"], 15000 - 3500 + 0 - 42)
+        self.assertEqual(flows["quality"]["bulletin_date"], "2025-12-19")
+
+    def test_sec01_stacked_tables(self):
+        data = parse_sec01(self.pdf(SEC01_STACKED_LINES))
+
+        self.assertEqual(data["cme_bulletin_date"], "2025-12-19")
+        self.assertEqual(data["cme_total_volume"], 30000000)
+        self.assertEqual(data["cme_total_open_interest"], 110000000)
+        self.assertEqual(data["cme_total_oi_net_change"], 250000)
+        self.assertEqual(data["cme_rates_futures_oi_change"], 85000)
+        self.assertEqual(data["cme_equity_futures_oi_change"], -60000)
+        self.assertEqual(data["cme_rates_options_oi_change"], -12000)
+        self.assertEqual(data["cme_equity_options_oi_change"], 95000)
+
+    def test_sec01_side_by_side_tables(self):
+        data = parse_sec01(self.pdf(SEC01_COLUMN_LINES))
+
+        self.assertEqual(data["cme_total_open_interest"], 110000000)
+        self.assertEqual(data["cme_total_oi_net_change"], 250000)
+        self.assertEqual(data["cme_rates_futures_oi_change"], 85000)
+        self.assertEqual(data["cme_rates_options_oi_change"], -12000)
+        self.assertEqual(data["cme_equity_futures_oi_change"], -60000)
+        self.assertEqual(data["cme_equity_options_oi_change"], 95000)
+
+    def test_no_anchors_returns_empty(self):
+        path = self.pdf(["Nothing to see here"])
+        self.assertEqual(parse_sec09(path), {})
+        self.assertEqual(parse_sec11(path), {})
+        self.assertEqual(parse_sec01(path), {})
+
+if __name__ == '__main__':
+    unittest.main()
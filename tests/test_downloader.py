@@ -0,0 +1,152 @@
+import unittest
+from unittest.mock import patch
+import gzip
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add scripts to path so we can import
+sys.path.append(os.path.join(os.getcwd(), 'scripts'))
+import downloader
+
+PDF_BODY = b"%PDF-1.4 fake bulletin body"
+ETAG = '"v1"'
+
+class BulletinHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+    interrupted = set()
+
+    def do_GET(self):
+        BulletinHandler.requests_seen.append((self.path, dict(self.headers)))
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range") == ETAG:
+            start = int(range_header.split("=")[1].rstrip("-"))
+            body = PDF_BODY[start:]
+            self.send_response(206)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Range", f"bytes {start}-{len(PDF_BODY) - 1}/{len(PDF_BODY)}")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path == "/flaky.pdf" and self.path not in BulletinHandler.interrupted:
+            # Drop the connection half way through the body
+            BulletinHandler.interrupted.add(self.path)
+            self.send_response(200)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Length", str(len(PDF_BODY)))
+            self.end_headers()
+            self.wfile.write(PDF_BODY[:10])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        if self.path == "/gzipped.pdf":
+            body = gzip.compress(PDF_BODY)
+            self.send_response(200)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path == "/missing.pdf":
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(PDF_BODY)))
+        self.end_headers()
+        self.wfile.write(PDF_BODY)
+
+    def log_message(self, *args):
+        pass
+
+class TestDownloader(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), BulletinHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        BulletinHandler.requests_seen = []
+        BulletinHandler.interrupted = set()
+        self.tmp = tempfile.TemporaryDirectory()
+        cache_dir = os.path.join(self.tmp.name, "pdfs")
+        self.patches = [
+            patch.object(downloader, "PDF_CACHE_DIR", cache_dir),
+            patch.object(downloader, "INDEX_PATH", os.path.join(cache_dir, "index.json")),
+        ]
+        for p in self.patches: p.start()
+
+    def tearDown(self):
+        for p in self.patches: p.stop()
+        self.tmp.cleanup()
+
+    def test_concurrent_download_preserves_source_order(self):
+        sources = {f"doc{i}": f"{self.base_url}/doc{i}.pdf" for i in range(4)}
+        paths = downloader.download_pdfs(sources)
+
+        self.assertEqual(list(paths.keys()), list(sources.keys()))
+        for path in paths.values():
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), PDF_BODY)
+
+    def test_store_is_content_addressed(self):
+        paths = downloader.download_pdfs({"cme": f"{self.base_url}/cme.pdf"})
+        expected_sha = hashlib.sha256(PDF_BODY).hexdigest()
+
+        self.assertEqual(os.path.basename(paths["cme"]), f"{expected_sha}.pdf")
+        self.assertEqual(downloader.content_hash(paths["cme"]), expected_sha)
+        self.assertEqual(downloader.load_index()[f"{self.base_url}/cme.pdf"]["sha256"], expected_sha)
+
+    @patch.object(downloader, "DOWNLOAD_CHUNK_SIZE", 8)
+    def test_interrupted_transfer_resumes_with_range(self):
+        # First response dies after 10 bytes; only the first complete 8-byte chunk reaches disk
+        paths = downloader.download_pdfs({"flaky": f"{self.base_url}/flaky.pdf"})
+
+        with open(paths["flaky"], "rb") as f:
+            self.assertEqual(f.read(), PDF_BODY)
+        self.assertEqual(BulletinHandler.requests_seen[-1][1].get("Range"), "bytes=8-")
+        self.assertEqual(downloader.content_hash(paths["flaky"]), hashlib.sha256(PDF_BODY).hexdigest())
+
+    def test_gzip_encoded_body_is_not_truncated(self):
+        paths = downloader.download_pdfs({"cme": f"{self.base_url}/gzipped.pdf"})
+
+        with open(paths["cme"], "rb") as f:
+            self.assertEqual(f.read(), PDF_BODY)
+        self.assertEqual(len([r for r in BulletinHandler.requests_seen if r[0] == "/gzipped.pdf"]), 1)
+
+    def test_revalidation_uses_cached_copy(self):
+        sources = {"cme": f"{self.base_url}/cme.pdf"}
+        first = downloader.download_pdfs(sources)
+        second = downloader.download_pdfs(sources)
+
+        self.assertEqual(first, second)
+        self.assertEqual(BulletinHandler.requests_seen[-1][1].get("If-None-Match"), ETAG)
+        with open(second["cme"], "rb") as f:
+            self.assertEqual(f.read(), PDF_BODY)
+
+    def test_failed_source_is_skipped(self):
+        sources = {"ok": f"{self.base_url}/ok.pdf", "bad": f"{self.base_url}/missing.pdf"}
+        paths = downloader.download_pdfs(sources)
+
+        self.assertIn("ok", paths)
+        self.assertNotIn("bad", paths)
+
+if __name__ == '__main__':
+    unittest.main()
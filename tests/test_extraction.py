@@ -0,0 +1,201 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+import time
+
+# Add scripts to path so we can import
+sys.path.append(os.path.join(os.getcwd(), 'scripts'))
+import extraction
+import page_index
+from test_cme_parser import make_pdf, SEC09_LINES, SEC11_LINES
+
+class TestExtractionCascade(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.sec09_path = os.path.join(self.tmp.name, "sec09.pdf")
+        make_pdf(self.sec09_path, SEC09_LINES)
+        self.wt_path = os.path.join(self.tmp.name, "wisdomtree.pdf")
+        make_pdf(self.wt_path, ["WisdomTree Daily Dashboard"])
+        self.patcher = patch.object(extraction, "EXTRACTION_CACHE_DIR", os.path.join(self.tmp.name, "extractions"))
+        self.patcher.start()
+        self.index_patches = [
+            patch.object(page_index, "PAGE_INDEX_DIR", os.path.join(self.tmp.name, "page_index")),
+            patch.object(page_index, "_INDEXES", {}),
+        ]
+        for p in self.index_patches: p.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        for p in self.index_patches: p.stop()
+        self.tmp.cleanup()
+
+    @patch('extraction.extract_metrics_gemini')
+    def test_vision_only_asked_for_missing_rows(self, mock_gemini):
+        mock_gemini.return_value = {"rows": {"ultra": {"row_label": "TOTAL ULTRA T-BND FUT", "rth_volume": "10", "globex_volume": "20", "open_interest": "300", "oi_change": "-5"}}}
+
+        _, sec09_raw, _, provenance = extraction.run_extraction({"cme_sec09": self.sec09_path})
+
+        self.assertEqual(mock_gemini.call_count, 1)
+        prompt = mock_gemini.call_args.kwargs["prompt_override"]
+        self.assertIn("TOTAL ULTRA T-BND FUT", prompt)
+        self.assertNotIn("TOTAL 2-YR NOTE FUTURES", prompt)
+        self.assertEqual(sec09_raw["cme_section09"]["totals"]["ultra"]["oi_change"], "-5")
+        self.assertEqual(provenance["2y"], "text_layer")
+        self.assertEqual(provenance["ultra"], "vision")
+
+    @patch('extraction.extract_metrics_gemini')
+    def test_unparseable_row_is_sent_as_crop(self, mock_gemini):
+        mock_gemini.return_value = {}
+        path = os.path.join(self.tmp.name, "sec09_garbled.pdf")
+        make_pdf(path, SEC09_LINES + ["TOTAL ULTRA T-BND FUT    n/a    n/a"])
+
+        extraction.run_extraction({"cme_sec09": path})
+
+        images = mock_gemini.call_args.kwargs["images"]
+        self.assertEqual(len(images["cme_sec09"]), 1)
+        self.assertEqual(images["cme_sec09"][0][0], "image/png")
+
+    @patch('extraction.extract_metrics_gemini')
+    def test_identical_pdf_served_from_cache(self, mock_gemini):
+        mock_gemini.return_value = {"hy_spread_current": 2.84, "forward_pe_current": 22.1}
+        first, _, _, _ = extraction.run_extraction({"wisdomtree": self.wt_path})
+        self.assertEqual(first["hy_spread_current"], 2.84)
+
+        mock_gemini.reset_mock()
+        mock_gemini.return_value = {}
+        second, _, _, provenance = extraction.run_extraction({"wisdomtree": self.wt_path})
+
+        self.assertEqual(second["hy_spread_current"], 2.84)
+        self.assertEqual(provenance["forward_pe_current"], "cache")
+        # Only keys never read before are requested again
+        prompt = mock_gemini.call_args.kwargs["prompt_override"]
+        self.assertNotIn('"hy_spread_current"', prompt)
+        self.assertIn('"yield_2y"', prompt)
+
+    @patch('extraction.extract_metrics_gemini')
+    def test_live_data_fills_declared_fields(self, mock_gemini):
+        mock_gemini.return_value = {}
+        metrics, _, _, provenance = extraction.run_extraction({"wisdomtree": self.wt_path}, live_metrics={"ust10y_current": 4.15})
+
+        self.assertEqual(metrics["yield_10y"], 4.15)
+        self.assertEqual(provenance["yield_10y"], "live")
+        self.assertNotIn('"yield_10y"', mock_gemini.call_args.kwargs["prompt_override"])
+
+    @patch('extraction.extract_metrics_gemini')
+    def test_reask_only_for_missing_or_invalid_keys(self, mock_gemini):
+        mock_gemini.side_effect = [
+            {"hy_spread_current": 2.84, "forward_pe_current": 221.0, "yield_2y": None},
+            {"forward_pe_current": 22.1, "yield_2y": 3.5}
+        ]
+        metrics, _, _, provenance = extraction.run_extraction({"wisdomtree": self.wt_path}, live_metrics={"ust10y_current": 4.15})
+
+        self.assertEqual(mock_gemini.call_count, 2)
+        first, second = [c.kwargs for c in mock_gemini.call_args_list]
+        self.assertIn("hy_spread_current", first["schema"]["properties"])
+        self.assertEqual(first["schema"]["properties"]["forward_pe_current"], {"type": "number", "nullable": True})
+        # The follow-up names only the rejected keys and why
+        self.assertNotIn('"hy_spread_current"', second["prompt_override"])
+        self.assertIn('"forward_pe_current"', second["prompt_override"])
+        self.assertIn("out of range", second["prompt_override"])
+        self.assertNotIn("hy_spread_current", second["schema"]["properties"])
+        self.assertEqual(metrics["forward_pe_current"], 22.1)
+        self.assertEqual(metrics["yield_2y"], 3.5)
+        self.assertEqual(provenance["forward_pe_current"], "vision")
+
+    @patch.object(extraction, "EXTRACTION_REASK_ROUNDS", 0)
+    @patch('extraction.extract_metrics_gemini')
+    def test_invalid_values_are_dropped_without_reask(self, mock_gemini):
+        mock_gemini.return_value = {"hy_spread_current": "n/a", "forward_pe_current": 22.1}
+        metrics, _, _, _ = extraction.run_extraction({"wisdomtree": self.wt_path})
+        self.assertEqual(mock_gemini.call_count, 1)
+        self.assertNotIn("hy_spread_current", metrics)
+        self.assertEqual(metrics["forward_pe_current"], 22.1)
+
+    @patch('extraction.extract_metrics_gemini')
+    def test_full_section_reask_uses_targeted_rows(self, mock_gemini):
+        row = {"row_label": "TOTAL EMINI S&P FUT", "total_volume": 1000, "open_interest": 2000000, "oi_change": -500}
+        mock_gemini.side_effect = [
+            {"bulletin_date": "2025-12-19", "is_preliminary": False, "products": {"es": row, "nq": None}, "data_quality_notes": []},
+            {"rows": {k: dict(row, row_label=k) for k in ["nq", "ym", "mid", "sml"]}}
+        ]
+        path = os.path.join(self.tmp.name, "blank.pdf")
+        make_pdf(path, ["CME Group Daily Bulletin"])
+
+        _, _, sec11_raw, _ = extraction.run_extraction({"cme_sec11": path})
+
+        second = mock_gemini.call_args_list[1].kwargs
+        self.assertIn("rows", second["schema"]["properties"])
+        self.assertNotIn('"es"', second["prompt_override"])
+        self.assertEqual(sec11_raw["bulletin_date"], "2025-12-19")
+        self.assertTrue(all(sec11_raw["products"].values()))
+
+    @patch('extraction.extract_metrics_gemini')
+    def test_vision_disabled(self, mock_gemini):
+        _, sec09_raw, _, _ = extraction.run_extraction({"cme_sec09": self.sec09_path}, use_vision=False)
+        mock_gemini.assert_not_called()
+        self.assertNotIn("ultra", sec09_raw["cme_section09"]["totals"])
+
+@patch.object(extraction, "EXTRACTION_REASK_ROUNDS", 0)
+class TestConcurrentVisionPasses(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pdf_paths = {}
+        for name, lines in [("wisdomtree", ["WisdomTree Daily Dashboard"]), ("cme_sec09", SEC09_LINES), ("cme_sec11", SEC11_LINES)]:
+            self.pdf_paths[name] = os.path.join(self.tmp.name, f"{name}.pdf")
+            make_pdf(self.pdf_paths[name], lines)
+        self.patcher = patch.object(extraction, "EXTRACTION_CACHE_DIR", os.path.join(self.tmp.name, "extractions"))
+        self.patcher.start()
+        self.index_patches = [
+            patch.object(page_index, "PAGE_INDEX_DIR", os.path.join(self.tmp.name, "page_index")),
+            patch.object(page_index, "_INDEXES", {}),
+        ]
+        for p in self.index_patches: p.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        for p in self.index_patches: p.stop()
+        self.tmp.cleanup()
+
+    @staticmethod
+    def slow_gemini(delays):
+        def fake(pdf_paths, prompt_override=None, images=None, pages=None, schema=None):
+            source = next(iter(pdf_paths))
+            time.sleep(delays.get(source, 0))
+            if source == "wisdomtree":
+                return {"hy_spread_current": 2.84}
+            if source == "cme_sec09":
+                return {"rows": {"ultra": {"row_label": "TOTAL ULTRA T-BND FUT", "rth_volume": "1", "globex_volume": "2", "open_interest": "3", "oi_change": "4"}}}
+            return {"rows": {"sml": {"row_label": "TOTAL E-600 SMLCAP F", "total_volume": 1, "open_interest": 2, "oi_change": 3}}}
+        return fake
+
+    def test_passes_run_concurrently_and_merge(self):
+        with patch.object(extraction, "extract_metrics_gemini", side_effect=self.slow_gemini({"wisdomtree": 0.3, "cme_sec09": 0.3, "cme_sec11": 0.3})):
+            start = time.time()
+            metrics, sec09_raw, sec11_raw, _ = extraction.run_extraction(self.pdf_paths)
+            elapsed = time.time() - start
+
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(metrics["hy_spread_current"], 2.84)
+        self.assertEqual(sec09_raw["cme_section09"]["totals"]["ultra"]["oi_change"], "4")
+        self.assertEqual(sec11_raw["products"]["sml"]["open_interest"], 2)
+
+    @patch.object(extraction, "EXTRACTION_TIMEOUT", 0.2)
+    def test_timed_out_pass_is_skipped(self):
+        with patch.object(extraction, "extract_metrics_gemini", side_effect=self.slow_gemini({"cme_sec11": 1.0})) as mock_gemini:
+            metrics, sec09_raw, sec11_raw, _ = extraction.run_extraction(self.pdf_paths)
+
+        # The timed-out pass is not re-asked
+        sec11_calls = [c for c in mock_gemini.call_args_list if "cme_sec11" in c.args[0]]
+        self.assertEqual(len(sec11_calls), 1)
+
+        self.assertEqual(metrics["hy_spread_current"], 2.84)
+        self.assertIn("ultra", sec09_raw["cme_section09"]["totals"])
+        self.assertIsNone(sec11_raw["products"]["sml"])
+        self.assertIn("Missing SML row", sec11_raw["data_quality_notes"])
+
+if __name__ == '__main__':
+    unittest.main()
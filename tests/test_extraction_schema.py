@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import re
+import sys
+
+# Add scripts to path so we can import
+sys.path.append(os.path.join(os.getcwd(), 'scripts'))
+import extraction
+from extraction_schema import fields_schema, rows_schema, section_schema, validate, field_problem
+from prompts import EXTRACTION_FIELDS, EXTRACTION_PROMPT
+
+class TestSchemas(unittest.TestCase):
+
+    def test_fields_schema_types(self):
+        schema = fields_schema(EXTRACTION_FIELDS)
+        self.assertEqual(set(schema["required"]), set(EXTRACTION_FIELDS))
+        self.assertEqual(schema["properties"]["hy_spread_current"]["type"], "number")
+        self.assertEqual(schema["properties"]["cme_total_volume"]["type"], "integer")
+        self.assertEqual(schema["properties"]["cme_bulletin_date"]["type"], "string")
+
+    def test_prompt_keys_match_schema(self):
+        prompt_keys = re.findall(r'^  "(\w+)":', EXTRACTION_PROMPT, re.MULTILINE)
+        self.assertEqual(prompt_keys, list(fields_schema(EXTRACTION_FIELDS)["properties"]))
+
+    def test_row_schemas(self):
+        rows = rows_schema("cme_sec09", ["ultra"])["properties"]["rows"]
+        self.assertEqual(list(rows["properties"]), ["ultra"])
+        self.assertEqual(rows["properties"]["ultra"]["properties"]["oi_change"]["type"], "string")
+        sec11 = section_schema("cme_sec11")
+        self.assertEqual(sec11["properties"]["products"]["properties"]["es"]["properties"]["oi_change"]["type"], "integer")
+        self.assertIn("totals", section_schema("cme_sec09")["properties"]["cme_section09"]["properties"])
+
+class TestValidation(unittest.TestCase):
+
+    def test_scalar_fields(self):
+        valid, problems = validate("wisdomtree", {"hy_spread_current": 2.84, "forward_pe_current": 221, "yield_2y": "3.5%"},
+                                   ["hy_spread_current", "forward_pe_current", "yield_2y", "real_yield_10y"])
+        self.assertEqual(valid, {"hy_spread_current": 2.84})
+        self.assertIn("out of range", problems["forward_pe_current"])
+        self.assertIn("not a number", problems["yield_2y"])
+        self.assertEqual(problems["real_yield_10y"], "missing")
+        # Signed changes have no range
+        self.assertIsNone(field_problem("cme_sec01", "cme_rates_futures_oi_change", -120000))
+
+    def test_rows(self):
+        self.assertIsNone(field_problem("cme_sec09", "2y", {"rth_volume": "----", "globex_volume": "1,234", "open_interest": "5000", "oi_change": "UNCH"}))
+        self.assertIn("open_interest", field_problem("cme_sec09", "2y", {"rth_volume": "1", "globex_volume": "2", "open_interest": "----", "oi_change": "5"}))
+        self.assertIn("negative", field_problem("cme_sec11", "es", {"total_volume": 10, "open_interest": -5, "oi_change": 0}))
+
+    def test_row_without_optional_column(self):
+        # A short reply may leave out total_volume; it must not raise
+        valid, problems = validate("cme_sec11", {"es": {"row_label": "x", "open_interest": 5, "oi_change": 1}}, ["es"])
+        self.assertEqual(list(valid), ["es"])
+        self.assertEqual(problems, {})
+        valid, problems = validate("cme_sec11", {"es": {"row_label": "x", "open_interest": -5, "oi_change": 1}}, ["es"])
+        self.assertIn("negative", problems["es"])
+
+class TestStructuredOutput(unittest.TestCase):
+
+    def test_json_parsing_tolerates_wrapping(self):
+        self.assertEqual(extraction.parse_json_response('```json\n{"a": 1}\n```'), {"a": 1})
+        self.assertEqual(extraction.parse_json_response('Here you go: {"a": 1} Done.'), {"a": 1})
+        with self.assertRaises(ValueError):
+            extraction.parse_json_response("no json here")
+
+    @patch.object(extraction, "AI_STUDIO_API_KEY", "test-key")
+    @patch.object(extraction, "load_response", return_value=None)
+    @patch.object(extraction, "save_response")
+    @patch("extraction.genai")
+    def test_request_uses_json_mode_and_schema(self, mock_genai, *_):
+        mock_genai.GenerativeModel.return_value.generate_content.return_value = MagicMock(text='{"yield_2y": 3.5}')
+        schema = fields_schema(["yield_2y"])
+
+        data = extraction.extract_metrics_gemini({}, prompt_override="prompt", schema=schema)
+
+        self.assertEqual(data, {"yield_2y": 3.5})
+        config = mock_genai.GenerativeModel.call_args.kwargs["generation_config"]
+        self.assertEqual(config, {"response_mime_type": "application/json", "response_schema": schema})
+
+    @patch.object(extraction, "AI_STUDIO_API_KEY", "test-key")
+    @patch.object(extraction, "load_response", return_value={"yield_2y": 3.5})
+    def test_cache_key_covers_schema(self, mock_load):
+        extraction.extract_metrics_gemini({}, prompt_override="prompt", schema=fields_schema(["yield_2y"]))
+        extraction.extract_metrics_gemini({}, prompt_override="prompt", schema=fields_schema(["yield_2y", "yield_10y"]))
+        first, second = (call.args[0] for call in mock_load.call_args_list)
+        self.assertNotEqual(first, second)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add scripts to path so we can import
+sys.path.append(os.path.join(os.getcwd(), 'scripts'))
+import hedging
+from hedging import CircuitBreaker, hedged_call, hedge_delay, record_latency, mark_cache_hit
+
+def request(model, provider, text, delay=0.0, calls=None):
+    def fn(cancel):
+        if calls is not None: calls.append(model)
+        # Sleep in small steps so a cancelled request stops early, like a streamed one
+        deadline = time.monotonic() + delay
+        while time.monotonic() < deadline:
+            if cancel.is_set(): return "Error: Cancelled"
+            time.sleep(0.01)
+        return text
+    return (model, provider, fn)
+
+class TestHedging(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patcher = patch.object(hedging, "LATENCY_HISTORY_PATH", os.path.join(self.tmp.name, "latency_history.json"))
+        self.patcher.start()
+        self.breaker = CircuitBreaker(threshold=2, cooldown=60)
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp.cleanup()
+
+    def test_fast_primary_never_hedges(self):
+        calls = []
+        text, model = hedged_call(request("p/model", "p", "primary", calls=calls), request("b/model", "b", "backup", calls=calls), delay=0.5, breaker=self.breaker)
+        self.assertEqual((text, model), ("primary", "p/model"))
+        self.assertEqual(calls, ["p/model"])
+
+    def test_slow_primary_loses_to_backup_and_is_cancelled(self):
+        cancelled = threading.Event()
+        slow = request("p/model", "p", "primary", delay=2)
+
+        def primary_fn(cancel):
+            result = slow[2](cancel)
+            if cancel.is_set(): cancelled.set()
+            return result
+
+        start = time.monotonic()
+        text, model = hedged_call(("p/model", "p", primary_fn), request("b/model", "b", "backup"), delay=0.1, breaker=self.breaker)
+
+        self.assertEqual((text, model), ("backup", "b/model"))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertTrue(cancelled.wait(1))
+
+    def test_failing_primary_hedges_immediately(self):
+        start = time.monotonic()
+        text, model = hedged_call(request("p/model", "p", "Error 500: boom"), request("b/model", "b", "backup"), delay=5, breaker=self.breaker)
+        self.assertEqual(model, "b/model")
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_open_breaker_blocks_hedging(self):
+        self.breaker.record("b", False)
+        self.breaker.record("b", False)
+        calls = []
+        text, model = hedged_call(request("p/model", "p", "Error 500: boom", calls=calls), request("b/model", "b", "backup", calls=calls), delay=0, breaker=self.breaker)
+        self.assertEqual((text, model), ("Error 500: boom", "p/model"))
+        self.assertEqual(calls, ["p/model"])
+
+    def test_breaker_trips_and_recovers(self):
+        breaker = CircuitBreaker(threshold=2, cooldown=60)
+        breaker.record("p", False)
+        self.assertTrue(breaker.allow("p"))
+        breaker.record("p", False)
+        self.assertFalse(breaker.allow("p"))
+        with patch.object(hedging.time, "time", return_value=time.time() + 61):
+            self.assertTrue(breaker.allow("p"))
+        breaker.record("p", True)
+        self.assertTrue(breaker.allow("p"))
+
+    def test_breaker_state_persists(self):
+        path = os.path.join(self.tmp.name, "circuit_breaker.json")
+        breaker = CircuitBreaker(path, threshold=1, cooldown=60)
+        breaker.record("p", False)
+        self.assertFalse(CircuitBreaker(path, threshold=1, cooldown=60).allow("p"))
+
+    @patch.object(hedging, "HEDGE_MIN_SAMPLES", 5)
+    @patch.object(hedging, "HEDGE_DEFAULT_DELAY", 120)
+    def test_cache_hits_are_not_latency_samples(self):
+        def cached(cancel):
+            mark_cache_hit()
+            return "primary"
+        for _ in range(6):
+            hedged_call(("p/model", "p", cached), delay=0.5, breaker=self.breaker)
+        hedged_call(request("p/model", "p", "primary", delay=0.05), delay=0.5, breaker=self.breaker)
+        samples = hedging.load_json(hedging.LATENCY_HISTORY_PATH).get("p/model", [])
+        self.assertEqual(len(samples), 1)
+
+    def test_delay_uses_latency_percentile(self):
+        self.assertEqual(hedge_delay("p/model"), 120)
+        for seconds in [10, 11, 12, 13, 14, 15, 16, 17, 18, 60]:
+            record_latency("p/model", seconds)
+        self.assertEqual(hedge_delay("p/model", percentile=50), 14)
+        self.assertEqual(hedge_delay("p/model", percentile=100), 60)
+
+if __name__ == '__main__':
+    unittest.main()
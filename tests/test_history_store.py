@@ -0,0 +1,56 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import pandas as pd
+
+# Add scripts to path so we can import
+sys.path.append(os.path.join(os.getcwd(), 'scripts'))
+from history_store import MarketHistoryStore
+
+def bars(dates, closes):
+    return pd.DataFrame({
+        'Open': closes, 'High': closes, 'Low': closes, 'Close': closes, 'Volume': [float('nan')] * len(closes)
+    }, index=pd.DatetimeIndex(dates))
+
+class TestMarketHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.store = MarketHistoryStore(os.path.join(self.tmp, "market_history.sqlite"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_append_and_read_back(self):
+        written = self.store.append("^GSPC", bars(["2025-01-02", "2025-01-03"], [100.0, 101.5]))
+        self.assertEqual(written, 2)
+        hist = self.store.history("^GSPC")
+        self.assertEqual(list(hist['Close']), [100.0, 101.5])
+        self.assertEqual(hist.index[-1], pd.Timestamp("2025-01-03"))
+        self.assertTrue(pd.isna(hist['Volume'].iloc[0]))
+        self.assertTrue(self.store.history("HYG").empty)
+
+    def test_reappended_session_is_overwritten(self):
+        # A partial intraday bar is replaced by the final close on the next run
+        self.store.append("^VIX", bars(["2025-01-02", "2025-01-03"], [15.0, 16.0]))
+        self.store.append("^VIX", bars(["2025-01-03", "2025-01-06"], [17.0, 18.0]))
+        hist = self.store.history("^VIX")
+        self.assertEqual(list(hist['Close']), [15.0, 17.0, 18.0])
+
+    def test_rows_without_close_are_skipped(self):
+        written = self.store.append("CL=F", bars(["2025-01-02", "2025-01-03"], [70.0, float('nan')]))
+        self.assertEqual(written, 1)
+
+    def test_fetch_start(self):
+        self.store.append("^GSPC", bars(["2025-01-02", "2025-01-06"], [100.0, 101.0]))
+        self.store.append("HYG", bars(["2025-01-02", "2025-01-03"], [80.0, 80.5]))
+        self.assertEqual(self.store.last_dates(["^GSPC", "HYG"]), {"^GSPC": "2025-01-06", "HYG": "2025-01-03"})
+        # Oldest latest-session across tickers, so one download covers every gap
+        self.assertEqual(self.store.fetch_start(["^GSPC", "HYG"]), "2025-01-03")
+        # A ticker with no history needs the full seed period
+        self.assertIsNone(self.store.fetch_start(["^GSPC", "HYG", "^VIX"]))
+
+if __name__ == '__main__':
+    unittest.main()
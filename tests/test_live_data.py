@@ -4,15 +4,33 @@ import pandas as pd
 from datetime import datetime, timedelta
 import sys
 import os
+import shutil
+import tempfile
 
 # Add scripts to path so we can import
 sys.path.append(os.path.join(os.getcwd(), 'scripts'))
 from fetch_and_summarize import fetch_live_data
+from config import LIVE_TICKERS, RETRY_ATTEMPTS
+
+def batch_frame(hist, overrides=None):
+    """Combined yf.download(group_by="ticker") frame: `hist` for every registry ticker unless overridden."""
+    frames = {ticker: hist for ticker, _ in LIVE_TICKERS.values()}
+    frames.update(overrides or {})
+    return pd.concat(frames, axis=1)
 
 class TestLiveData(unittest.TestCase):
 
-    @patch('yfinance.Ticker')
-    def test_sp500_trend_logic_yesterday(self, mock_ticker):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.store_path = patch('history_store.HISTORY_STORE_PATH', os.path.join(self.tmp, 'market_history.sqlite'))
+        self.store_path.start()
+
+    def tearDown(self):
+        self.store_path.stop()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    @patch('yfinance.download')
+    def test_sp500_trend_logic_yesterday(self, mock_download):
         # Setup mock data: 60 trading days
         dates = pd.date_range(end=datetime.now() - timedelta(days=1), periods=60, freq='B')
         mock_hist = pd.DataFrame({
@@ -25,9 +43,7 @@ class TestLiveData(unittest.TestCase):
         mock_hist.iloc[-1, 0] = 105.0 # Current
         mock_hist.iloc[-22, 0] = 100.0 # Prior
         
-        mock_instance = MagicMock()
-        mock_instance.history.return_value = mock_hist
-        mock_ticker.return_value = mock_instance
+        mock_download.return_value = batch_frame(mock_hist)
         
         data = fetch_live_data()
         
@@ -37,9 +53,9 @@ class TestLiveData(unittest.TestCase):
         self.assertIn(dates[-1].strftime('%Y-%m-%d'), data['sp500_trend_audit'])
         self.assertIn(dates[-22].strftime('%Y-%m-%d'), data['sp500_trend_audit'])
 
-    @patch('yfinance.Ticker')
+    @patch('yfinance.download')
     @patch('fetch_and_summarize.datetime')
-    def test_sp500_trend_logic_today_exclusion(self, mock_datetime, mock_ticker):
+    def test_sp500_trend_logic_today_exclusion(self, mock_datetime, mock_download):
         # Setup mock data: 60 trading days
         fixed_now = datetime(2025, 12, 19, 12, 0, 0) # A Friday
         mock_datetime.now.return_value = fixed_now
@@ -55,9 +71,7 @@ class TestLiveData(unittest.TestCase):
         mock_hist.iloc[-2, 0] = 95.0 # Yesterday (Current for analysis)
         mock_hist.iloc[-23, 0] = 100.0 # Prior
         
-        mock_instance = MagicMock()
-        mock_instance.history.return_value = mock_hist
-        mock_ticker.return_value = mock_instance
+        mock_download.return_value = batch_frame(mock_hist)
         
         data = fetch_live_data()
         
@@ -66,26 +80,24 @@ class TestLiveData(unittest.TestCase):
         self.assertIn(dates[-2].strftime('%Y-%m-%d'), data['sp500_trend_audit'])
         self.assertIn(dates[-23].strftime('%Y-%m-%d'), data['sp500_trend_audit'])
 
-    @patch('yfinance.Ticker')
-    def test_insufficient_data(self, mock_ticker):
+    @patch('yfinance.download')
+    def test_insufficient_data(self, mock_download):
         # Setup mock data: only 10 days
         dates = pd.date_range(end=datetime.now(), periods=10, freq='B')
         mock_hist = pd.DataFrame({
             'Close': [100.0] * 10
         }, index=dates)
         
-        mock_instance = MagicMock()
-        mock_instance.history.return_value = mock_hist
-        mock_ticker.return_value = mock_instance
+        mock_download.return_value = batch_frame(mock_hist)
         
         data = fetch_live_data()
         
         self.assertEqual(data['sp500_trend_status'], "Unknown")
         self.assertEqual(data['sp500_trend_audit'], "Insufficient data")
 
-    @patch('yfinance.Ticker')
+    @patch('yfinance.download')
     @patch('fetch_and_summarize.datetime')
-    def test_stale_data(self, mock_datetime, mock_ticker):
+    def test_stale_data(self, mock_datetime, mock_download):
         # Setup: Today is Monday Dec 22
         fixed_now = datetime(2025, 12, 22, 12, 0, 0) # A Monday
         mock_datetime.now.return_value = fixed_now
@@ -97,18 +109,16 @@ class TestLiveData(unittest.TestCase):
             'Close': [100.0] * 60
         }, index=dates)
         
-        mock_instance = MagicMock()
-        mock_instance.history.return_value = mock_hist
-        mock_ticker.return_value = mock_instance
+        mock_download.return_value = batch_frame(mock_hist)
         
         data = fetch_live_data()
         
         self.assertEqual(data['sp500_trend_status'], "Unknown")
         self.assertIn("Data Stale", data['sp500_trend_audit'])
 
-    @patch('yfinance.Ticker')
+    @patch('yfinance.download')
     @patch('fetch_and_summarize.datetime')
-    def test_single_row_today_crash(self, mock_datetime, mock_ticker):
+    def test_single_row_today_crash(self, mock_datetime, mock_download):
         # Setup: Today is Monday
         fixed_now = datetime(2025, 12, 22, 12, 0, 0)
         mock_datetime.now.return_value = fixed_now
@@ -119,9 +129,7 @@ class TestLiveData(unittest.TestCase):
             'Close': [100.0]
         }, index=dates)
         
-        mock_instance = MagicMock()
-        mock_instance.history.return_value = mock_hist
-        mock_ticker.return_value = mock_instance
+        mock_download.return_value = batch_frame(mock_hist)
         
         data = fetch_live_data()
         
@@ -129,5 +137,107 @@ class TestLiveData(unittest.TestCase):
         self.assertEqual(data['sp500_trend_status'], "Unknown")
         self.assertIn("Insufficient data", data['sp500_trend_audit'])
 
+    @patch('yfinance.download')
+    def test_single_batched_download(self, mock_download):
+        dates = pd.date_range(end=datetime.now() - timedelta(days=1), periods=60, freq='B')
+        flat = pd.DataFrame({'Close': [100.0] * 60}, index=dates)
+        tnx = pd.DataFrame({'Close': [4.0] * 59 + [4.125]}, index=dates)
+        # Crude trades on a session the others did not: that row is NaN for everyone else
+        wti_dates = pd.DatetimeIndex([dates[0] - timedelta(days=7)]).append(dates)
+        wti = pd.DataFrame({'Close': [70.0] * 60 + [77.0]}, index=wti_dates)
+        mock_download.return_value = batch_frame(flat, {"^TNX": tnx, "CL=F": wti})
+
+        data = fetch_live_data()
+
+        self.assertEqual(mock_download.call_count, 1)
+        tickers = mock_download.call_args.kwargs["tickers"]
+        self.assertEqual(sorted(tickers), sorted(t for t, _ in LIVE_TICKERS.values()))
+        self.assertEqual(data['vix_index'], 100.0)
+        self.assertEqual(data['ust10y_current'], 4.12)
+        self.assertEqual(data['ust10y_change_bps'], 12.5)
+        self.assertEqual(data['wti_1d_chg'], 10.0)
+        self.assertEqual(data['hyg_1d_chg'], 0.0)
+        self.assertEqual(data['sp500_trend_status'], "Flat (Range-Bound)")
+
+    @patch('yfinance.download')
+    @patch('outbound.backoff_delay', return_value=0)
+    def test_missing_ticker(self, _, mock_download):
+        dates = pd.date_range(end=datetime.now() - timedelta(days=1), periods=60, freq='B')
+        flat = pd.DataFrame({'Close': [100.0] * 60}, index=dates)
+        frames = {ticker: flat for ticker, _ in LIVE_TICKERS.values() if ticker != "HYG"}
+        mock_download.return_value = pd.concat(frames, axis=1)
+
+        data = fetch_live_data()
+        # Retried as a swallowed per-ticker failure, then the partial frame is used
+        self.assertEqual(mock_download.call_count, RETRY_ATTEMPTS)
+        self.assertNotIn('hyg_current', data)
+        self.assertEqual(data['dxy_current'], 100.0)
+
+    @patch('yfinance.download')
+    @patch('outbound.backoff_delay', return_value=0)
+    def test_rate_limited_ticker_is_retried(self, _, mock_download):
+        dates = pd.date_range(end=datetime.now() - timedelta(days=1), periods=60, freq='B')
+        flat = pd.DataFrame({'Close': [100.0] * 60}, index=dates)
+        # yf.download reports a 429 for one ticker as an all-NaN column
+        limited = pd.DataFrame({'Close': [float('nan')] * 60}, index=dates)
+        mock_download.side_effect = [batch_frame(flat, {"HYG": limited}), batch_frame(flat)]
+
+        data = fetch_live_data()
+        self.assertEqual(mock_download.call_count, 2)
+        self.assertEqual(data['hyg_current'], 100.0)
+
+    @patch('yfinance.download')
+    def test_failed_download_empty_store(self, mock_download):
+        mock_download.side_effect = ValueError("boom")
+        data = fetch_live_data()
+        self.assertEqual(data['sp500_trend_status'], "Unknown")
+        self.assertIn("boom", data['sp500_trend_audit'])
+
+    @patch('yfinance.download')
+    def test_incremental_fetch_from_store(self, mock_download):
+        dates = pd.date_range(end=datetime.now() - timedelta(days=1), periods=60, freq='B')
+        # First run: nothing stored, so the full period is downloaded (all but the last session)
+        mock_download.return_value = batch_frame(pd.DataFrame({'Close': [100.0] * 59}, index=dates[:-1]))
+        fetch_live_data()
+        self.assertEqual(mock_download.call_args.kwargs.get("period"), "2mo")
+        self.assertNotIn("start", mock_download.call_args.kwargs)
+
+        # Second run: only sessions from the last stored date are requested
+        mock_download.return_value = batch_frame(pd.DataFrame({'Close': [100.0, 103.0]}, index=dates[-2:]))
+        data = fetch_live_data()
+        self.assertEqual(mock_download.call_args.kwargs["start"], dates[-2].strftime('%Y-%m-%d'))
+        self.assertNotIn("period", mock_download.call_args.kwargs)
+        # The 21-session trend spans stored and newly fetched sessions
+        self.assertEqual(data['sp500_1mo_change_pct'], 3.0)
+        self.assertEqual(data['sp500_trend_status'], "Trending Up")
+        self.assertEqual(data['hyg_1d_chg'], 3.0)
+
+    @patch('yfinance.download')
+    def test_failed_download_reads_store(self, mock_download):
+        dates = pd.date_range(end=datetime.now() - timedelta(days=20), periods=60, freq='B')
+        mock_download.return_value = batch_frame(pd.DataFrame({'Close': [100.0] * 60}, index=dates))
+        fetch_live_data()
+
+        mock_download.return_value = None
+        mock_download.side_effect = ValueError("boom")
+        data = fetch_live_data()
+        # Stored history is used, but stale bars are never reported as live values
+        for field in ('vix_index', 'ust10y_current', 'dxy_1d_chg', 'wti_1d_chg', 'hyg_current'):
+            self.assertNotIn(field, data)
+        self.assertEqual(data['sp500_trend_status'], "Unknown")
+        self.assertIn("Data Stale", data['sp500_trend_audit'])
+
+    @patch('yfinance.download')
+    def test_failed_download_uses_recent_store(self, mock_download):
+        dates = pd.date_range(end=datetime.now() - timedelta(days=1), periods=60, freq='B')
+        mock_download.return_value = batch_frame(pd.DataFrame({'Close': [100.0] * 60}, index=dates))
+        fetch_live_data()
+
+        mock_download.return_value = None
+        mock_download.side_effect = ValueError("boom")
+        data = fetch_live_data()
+        self.assertEqual(data['vix_index'], 100.0)
+        self.assertEqual(data['sp500_trend_status'], "Flat (Range-Bound)")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import sys
+import tempfile
+import time
+
+# Add scripts to path so we can import
+sys.path.append(os.path.join(os.getcwd(), 'scripts'))
+import llm_cache
+from llm_cache import response_key, load_response, save_response
+import fetch_and_summarize
+
+class TestLlmCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patcher = patch.object(llm_cache, "LLM_CACHE_DIR", os.path.join(self.tmp.name, "llm_responses"))
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp.cleanup()
+
+    def test_key_covers_model_prompt_and_inputs(self):
+        base = response_key("m1", "prompt", ["image/png:abc"])
+        self.assertEqual(base, response_key("m1", "prompt", ["image/png:abc"]))
+        self.assertNotEqual(base, response_key("m2", "prompt", ["image/png:abc"]))
+        self.assertNotEqual(base, response_key("m1", "prompt!", ["image/png:abc"]))
+        self.assertNotEqual(base, response_key("m1", "prompt", ["image/png:abd"]))
+        schema = {"type": "OBJECT", "properties": {"yield_2y": {"type": "NUMBER"}}}
+        with_schema = response_key("m1", "prompt", ["image/png:abc"], {"response_schema": schema})
+        self.assertNotEqual(base, with_schema)
+        self.assertNotEqual(with_schema, response_key("m1", "prompt", ["image/png:abc"], {"response_schema": {"type": "OBJECT"}}))
+
+    def test_roundtrip_ttl_and_bypass(self):
+        key = response_key("m1", "prompt", [])
+        save_response(key, "m1", {"hy_spread_current": 2.84})
+
+        self.assertEqual(load_response(key, bypass=False), {"hy_spread_current": 2.84})
+        self.assertIsNone(load_response(key, bypass=True))
+        with patch.object(llm_cache.time, "time", return_value=time.time() + 3 * 3600):
+            self.assertIsNone(load_response(key, bypass=False, ttl_hours=2))
+
+    def test_lru_eviction_keeps_recent_entries(self):
+        keys = [response_key("m1", f"prompt {i}", []) for i in range(3)]
+        for i, key in enumerate(keys):
+            save_response(key, "m1", "x" * 400)
+            os.utime(llm_cache.response_path(key), (time.time() - 100 + i, time.time() - 100 + i))
+        load_response(keys[0], bypass=False)  # Oldest entry becomes most recent
+
+        save_response(response_key("m1", "prompt 3", []), "m1", "x" * 400, max_mb=1300 / (1024 * 1024))
+
+        self.assertTrue(os.path.exists(llm_cache.response_path(keys[0])))
+        self.assertFalse(os.path.exists(llm_cache.response_path(keys[1])))
+
+    @patch.object(fetch_and_summarize, "RUN_MODE", "BENCHMARK_JSON")
+    @patch.object(fetch_and_summarize, "OPENROUTER_STREAM", False)
+    @patch.object(fetch_and_summarize, "OPENROUTER_API_KEY", "test-key")
+    @patch('fetch_and_summarize.requests.post')
+    def test_rerun_of_same_request_is_served_from_cache(self, mock_post):
+        with patch.object(llm_cache, "LLM_CACHE_BYPASS", False):
+            mock_post.return_value = MagicMock(status_code=200, json=lambda: {"choices": [{"message": {"content": "Summary"}}]})
+            first = fetch_and_summarize.summarize_openrouter({}, {"calculated_scores": {"Risk Appetite": 1}}, {}, model_override="vendor/model")
+            second = fetch_and_summarize.summarize_openrouter({}, {"calculated_scores": {"Risk Appetite": 1}}, {}, model_override="vendor/model")
+            fetch_and_summarize.summarize_openrouter({}, {"calculated_scores": {"Risk Appetite": 2}}, {}, model_override="vendor/model")
+
+        self.assertEqual(first, "Summary")
+        self.assertEqual(second, "Summary")
+        self.assertEqual(mock_post.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add scripts to path so we can import
+sys.path.append(os.path.join(os.getcwd(), 'scripts'))
+import fetch_and_summarize
+import hedging
+from fetch_and_summarize import openrouter_body, prepare_openrouter_payload, summarize_openrouter
+from streaming import stream_chat_completion, MODEL_METRICS
+
+IMAGES = [("image/png", "aGVsbG8="), ("image/jpeg", "d29ybGQ=")]
+
+@patch.object(fetch_and_summarize, "RUN_MODE", "BENCHMARK")
+@patch.object(fetch_and_summarize, "OPENROUTER_API_KEY", "test-key")
+@patch.object(fetch_and_summarize, "load_response", return_value=None)
+@patch.object(fetch_and_summarize, "save_response")
+class TestOpenRouterPayload(unittest.TestCase):
+
+    @patch.object(fetch_and_summarize, "build_vision_images", return_value=IMAGES)
+    def test_body_matches_full_encoding(self, mock_images, *_):
+        payload = prepare_openrouter_payload({}, {}, {"flags_today": ["MONTHLY_OPEX"]})
+        body = json.loads(openrouter_body(payload, "vendor/model"))
+
+        self.assertEqual(body["model"], "vendor/model")
+        content = body["messages"][0]["content"]
+        # Static prompt, images, then the day's data
+        self.assertEqual(content[0]["type"], "text")
+        self.assertNotIn("cache_control", content[0])
+        self.assertEqual(content[2]["image_url"]["url"], "data:image/jpeg;base64,d29ybGQ=")
+        self.assertIn('"flags_today":["MONTHLY_OPEX"]', content[3]["text"])
+        self.assertEqual(body["usage"], {"include": True})
+
+    @patch.object(fetch_and_summarize, "OPENROUTER_STREAM", False)
+    @patch('fetch_and_summarize.requests.post')
+    @patch.object(fetch_and_summarize, "build_vision_images", return_value=IMAGES)
+    def test_shared_payload_is_built_once(self, mock_images, mock_post, *_):
+        mock_post.return_value = MagicMock(status_code=200, json=lambda: {"choices": [{"message": {"content": "ok"}}]})
+        payload = prepare_openrouter_payload({}, {}, {})
+        for model in ["vendor/a", "vendor/b", "vendor/c"]:
+            summarize_openrouter({}, {}, {}, model_override=model, payload=payload)
+
+        self.assertEqual(mock_images.call_count, 1)
+        bodies = [call.kwargs["data"] for call in mock_post.call_args_list]
+        self.assertEqual([json.loads(b)["model"] for b in bodies], ["vendor/a", "vendor/b", "vendor/c"])
+        # Everything after the model field is the same pre-encoded bytes
+        self.assertEqual(len({b.split(b', "messages": ', 1)[1] for b in bodies}), 1)
+
+    @patch.object(fetch_and_summarize, "HEDGE_ENABLED", True)
+    @patch.object(fetch_and_summarize, "HEDGE_BACKUPS", {"gemini": "vendor/backup", "openrouter": "vendor/backup"})
+    @patch.object(fetch_and_summarize, "OPENROUTER_STREAM", False)
+    @patch('fetch_and_summarize.requests.post')
+    @patch('fetch_and_summarize.summarize_gemini')
+    @patch.object(fetch_and_summarize, "build_vision_images", return_value=IMAGES)
+    def test_hedged_payload_is_built_lazily(self, mock_images, mock_gemini, mock_post, *_):
+        mock_gemini.side_effect = lambda *a: "gemini ok"
+        mock_post.return_value = MagicMock(status_code=200, json=lambda: {"choices": [{"message": {"content": "ok"}}]})
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.object(hedging, "LATENCY_HISTORY_PATH", os.path.join(tmp, "latency_history.json")), \
+                patch.object(hedging.BREAKER, "path", None):
+            # A Gemini primary that answers in time never renders the OpenRouter images
+            self.assertEqual(fetch_and_summarize.summarize_hedged("gemini", {}, {}, {}), "gemini ok")
+            self.assertEqual(mock_images.call_count, 0)
+
+            self.assertEqual(fetch_and_summarize.summarize_hedged("openrouter", {}, {}, {}), "ok")
+            self.assertEqual(mock_images.call_count, 1)
+
+@patch.object(fetch_and_summarize, "RUN_MODE", "PRODUCTION")
+@patch.object(fetch_and_summarize, "build_vision_images", return_value=IMAGES)
+class TestPromptCaching(unittest.TestCase):
+
+    def test_static_prefix_is_identical_across_days(self, *_):
+        monday = prepare_openrouter_payload({}, {"calculated_scores": {"Risk Appetite": 6.5}}, {"as_of": "2025-12-15"})
+        tuesday = prepare_openrouter_payload({}, {"calculated_scores": {"Risk Appetite": 4.0}}, {"as_of": "2025-12-16"})
+        self.assertEqual(monday["prefix_json"], tuesday["prefix_json"])
+        self.assertNotEqual(monday["rest_json"], tuesday["rest_json"])
+
+    def test_cache_control_only_where_needed(self, *_):
+        payload = prepare_openrouter_payload({}, {}, {})
+        for model, expected in [("anthropic/claude-sonnet-4.5", True), ("google/gemini-3-pro-preview", True), ("openai/gpt-5.2", False)]:
+            content = json.loads(openrouter_body(payload, model))["messages"][0]["content"]
+            self.assertEqual("cache_control" in content[0], expected, model)
+            self.assertTrue(all("cache_control" not in part for part in content[1:]))
+            self.assertEqual(content[0]["text"], fetch_and_summarize.SUMMARY_SYSTEM_PROMPT)
+
+    @patch.object(fetch_and_summarize, "OPENROUTER_STREAM", False)
+    @patch.object(fetch_and_summarize, "OPENROUTER_API_KEY", "test-key")
+    @patch.object(fetch_and_summarize, "load_response", return_value=None)
+    @patch.object(fetch_and_summarize, "save_response")
+    @patch('fetch_and_summarize.requests.post')
+    def test_cached_tokens_recorded_without_streaming(self, mock_post, *_):
+        mock_post.return_value = MagicMock(status_code=200, json=lambda: {
+            "choices": [{"message": {"content": "ok"}}],
+            "usage": {"prompt_tokens": 1500, "prompt_tokens_details": {"cached_tokens": 1200}}
+        })
+        summarize_openrouter({}, {}, {}, model_override="anthropic/claude-opus-4.5")
+        self.assertEqual(MODEL_METRICS["anthropic/claude-opus-4.5"]["cached_tokens"], 1200)
+        self.assertEqual(MODEL_METRICS["anthropic/claude-opus-4.5"]["prompt_tokens"], 1500)
+
+def sse(event):
+    return f"data: {json.dumps(event)}\n\n".encode("utf-8")
+
+def delta(text):
+    return sse({"choices": [{"delta": {"content": text}}]})
+
+class StreamHandler(BaseHTTPRequestHandler):
+    """Stand-in for OpenRouter's SSE endpoint. The path picks the behaviour."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StreamHandler.last_body = body
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        if self.path == "/ok":
+            self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+            time.sleep(0.1)
+            for word in ["Markets ", "were ", "calm."]:
+                self.wfile.write(delta(word))
+                self.wfile.flush()
+            self.wfile.write(sse({"choices": [], "usage": {"completion_tokens": 3, "prompt_tokens": 2000, "prompt_tokens_details": {"cached_tokens": 1800}}}))
+            self.wfile.write(b"data: [DONE]\n\n")
+        elif self.path == "/stall":
+            self.wfile.write(delta("Partial "))
+            self.wfile.flush()
+            # Only keep-alives from here on
+            for _ in range(20):
+                time.sleep(0.05)
+                self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+                self.wfile.flush()
+        elif self.path == "/silent":
+            time.sleep(1)
+        elif self.path == "/error":
+            self.wfile.write(sse({"error": {"message": "Provider overloaded"}}))
+
+    def log_message(self, *args):
+        pass
+
+class TestOpenRouterStreaming(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StreamHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def stream(self, path, idle_timeout=0.3, total_timeout=5):
+        return stream_chat_completion(f"{self.base_url}{path}", {"Content-Type": "application/json"}, b"{}", total_timeout, idle_timeout)
+
+    def test_deltas_are_accumulated_with_metrics(self):
+        result = self.stream("/ok")
+        self.assertIsNone(result["error"])
+        self.assertEqual(result["text"], "Markets were calm.")
+        self.assertGreaterEqual(result["ttft"], 0.1)
+        self.assertEqual(result["completion_tokens"], 3)
+        self.assertGreater(result["tokens_per_sec"], 0)
+        self.assertEqual((result["prompt_tokens"], result["cached_tokens"]), (2000, 1800))
+
+    def test_keep_alives_do_not_hide_a_stall(self):
+        result = self.stream("/stall", idle_timeout=0.3)
+        self.assertIn("stalled", result["error"])
+        self.assertEqual(result["text"], "Partial ")
+
+    def test_silent_socket_times_out(self):
+        result = self.stream("/silent", idle_timeout=0.2)
+        self.assertIn("stalled", result["error"])
+
+    def test_total_timeout(self):
+        result = self.stream("/stall", idle_timeout=5, total_timeout=0.3)
+        self.assertIn("total timeout", result["error"])
+
+    def test_error_event(self):
+        self.assertIn("Provider overloaded", self.stream("/error")["error"])
+
+    @patch.object(fetch_and_summarize, "RUN_MODE", "BENCHMARK_JSON")
+    @patch.object(fetch_and_summarize, "OPENROUTER_STREAM", True)
+    @patch.object(fetch_and_summarize, "OPENROUTER_API_KEY", "test-key")
+    @patch.object(fetch_and_summarize, "load_response", return_value=None)
+    @patch.object(fetch_and_summarize, "save_response")
+    def test_summarize_openrouter_streams(self, mock_save, *_):
+        with patch.object(fetch_and_summarize, "OPENROUTER_URL", f"{self.base_url}/ok"):
+            summary = summarize_openrouter({}, {}, {}, model_override="vendor/model")
+
+        self.assertEqual(summary, "Markets were calm.")
+        self.assertTrue(StreamHandler.last_body["stream"])
+        self.assertEqual(MODEL_METRICS["vendor/model"]["cached_tokens"], 1800)
+        mock_save.assert_called_once()
+
+        with patch.object(fetch_and_summarize, "OPENROUTER_URL", f"{self.base_url}/error"):
+            self.assertTrue(summarize_openrouter({}, {}, {}, model_override="vendor/model").startswith("OpenRouter Error"))
+
+if __name__ == '__main__':
+    unittest.main()
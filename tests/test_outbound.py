@@ -0,0 +1,134 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+
+# Add scripts to path so we can import
+sys.path.append(os.path.join(os.getcwd(), 'scripts'))
+import outbound
+from outbound import TokenBucket, send, retry_after_seconds
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Fails the first `failures` requests on each path, then answers 200."""
+    hits = {}
+
+    def do_GET(self):
+        count = FlakyHandler.hits.get(self.path, 0) + 1
+        FlakyHandler.hits[self.path] = count
+        if self.path.startswith("/rate-limited") and count == 1:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+        elif self.path.startswith("/unavailable") and count <= 2:
+            self.send_response(503)
+        elif self.path.startswith("/down"):
+            self.send_response(503)
+        elif self.path.startswith("/missing"):
+            self.send_response(404)
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+@patch.object(outbound, "RETRY_BASE_DELAY", 0.01)
+class TestSend(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        FlakyHandler.hits = {}
+
+    def get(self, path, **kwargs):
+        return send("local", lambda: requests.get(self.base + path, timeout=5), **kwargs)
+
+    def test_retries_429_honouring_retry_after(self):
+        response = self.get("/rate-limited")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(FlakyHandler.hits["/rate-limited"], 2)
+
+    def test_retries_5xx_with_backoff(self):
+        response = self.get("/unavailable")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(FlakyHandler.hits["/unavailable"], 3)
+
+    def test_gives_up_with_last_response(self):
+        response = self.get("/down", attempts=3)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(FlakyHandler.hits["/down"], 3)
+
+    def test_client_errors_are_not_retried(self):
+        response = self.get("/missing")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(FlakyHandler.hits["/missing"], 1)
+
+    def test_connection_errors_retried_then_raised(self):
+        calls = []
+        def refuse():
+            calls.append(1)
+            raise requests.ConnectionError("refused")
+        with self.assertRaises(requests.ConnectionError):
+            send("local", refuse, attempts=3)
+        self.assertEqual(len(calls), 3)
+
+        calls.clear()
+        with self.assertRaises(requests.ConnectionError):
+            send("local", refuse, retry_exceptions=False)
+        self.assertEqual(len(calls), 1)
+
+    def test_client_library_errors_by_name(self):
+        class ResourceExhausted(Exception): pass
+        outcomes = [ResourceExhausted("429 quota"), "done"]
+        def call():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception): raise outcome
+            return outcome
+        self.assertEqual(send("gemini-test", call), "done")
+
+        with self.assertRaises(ValueError):
+            send("gemini-test", lambda: (_ for _ in ()).throw(ValueError("bad request")))
+
+class TestRetryAfter(unittest.TestCase):
+
+    def response(self, value):
+        r = requests.Response()
+        if value is not None:
+            r.headers["Retry-After"] = value
+        return r
+
+    def test_forms(self):
+        self.assertEqual(retry_after_seconds(self.response("7")), 7.0)
+        self.assertIsNone(retry_after_seconds(self.response(None)))
+        self.assertIsNone(retry_after_seconds(self.response("soon")))
+        # HTTP-date in the past means "now"
+        self.assertEqual(retry_after_seconds(self.response("Wed, 21 Oct 2015 07:28:00 GMT")), 0.0)
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_then_paced(self):
+        bucket = TokenBucket(rate=20, capacity=3)
+        started = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        self.assertLess(time.monotonic() - started, 0.03)
+        for _ in range(4):
+            bucket.acquire()
+        # 4 calls beyond the burst at 20/s take ~0.2s
+        self.assertGreaterEqual(time.monotonic() - started, 0.18)
+
+if __name__ == '__main__':
+    unittest.main()
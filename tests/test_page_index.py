@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import fitz
+
+# Add scripts to path so we can import
+sys.path.append(os.path.join(os.getcwd(), 'scripts'))
+import page_index
+from page_index import relevant_pages, page_count
+from rasterizer import vision_pages
+from cme_parser import parse_sec09
+
+def make_pdf(path, page_lines):
+    doc = fitz.open()
+    for lines in page_lines:
+        page = doc.new_page(width=792, height=612)
+        for i, line in enumerate(lines):
+            page.insert_text((20, 30 + 12 * i), line, fontsize=8, fontname="cour")
+    doc.save(path)
+    doc.close()
+
+class TestPageIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patches = [
+            patch.object(page_index, "PAGE_INDEX_DIR", os.path.join(self.tmp.name, "page_index")),
+            patch.object(page_index, "_INDEXES", {}),
+        ]
+        for p in self.patches: p.start()
+        self.pdf_path = os.path.join(self.tmp.name, "sec09.pdf")
+        make_pdf(self.pdf_path, [
+            ["PG09 BULLETIN # 243@ Fri, Dec 19, 2025", "INTEREST RATE OPTIONS"],
+            ["EURODOLLAR FUTURES", "TOTAL SOFR FUT  100  200  300  4"],
+            ["TOTAL 10-YR NOTE FUTURES  600000  1700000  5000000-  98765"],
+            ["TOTAL 30Y BOND FUT  150000  400000  1900000-  1000"],
+            ["GLOSSARY"],
+        ])
+
+    def tearDown(self):
+        for p in self.patches: p.stop()
+        self.tmp.cleanup()
+
+    def test_anchor_pages(self):
+        self.assertEqual(relevant_pages(self.pdf_path, ["TOTAL 10-YR NOTE FUTURES"]), [2])
+        self.assertEqual(relevant_pages(self.pdf_path, ["total 10-yr note futures", "TOTAL 30Y BOND FUT"]), [2, 3])
+        self.assertEqual(relevant_pages(self.pdf_path, ["TOTAL ULTRA T-BND FUT"]), [])
+        self.assertEqual(page_count(self.pdf_path), 5)
+
+    def test_index_is_built_once_per_content_hash(self):
+        relevant_pages(self.pdf_path, ["GLOSSARY"])
+        copy_path = os.path.join(self.tmp.name, "copy.pdf")
+        with open(self.pdf_path, "rb") as src, open(copy_path, "wb") as dst:
+            dst.write(src.read())
+
+        with patch.object(page_index, "_INDEXES", {}), patch.object(page_index, "build_page_index") as build:
+            self.assertEqual(relevant_pages(copy_path, ["GLOSSARY"]), [4])
+        build.assert_not_called()
+
+    def test_concurrent_indexing_of_same_pdf(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: relevant_pages(self.pdf_path, ["GLOSSARY"]), range(8)))
+        self.assertEqual(results, [[4]] * 8)
+        # One index file, no temp files left behind
+        self.assertEqual(len(os.listdir(page_index.PAGE_INDEX_DIR)), 1)
+
+    def test_vision_pages_select_section_pages(self):
+        self.assertEqual(vision_pages("cme_sec09", self.pdf_path), [2, 3])
+        self.assertEqual(vision_pages("cme_sec09", self.pdf_path, ["30y"]), [3])
+        # No anchor hits: CME falls back to the first page
+        self.assertEqual(vision_pages("cme_sec11", self.pdf_path), [0])
+
+    def test_parser_reads_only_indexed_pages(self):
+        sec09 = parse_sec09(self.pdf_path)["cme_section09"]
+        self.assertEqual(sorted(sec09["totals"]), ["10y", "30y"])
+        self.assertEqual(sec09["bulletin_date"], "2025-12-19")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import fitz
+
+# Add scripts to path so we can import
+sys.path.append(os.path.join(os.getcwd(), 'scripts'))
+import pdf_uploads
+from pdf_uploads import UploadRegistry, subset_pdf, upload_pdf
+
+def make_pdf(path, pages=6):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=612, height=792)
+        for line in range(40):
+            page.insert_text((20, 20 + 18 * line), f"Page {i + 1} line {line} " + "x" * 60, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+class TestPdfSubset(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patcher = patch.object(pdf_uploads, "SUBSET_DIR", os.path.join(self.tmp.name, "subsets"))
+        self.patcher.start()
+        self.pdf_path = os.path.join(self.tmp.name, "doc.pdf")
+        make_pdf(self.pdf_path)
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp.cleanup()
+
+    def test_subset_keeps_only_selected_pages(self):
+        path = subset_pdf(self.pdf_path, [4, 1])
+        with fitz.open(path) as doc:
+            self.assertEqual(len(doc), 2)
+            self.assertIn("Page 2 line 0", doc[0].get_text())
+            self.assertIn("Page 5 line 0", doc[1].get_text())
+        self.assertLess(os.path.getsize(path), os.path.getsize(self.pdf_path))
+
+    def test_subset_is_cached_by_page_set(self):
+        first = subset_pdf(self.pdf_path, [0, 2])
+        with patch.object(pdf_uploads.fitz, "open") as fitz_open:
+            second = subset_pdf(self.pdf_path, [2, 0])
+        fitz_open.assert_not_called()
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, subset_pdf(self.pdf_path, [0]))
+
+    def test_concurrent_subsets_of_same_pages(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            paths = list(pool.map(lambda _: subset_pdf(self.pdf_path, [1, 3]), range(8)))
+        self.assertEqual(len(set(paths)), 1)
+        with fitz.open(paths[0]) as doc:
+            self.assertEqual(len(doc), 2)
+        # No temp files left behind
+        self.assertEqual(os.listdir(os.path.dirname(paths[0])), [os.path.basename(paths[0])])
+
+    def test_full_selection_uses_original(self):
+        self.assertEqual(subset_pdf(self.pdf_path, None), self.pdf_path)
+        self.assertEqual(subset_pdf(self.pdf_path, range(6)), self.pdf_path)
+
+    @patch('pdf_uploads.genai.upload_file')
+    def test_upload_sends_subset(self, mock_upload):
+        upload_pdf("cme_sec09", self.pdf_path, pages=[3], registry=UploadRegistry())
+        uploaded = mock_upload.call_args.args[0]
+        self.assertNotEqual(uploaded, self.pdf_path)
+        with fitz.open(uploaded) as doc:
+            self.assertEqual(len(doc), 1)
+
+def fake_handle(name, hours=47):
+    return SimpleNamespace(name=name, expiration_time=datetime.now(timezone.utc) + timedelta(hours=hours), state=SimpleNamespace(name="ACTIVE"))
+
+class TestUploadRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmp.name, "doc.pdf")
+        make_pdf(self.pdf_path, pages=2)
+        self.registry_path = os.path.join(self.tmp.name, "gemini_uploads.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @patch('pdf_uploads.genai.upload_file')
+    def test_same_content_uploaded_once_per_run(self, mock_upload):
+        mock_upload.return_value = fake_handle("files/abc")
+        registry = UploadRegistry()
+        copy_path = os.path.join(self.tmp.name, "copy.pdf")
+        with open(self.pdf_path, "rb") as src, open(copy_path, "wb") as dst:
+            dst.write(src.read())
+
+        first = registry.get_or_upload("cme_sec09", self.pdf_path)
+        second = registry.get_or_upload("summary", copy_path)
+
+        self.assertIs(first, second)
+        self.assertEqual(mock_upload.call_count, 1)
+        self.assertEqual((registry.uploads, registry.reuses), (1, 1))
+
+    @patch('pdf_uploads.genai.get_file')
+    @patch('pdf_uploads.genai.upload_file')
+    def test_persisted_handle_reused_by_next_run(self, mock_upload, mock_get):
+        mock_upload.return_value = fake_handle("files/abc")
+        mock_get.return_value = fake_handle("files/abc")
+        UploadRegistry(self.registry_path).get_or_upload("cme_sec09", self.pdf_path)
+
+        handle = UploadRegistry(self.registry_path).get_or_upload("cme_sec09", self.pdf_path)
+
+        self.assertEqual(handle.name, "files/abc")
+        self.assertEqual(mock_upload.call_count, 1)
+        mock_get.assert_called_once_with("files/abc")
+
+    @patch('pdf_uploads.genai.get_file')
+    @patch('pdf_uploads.genai.upload_file')
+    def test_expiring_handle_is_uploaded_again(self, mock_upload, mock_get):
+        mock_upload.return_value = fake_handle("files/old", hours=0.1)
+        UploadRegistry(self.registry_path).get_or_upload("cme_sec09", self.pdf_path)
+
+        mock_upload.return_value = fake_handle("files/new")
+        handle = UploadRegistry(self.registry_path).get_or_upload("cme_sec09", self.pdf_path)
+
+        self.assertEqual(handle.name, "files/new")
+        mock_get.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from unittest.mock import patch
+import json
+import os
+import sys
+
+# Add scripts to path so we can import
+sys.path.append(os.path.join(os.getcwd(), 'scripts'))
+import fetch_and_summarize
+import prompt_budget
+from prompt_budget import assemble_prompt, prune, estimate_tokens
+
+GROUND_TRUTH = {
+    "extracted_metrics": {
+        "hy_spread_current": 2.84,
+        "cme_totals_audit_label": "CME GROUP TOTALS",
+        "sp500_trend_audit": "Close 6800 vs 21d ago 6700",
+        "sp500_trend_status": "Up"
+    },
+    "calculated_scores": {"Credit Stress": 2.0},
+    "score_details": {"Credit Stress": "Calculated (Spread 2.84%)"},
+    "cme_signals": {
+        "equity": {"signal_label": "Directional", "direction_allowed": True, "participation_label": "Expanding",
+                   "gate_reason": "Futures > Options", "futures_oi_delta": 90000, "options_oi_delta": 1000,
+                   "noise_threshold": 50000, "dominance_ratio": 0.01}
+    },
+    "cme_rates_curve": {
+        "tenors": {t: {"total_volume": 1000000, "open_interest": 4000000, "oi_change": 25000} for t in ["2y", "5y", "10y", "30y"]},
+        "dominance": {"active_tenor": "10y"},
+        "quality": {"is_complete": True, "notes": ["partial_section09_parse"], "missing_tenors": []}
+    }
+}
+EVENT_CONTEXT = {"as_of": "2025-12-19", "source": {"cal_path": "/tmp/event_calendar.json"},
+                 "flags_today": ["MONTHLY_OPEX"], "flags_recent": [], "notes": {"MONTHLY_OPEX": "Expiry."}}
+
+PREFIX = "Static instructions.\n"
+TEMPLATE = "GT:{ground_truth_json}\nEC:{event_context_json}"
+
+class TestPromptAssembly(unittest.TestCase):
+
+    def test_allowlist_prunes_audit_fields(self):
+        gt = prune(GROUND_TRUTH, prompt_budget.PROMPT_FIELDS["summary"]["ground_truth"])
+        self.assertEqual(gt["extracted_metrics"], {"hy_spread_current": 2.84, "sp500_trend_status": "Up"})
+        self.assertNotIn("score_details", gt)
+        self.assertEqual(set(gt["cme_signals"]["equity"]), {"signal_label", "direction_allowed", "participation_label", "gate_reason"})
+        self.assertEqual(gt["cme_rates_curve"]["quality"], {"is_complete": True})
+
+    def test_compact_and_smaller_than_indented(self):
+        prefix, prompt = assemble_prompt("summary", PREFIX, TEMPLATE, {"ground_truth": GROUND_TRUTH, "event_context": EVENT_CONTEXT}, mode="warn")
+        self.assertEqual(prefix, PREFIX)
+        gt_json = prompt.split("\n")[0][3:]
+        self.assertNotIn("\n", gt_json)
+        self.assertNotIn(": ", gt_json)
+        self.assertNotIn("cal_path", prompt)
+        self.assertLess(len(prompt), len(json.dumps(GROUND_TRUTH, indent=2)) + len(json.dumps(EVENT_CONTEXT, indent=2)))
+
+    def test_benchmark_type_omits_ground_truth(self):
+        _, suffix = assemble_prompt("benchmark", PREFIX, "EC:{event_context_json}", {"ground_truth": GROUND_TRUTH, "event_context": EVENT_CONTEXT})
+        self.assertNotIn("hy_spread_current", suffix)
+        self.assertIn("MONTHLY_OPEX", suffix)
+        # A template may only use the contexts its prompt type lists
+        with self.assertRaises(KeyError):
+            assemble_prompt("benchmark", PREFIX, TEMPLATE, {"ground_truth": GROUND_TRUTH, "event_context": EVENT_CONTEXT})
+
+    def test_trim_drops_in_order_until_within_budget(self):
+        contexts = {"ground_truth": GROUND_TRUTH, "event_context": EVENT_CONTEXT}
+        full = assemble_prompt("summary", PREFIX, TEMPLATE, contexts, mode="warn")
+        budget = estimate_tokens("".join(full)) - 10
+        with patch.dict(prompt_budget.PROMPT_TOKEN_BUDGETS, {"vendor/small": budget}):
+            warned = assemble_prompt("summary", PREFIX, TEMPLATE, contexts, model="vendor/small", mode="warn")
+            prefix, trimmed = assemble_prompt("summary", PREFIX, TEMPLATE, contexts, model="vendor/small", mode="trim")
+        self.assertEqual(warned, full)
+        self.assertEqual(prefix, PREFIX)
+        self.assertLessEqual(estimate_tokens(prefix + trimmed), budget)
+        self.assertNotIn('"tenors"', trimmed)
+        # Later trim steps are not needed once the first one fits
+        self.assertIn("MONTHLY_OPEX", trimmed)
+        # The caller's contexts are left intact
+        self.assertIn("tenors", GROUND_TRUTH["cme_rates_curve"])
+
+    @patch.object(fetch_and_summarize, "RUN_MODE", "PRODUCTION")
+    def test_summary_prompt_uses_compact_ground_truth(self):
+        prompt = fetch_and_summarize.format_summary_prompt(GROUND_TRUTH, EVENT_CONTEXT)
+        self.assertIn('"hy_spread_current":2.84', prompt)
+        self.assertNotIn("CME GROUP TOTALS", prompt)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import unittest
+from unittest.mock import patch
+import base64
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import fitz
+
+# Add scripts to path so we can import
+sys.path.append(os.path.join(os.getcwd(), 'scripts'))
+import rasterizer
+import page_index
+from rasterizer import RenderCache, build_vision_images, iter_page_images, pdf_to_images, crop_document, crop_images, crop_spec
+from test_cme_parser import make_pdf as make_bulletin, SEC09_LINES
+
+LOW_RES = {"dpi": 72, "grayscale": False, "format": "jpeg", "quality": 85, "max_pixels": None}
+
+def make_pdf(path, pages=3):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=200, height=200)
+        page.insert_text((20, 50), f"Page {i + 1}")
+    doc.save(path)
+    doc.close()
+
+class TestRenderCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmp.name, "doc.pdf")
+        make_pdf(self.pdf_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_second_conversion_is_served_from_cache(self):
+        cache = RenderCache(64 * 1024 * 1024)
+        with patch.object(rasterizer, "render_page", wraps=rasterizer.render_page) as render:
+            first = pdf_to_images(self.pdf_path, profile=LOW_RES, cache=cache, workers=1)
+            second = pdf_to_images(self.pdf_path, profile=LOW_RES, cache=cache, workers=1)
+
+        self.assertEqual(first, second)
+        self.assertEqual(render.call_count, 3)
+        self.assertEqual(cache.hits, 3)
+
+    def test_profile_is_part_of_key(self):
+        cache = RenderCache(64 * 1024 * 1024)
+        pdf_to_images(self.pdf_path, profile=LOW_RES, cache=cache, workers=1)
+        pdf_to_images(self.pdf_path, profile=dict(LOW_RES, dpi=144), cache=cache, workers=1)
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(len(cache.entries), 6)
+
+    def test_lru_eviction_respects_budget(self):
+        cache = RenderCache(10)
+        cache.put(("h", 0, 1, "jpeg"), "aaaa")
+        cache.put(("h", 1, 1, "jpeg"), "bbbb")
+        cache.get(("h", 0, 1, "jpeg"))  # Page 0 becomes most recent
+        cache.put(("h", 2, 1, "jpeg"), "cccc")
+
+        self.assertLessEqual(cache.total_bytes, 10)
+        self.assertIn(("h", 0, 1, "jpeg"), cache.entries)
+        self.assertNotIn(("h", 1, 1, "jpeg"), cache.entries)
+
+    def test_page_selection_renders_only_requested_pages(self):
+        cache = RenderCache(64 * 1024 * 1024)
+        with patch.object(rasterizer, "render_page", wraps=rasterizer.render_page) as render:
+            images = pdf_to_images(self.pdf_path, pages=[0, 2, 99], profile=LOW_RES, cache=cache, workers=1)
+
+        self.assertEqual(len(images), 2)
+        self.assertEqual([c.args[1] for c in render.call_args_list], [0, 2])
+
+    def test_iter_page_images_is_lazy(self):
+        with patch.object(rasterizer, "render_page", wraps=rasterizer.render_page) as render:
+            gen = iter_page_images(self.pdf_path, profile=LOW_RES, cache=None)
+            next(gen)
+            self.assertEqual(render.call_count, 1)
+            gen.close()
+
+    @patch.object(rasterizer, "RENDER_PARALLEL_MIN_PAGES", 0)
+    def test_parallel_rendering_preserves_page_order(self):
+        make_pdf(self.pdf_path, pages=5)
+        serial = pdf_to_images(self.pdf_path, profile=LOW_RES, cache=None, workers=1)
+        parallel = pdf_to_images(self.pdf_path, pages=[4, 0, 3, 1, 2], profile=LOW_RES, cache=None, workers=2)
+
+        self.assertEqual(parallel, [serial[4], serial[0], serial[3], serial[1], serial[2]])
+
+    @patch.object(rasterizer, "RENDER_PARALLEL_MIN_PAGES", 0)
+    def test_parallel_rendering_from_worker_thread(self):
+        serial = pdf_to_images(self.pdf_path, profile=LOW_RES, cache=None, workers=1)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            parallel = pool.submit(pdf_to_images, self.pdf_path, profile=LOW_RES, cache=None, workers=2).result(timeout=60)
+        self.assertEqual(parallel, serial)
+
+    def test_few_pages_render_without_a_pool(self):
+        with patch.object(rasterizer, "render_pool") as pool:
+            images = pdf_to_images(self.pdf_path, profile=LOW_RES, cache=None, workers=4)
+        pool.assert_not_called()
+        self.assertEqual(len(images), 3)
+
+    @patch.object(rasterizer, "RENDER_PARALLEL_MIN_PAGES", 0)
+    def test_parallel_rendering_fills_cache(self):
+        cache = RenderCache(64 * 1024 * 1024)
+        pdf_to_images(self.pdf_path, profile=LOW_RES, cache=cache, workers=2)
+        self.assertEqual(len(cache.entries), 3)
+
+    def test_grayscale_png_profile(self):
+        profile = {"dpi": 72, "grayscale": True, "format": "png", "quality": None, "max_pixels": None}
+        images = pdf_to_images(self.pdf_path, pages=[0], profile=profile, cache=None, workers=1)
+        pix = fitz.Pixmap(base64.b64decode(images[0]))
+        self.assertEqual(pix.n, 1)
+
+    def test_max_pixels_caps_resolution(self):
+        profile = dict(LOW_RES, dpi=720, max_pixels=100 * 100)
+        images = pdf_to_images(self.pdf_path, pages=[0], profile=profile, cache=None, workers=1)
+        pix = fitz.Pixmap(base64.b64decode(images[0]))
+        self.assertLessEqual(pix.width * pix.height, 100 * 100 + 2 * 100 + 1)
+
+    def test_byte_budget_lowers_resolution(self):
+        profile = dict(LOW_RES, dpi=288, max_pixels=None)
+        unbounded = build_vision_images([(self.pdf_path, None, profile, None)], budget_mb=0)
+        unbounded_size = sum(len(img) for _, img in unbounded)
+
+        budget_mb = unbounded_size / 3 / (1024 * 1024)
+        bounded = build_vision_images([(self.pdf_path, None, profile, None)], budget_mb=budget_mb)
+
+        self.assertEqual(len(bounded), 3)
+        self.assertEqual(bounded[0][0], "image/jpeg")
+        self.assertLessEqual(sum(len(img) for _, img in bounded), unbounded_size / 3)
+
+    def test_disk_tier_survives_new_process_cache(self):
+        disk_dir = os.path.join(self.tmp.name, "renders")
+        pdf_to_images(self.pdf_path, profile=LOW_RES, cache=RenderCache(1024 * 1024, disk_dir=disk_dir, disk_max_bytes=1024 * 1024))
+
+        fresh = RenderCache(1024 * 1024, disk_dir=disk_dir, disk_max_bytes=1024 * 1024)
+        with patch.object(rasterizer, "render_page") as render:
+            pdf_to_images(self.pdf_path, profile=LOW_RES, cache=fresh, workers=1)
+        render.assert_not_called()
+        self.assertEqual(fresh.hits, 3)
+
+class TestAnchorCropping(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmp.name, "sec09.pdf")
+        make_bulletin(self.pdf_path, SEC09_LINES)
+        self.index_patches = [
+            patch.object(page_index, "PAGE_INDEX_DIR", os.path.join(self.tmp.name, "page_index")),
+            patch.object(page_index, "_INDEXES", {}),
+        ]
+        for p in self.index_patches: p.start()
+
+    def tearDown(self):
+        for p in self.index_patches: p.stop()
+        self.tmp.cleanup()
+
+    def test_crop_keeps_only_anchor_rows_and_header(self):
+        doc, source_pages = crop_document(self.pdf_path, crop_spec("cme_sec09", ["10y"]))
+        with doc:
+            text = doc[0].get_text()
+            height = doc[0].rect.height
+        self.assertEqual(source_pages, [0])
+        self.assertIn("TOTAL 10-YR NOTE FUTURES", text)
+        self.assertIn("BULLETIN", text)
+        self.assertNotIn("TOTAL 30Y BOND FUT", text)
+        self.assertLess(height, 612 / 4)
+
+    def test_cropped_image_is_smaller_than_page(self):
+        profile = dict(LOW_RES, format="png")
+        cache = RenderCache(64 * 1024 * 1024)
+        crops = crop_images(self.pdf_path, crop_spec("cme_sec09", ["2y", "ultra"]), profile=profile, cache=cache)
+        page = pdf_to_images(self.pdf_path, profile=profile, cache=cache, workers=1)
+        self.assertEqual(len(crops), 1)
+        self.assertLess(len(crops[0]), len(page[0]))
+
+    def test_no_anchor_hits_falls_back_to_whole_pages(self):
+        spec = {"headers": [], "rows": ["NOT ON THIS PAGE"], "row_pt": 0}
+        self.assertIsNone(crop_images(self.pdf_path, spec, profile=LOW_RES, cache=None))
+        images = build_vision_images([(self.pdf_path, None, LOW_RES, spec)], budget_mb=0)
+        self.assertEqual(len(images), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+
+# Add scripts to path so we can import
+sys.path.append(os.path.join(os.getcwd(), 'scripts'))
+import run_manifest
+from fetch_and_summarize import is_error_summary
+
+class TestRunManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmp.name, "cme.pdf")
+        with open(self.pdf_path, "wb") as f:
+            f.write(b"%PDF bulletin v1")
+        self.patcher = patch.object(run_manifest, "MANIFEST_PATH", os.path.join(self.tmp.name, "run_manifest.json"))
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp.cleanup()
+
+    def test_fingerprint_is_stable_for_identical_inputs(self):
+        live = {"vix_index": 14.2, "sp500_current_date": "2025-12-19"}
+        first, _ = run_manifest.compute_run_fingerprint({"cme": self.pdf_path}, live)
+        second, _ = run_manifest.compute_run_fingerprint({"cme": self.pdf_path}, dict(live))
+        self.assertEqual(first, second)
+
+    def test_fingerprint_changes_with_pdf_content(self):
+        before, _ = run_manifest.compute_run_fingerprint({"cme": self.pdf_path}, {})
+        with open(self.pdf_path, "wb") as f:
+            f.write(b"%PDF bulletin v2")
+        after, _ = run_manifest.compute_run_fingerprint({"cme": self.pdf_path}, {})
+        self.assertNotEqual(before, after)
+
+    def test_fingerprint_changes_with_live_data(self):
+        live = {"vix_index": 14.2, "sp500_current": 6800.0, "sp500_current_date": "2025-12-18"}
+        before, _ = run_manifest.compute_run_fingerprint({"cme": self.pdf_path}, live)
+        after, _ = run_manifest.compute_run_fingerprint(
+            {"cme": self.pdf_path}, dict(live, sp500_current=6850.0, sp500_current_date="2025-12-19")
+        )
+        self.assertNotEqual(before, after)
+
+    def test_fingerprint_ignores_intraday_live_values(self):
+        live = {"vix_index": 14.2, "dxy_1d_chg": 0.1, "sp500_current": 6800.0, "sp500_current_date": "2025-12-18"}
+        before, components = run_manifest.compute_run_fingerprint({"cme": self.pdf_path}, live)
+        after, _ = run_manifest.compute_run_fingerprint({"cme": self.pdf_path}, dict(live, vix_index=15.0, dxy_1d_chg=-0.2))
+        self.assertEqual(before, after)
+        self.assertEqual(components["live_data"], {"sp500_current": 6800.0, "sp500_current_date": "2025-12-18"})
+
+    def test_fingerprint_changes_with_settings(self):
+        before, _ = run_manifest.compute_run_fingerprint({"cme": self.pdf_path}, {})
+        with patch.object(run_manifest.config, "NOISE_THRESHOLDS", {"equity": 1, "rates": 75000, "fx": 25000}):
+            after, _ = run_manifest.compute_run_fingerprint({"cme": self.pdf_path}, {})
+        self.assertNotEqual(before, after)
+
+    def test_fingerprint_changes_with_code(self):
+        before, _ = run_manifest.compute_run_fingerprint({"cme": self.pdf_path}, {})
+        with patch.object(run_manifest, "code_version", return_value="changed"):
+            after, _ = run_manifest.compute_run_fingerprint({"cme": self.pdf_path}, {})
+        self.assertNotEqual(before, after)
+
+    def test_lookup_after_record(self):
+        fingerprint, components = run_manifest.compute_run_fingerprint({"cme": self.pdf_path}, {})
+        self.assertIsNone(run_manifest.lookup_run(fingerprint, run_mode="PRODUCTION"))
+
+        run_manifest.record_run(fingerprint, components, {"run_mode": "PRODUCTION"}, run_mode="PRODUCTION")
+        entry = run_manifest.lookup_run(fingerprint, run_mode="PRODUCTION")
+        self.assertEqual(entry["outputs"], {"run_mode": "PRODUCTION"})
+        self.assertIsNone(run_manifest.lookup_run("other", run_mode="PRODUCTION"))
+        self.assertIsNone(run_manifest.lookup_run(fingerprint, run_mode="BENCHMARK"))
+
+    def test_error_summaries_detected(self):
+        self.assertTrue(is_error_summary("Error 429: rate limited"))
+        self.assertTrue(is_error_summary("Gemini Error: deadline exceeded"))
+        self.assertTrue(is_error_summary("OpenRouter Error: timeout"))
+        self.assertFalse(is_error_summary("### 1. The Dashboard (Scoreboard)"))
+        self.assertFalse(is_error_summary("Gemini summary skipped."))
+
+if __name__ == '__main__':
+    unittest.main()